@@ -37,6 +37,107 @@ GOOGLE_SERVICE_ACCOUNT_INFO_B64 = os.getenv("GOOGLE_SERVICE_ACCOUNT_INFO_B64", "
 SHEETS_TICKETS_WORKSHEET = os.getenv("SHEETS_TICKETS_WORKSHEET", "Tickets")
 SHEETS_CHANGES_WORKSHEET = os.getenv("SHEETS_CHANGES_WORKSHEET", "Changes")
 
+# tracking_code -> satır indeksi: sütun en geç bu kadar sn'de bir yeniden okunur (elle eklenen/silinen
+# satırlar için). Süreçlerin kendi yazımları nesil dosyasıyla (SHEETS_RATELIMIT_DIR) hemen görülür
+SHEETS_ROW_INDEX_MAX_AGE_SECONDS = float(os.getenv("SHEETS_ROW_INDEX_MAX_AGE_SECONDS", "300"))
+# sheets_db (gspread arka ucu): snapshot bu süreden eskiyse satır yazmadan önce tek hücreyle doğrulanır
+SHEETS_ROW_INDEX_VERIFY_SECONDS = float(os.getenv("SHEETS_ROW_INDEX_VERIFY_SECONDS", "30"))
+# Başlık satırı önbelleğinin ömrü (sn); satır indeksi her yüklendiğinde başlık da tazelenir
+SHEETS_HEADER_CACHE_SECONDS = float(os.getenv("SHEETS_HEADER_CACHE_SECONDS", "60"))
+# sheets_db: tickets sayfası snapshot'ının ömrü (sn); yazımlar snapshot'a yerinde uygulanır
+SHEETS_DB_SNAPSHOT_SECONDS = float(os.getenv("SHEETS_DB_SNAPSHOT_SECONDS", "60"))
+
+# Sheets outbox + worker (`manage.py sheets_worker`)
+SHEETS_WORKER_POLL_SECONDS = float(os.getenv("SHEETS_WORKER_POLL_SECONDS", "2"))
+SHEETS_WORKER_BATCH_SIZE = int(os.getenv("SHEETS_WORKER_BATCH_SIZE", "50"))
+SHEETS_OUTBOX_MAX_ATTEMPTS = int(os.getenv("SHEETS_OUTBOX_MAX_ATTEMPTS", "8"))
+SHEETS_OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("SHEETS_OUTBOX_RETRY_BASE_SECONDS", "5"))
+SHEETS_OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("SHEETS_OUTBOX_RETRY_MAX_SECONDS", "900"))
+SHEETS_OUTBOX_LEASE_SECONDS = float(os.getenv("SHEETS_OUTBOX_LEASE_SECONDS", "120"))
+SHEETS_OUTBOX_KEEP_DONE_HOURS = float(os.getenv("SHEETS_OUTBOX_KEEP_DONE_HOURS", "24"))
+# Toplu yazım: en fazla bu kadar satır / ilk işten sonra bu kadar saniye biriktir
+SHEETS_BATCH_MAX_ROWS = int(os.getenv("SHEETS_BATCH_MAX_ROWS", "100"))
+SHEETS_BATCH_WINDOW_SECONDS = float(os.getenv("SHEETS_BATCH_WINDOW_SECONDS", "1"))
+# Changes satırları (değişiklik talepleri) ayrıca biriktirilir: bu kadar satır ya da bu kadar sn
+SHEETS_CHANGES_FLUSH_ROWS = int(os.getenv("SHEETS_CHANGES_FLUSH_ROWS", "100"))
+SHEETS_CHANGES_FLUSH_SECONDS = float(os.getenv("SHEETS_CHANGES_FLUSH_SECONDS", "10"))
+
+# `sync_sheets --incremental`: geç commit edilen kayıtlar için mark'tan geriye pay (sn)
+SHEETS_SYNC_OVERLAP_SECONDS = float(os.getenv("SHEETS_SYNC_OVERLAP_SECONDS", "5"))
+# Tam senkron: DB'den okuma parça boyutu ve sheet'e yazılan blok (satır) boyutu
+SHEETS_SYNC_CHUNK_SIZE = int(os.getenv("SHEETS_SYNC_CHUNK_SIZE", "2000"))
+SHEETS_SYNC_BLOCK_ROWS = int(os.getenv("SHEETS_SYNC_BLOCK_ROWS", "5000"))
+# push_all fark yazımı: satırlar bu kadarlık gruplar halinde özetlenir; özeti değişen grup tümüyle yazılır
+SHEETS_SYNC_DIGEST_ROWS = int(os.getenv("SHEETS_SYNC_DIGEST_ROWS", "100"))
+# `sync_sheets --reconcile`: sheet bu kadar satırlık bloklarla okunup blok özetleri DB ile
+# karşılaştırılır; tek values.batchGet çağrısında bu kadar blok istenir
+SHEETS_RECONCILE_BLOCK_ROWS = int(os.getenv("SHEETS_RECONCILE_BLOCK_ROWS", "1000"))
+SHEETS_RECONCILE_BLOCKS_PER_CALL = int(os.getenv("SHEETS_RECONCILE_BLOCKS_PER_CALL", "10"))
+# Zamana göre sharding: son seyahat tarihi (bugün - ARCHIVE_DAYS) ayından eski biletler
+# "<Tickets>_YYYY-MM", eski değişiklik talepleri "<Changes>_YYYY-MM" sayfalarına taşınır
+# (rollover tam senkronda ayda bir kez kendiliğinden yapılır)
+SHEETS_SHARDING_ENABLED = os.getenv("SHEETS_SHARDING_ENABLED", "false").lower() == "true"
+SHEETS_SHARD_ARCHIVE_DAYS = int(os.getenv("SHEETS_SHARD_ARCHIVE_DAYS", "30"))
+# `sync_sheets --pull`: sheet'ten DB'ye alınan alanlar (virgülle; boşsa status,pnr_code,rejection_reason).
+# İzin verilenler: status, pnr_code, rejection_reason, notes, flight_number, preferred_airline, reason_other
+SHEETS_PULL_FIELDS = os.getenv("SHEETS_PULL_FIELDS", "")
+
+# Ortak Sheets hız sınırı (tüm süreçler; durum SHEETS_RATELIMIT_DIR altında dosya kilidiyle paylaşılır)
+SHEETS_RATELIMIT_ENABLED = os.getenv("SHEETS_RATELIMIT_ENABLED", "true").lower() == "true"
+SHEETS_RATELIMIT_DIR = os.getenv("SHEETS_RATELIMIT_DIR", "")
+SHEETS_READ_PER_MINUTE = float(os.getenv("SHEETS_READ_PER_MINUTE", "60"))
+SHEETS_WRITE_PER_MINUTE = float(os.getenv("SHEETS_WRITE_PER_MINUTE", "60"))
+SHEETS_RATELIMIT_BURST = float(os.getenv("SHEETS_RATELIMIT_BURST", "10"))
+# 408/429/5xx için üstel geri çekilme + jitter (Retry-After varsa o kullanılır)
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+SHEETS_RETRY_BASE_SECONDS = float(os.getenv("SHEETS_RETRY_BASE_SECONDS", "1"))
+SHEETS_RETRY_MAX_SECONDS = float(os.getenv("SHEETS_RETRY_MAX_SECONDS", "64"))
+# Devre kesici: art arda bu kadar bağlantı/sunucu/yetki hatasında Sheets yazımları
+# RESET_SECONDS boyunca denenmez (outbox işleri ertelenir), sonra tek deneme çağrısı yapılır
+SHEETS_BREAKER_ENABLED = os.getenv("SHEETS_BREAKER_ENABLED", "true").lower() == "true"
+SHEETS_BREAKER_FAILURES = int(os.getenv("SHEETS_BREAKER_FAILURES", "5"))
+SHEETS_BREAKER_RESET_SECONDS = float(os.getenv("SHEETS_BREAKER_RESET_SECONDS", "60"))
+SHEETS_BREAKER_PROBE_SECONDS = float(os.getenv("SHEETS_BREAKER_PROBE_SECONDS", "120"))
+# Sheets çağrı telemetrisi (histogram / sayaçlar; /panel/sheets-metrics/). Her süreç sayaçlarını
+# en geç FLUSH sn'de bir SHEETS_RATELIMIT_DIR altına yazar, sayfa tüm süreçleri birleştirir
+SHEETS_METRICS_ENABLED = os.getenv("SHEETS_METRICS_ENABLED", "true").lower() == "true"
+SHEETS_METRICS_FLUSH_SECONDS = float(os.getenv("SHEETS_METRICS_FLUSH_SECONDS", "10"))
+SHEETS_METRICS_RETENTION_HOURS = float(os.getenv("SHEETS_METRICS_RETENTION_HOURS", "24"))
+# /metrics (Prometheus) personel oturumu olmadan yalnızca bu Bearer token ile
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Google API HTTP bağlantı havuzu (keep-alive; süreçteki tüm thread'ler paylaşır)
+SHEETS_HTTP_POOL_SIZE = int(os.getenv("SHEETS_HTTP_POOL_SIZE", "10"))
+SHEETS_HTTP_CONNECT_TIMEOUT = float(os.getenv("SHEETS_HTTP_CONNECT_TIMEOUT", "5"))
+SHEETS_HTTP_READ_TIMEOUT = float(os.getenv("SHEETS_HTTP_READ_TIMEOUT", "60"))
+# Aynı anda yoldaki en fazla Sheets çağrısı (tickets/sheets_async; 1 = eski sıralı yol).
+# Havuz boyutunu (SHEETS_HTTP_POOL_SIZE) aşmamalı; kota yine sheets_ratelimit'te
+SHEETS_ASYNC_CONCURRENCY = int(os.getenv("SHEETS_ASYNC_CONCURRENCY", "4"))
+
+# /healthz, /readyz (tickets/health.py): DB dışı kontroller bu kadar sn önbellekte tutulur;
+# DB bu kadar ms'den yavaşsa readyz 503. Sheets kuyruk gecikmesi WARN'ı aşarsa yalnızca "degraded";
+# MAX_LAG verilirse (0 = kapalı) readyz'i de düşürür (worker durunca tüm web düğümleri düşer!)
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "5"))
+HEALTH_DB_MAX_MS = float(os.getenv("HEALTH_DB_MAX_MS", "500"))
+HEALTH_SYNC_WARN_LAG_SECONDS = float(os.getenv("HEALTH_SYNC_WARN_LAG_SECONDS", "3600"))
+HEALTH_SYNC_MAX_LAG_SECONDS = float(os.getenv("HEALTH_SYNC_MAX_LAG_SECONDS", "0"))
+# Ayrıntılı sağlık raporu personel dışında yalnızca bu değer X-Health-Token başlığında gelirse döner
+HEALTH_TOKEN = os.getenv("HEALTH_TOKEN", "")
+
+# CSV dışa aktarımı akış olarak gider: DB'den bu kadar satırlık parçalar, istemciye ~bu kadar
+# baytlık parçalar; EXPORT_CSV_GZIP=true ise (ya da ?gzip=1) istemci kabul ediyorsa gzip'lenir
+EXPORT_CSV_CHUNK_ROWS = int(os.getenv("EXPORT_CSV_CHUNK_ROWS", "2000"))
+EXPORT_CSV_CHUNK_BYTES = int(os.getenv("EXPORT_CSV_CHUNK_BYTES", str(64 * 1024)))
+EXPORT_CSV_GZIP = os.getenv("EXPORT_CSV_GZIP", "false").lower() == "true"
+
+# Süreç içi sahte Sheets ucu (tickets/sheets_fake.py): ağ / credential olmadan test ve benchmark
+SHEETS_FAKE = os.getenv("SHEETS_FAKE", "false").lower() == "true"
+SHEETS_FAKE_LATENCY_MS = float(os.getenv("SHEETS_FAKE_LATENCY_MS", "0"))
+SHEETS_FAKE_QUOTA_PER_MINUTE = int(os.getenv("SHEETS_FAKE_QUOTA_PER_MINUTE", "0"))  # 0 = sınırsız
+SHEETS_FAKE_ERROR_RATE = float(os.getenv("SHEETS_FAKE_ERROR_RATE", "0"))
+SHEETS_FAKE_MAX_ROWS = int(os.getenv("SHEETS_FAKE_MAX_ROWS", "0"))  # 0 = sınırsız
+SHEETS_FAKE_SHEETS = os.getenv("SHEETS_FAKE_SHEETS", "Tickets,Changes")
+
 # (Opsiyonel) Eski Apps Script köprüsü — boş bırakılabilir
 SHEETS_WEBAPP_URL = os.getenv("SHEETS_WEBAPP_URL", "")
 SHEETS_WEBAPP_TOKEN = os.getenv("SHEETS_WEBAPP_TOKEN", "")
@@ -2,7 +2,7 @@
 from django.contrib import admin, messages
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from .models import TicketRequest, ChangeRequest, Option
+from .models import TicketRequest, ChangeRequest, Option, SheetOutbox
 from django.contrib import admin
 
 
@@ -184,3 +184,25 @@ class ChangeRequestAdmin(admin.ModelAdmin):
     def reason_excerpt(self, obj):
         txt = (obj.reason or "").strip()
         return (txt[:60] + "…") if len(txt) > 60 else txt
+
+
+@admin.register(SheetOutbox)
+class SheetOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "tracking_code", "status", "attempts", "next_attempt_at", "created_at", "processed_at")
+    list_filter = ("status", "kind")
+    search_fields = ("tracking_code", "last_error")
+    readonly_fields = (
+        "kind", "tracking_code", "object_id", "status", "attempts", "next_attempt_at",
+        "locked_until", "last_error", "created_at", "processed_at",
+    )
+    ordering = ("-id",)
+    actions = ["requeue_dead"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Seçili dead-letter işleri yeniden kuyruğa al")
+    def requeue_dead(self, request, queryset):
+        from .outbox import requeue
+        n = requeue(queryset)
+        messages.success(request, f"{n} iş yeniden kuyruğa alındı.")
@@ -0,0 +1,216 @@
+# tickets/google_client.py
+"""
+Süreç (worker) başına tek, paylaşılan Google Sheets istemcisi.
+
+Eskiden gsheets / sheets_api / sheets_db / sheets_sync her çağrıda
+service-account JSON'unu yeniden okuyup yeni Credentials üretiyor ve
+discovery dokümanını baştan parse ediyordu. Artık:
+
+  - Service Account bilgisi ve Credentials süreç başına bir kez yüklenir,
+  - access token paylaşılır; süresi dolunca kilit altında tek sefer yenilenir,
+  - googleapiclient service nesnesi thread başına bir kez kurulur,
+  - gspread Client süreç başına bir kez kurulur,
+  - ikisi de google_http'nin keep-alive havuzlu oturumunu paylaşır
+    (thread başına ayrı httplib2 bağlantısı / TLS el sıkışması yok).
+
+Her iki istemcinin HTTP çağrıları sheets_ratelimit üzerinden geçer
+(paylaşılan kota + yeniden deneme).
+
+stats() ile kaç kez kurulum / token yenileme yapıldığı izlenebilir.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+
+from . import google_http, sheets_fake
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+GSPREAD_SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+_lock = threading.RLock()
+_local = threading.local()
+_sa_info: Optional[dict] = None
+_creds_cache: Dict[tuple, object] = {}
+_gspread_client = None
+_generation = 0  # reset() sonrası thread'lerdeki eski service'leri geçersiz kılar
+
+_stats = {
+    "sa_info_loads": 0,
+    "credentials_builds": 0,
+    "service_builds": 0,
+    "gspread_builds": 0,
+    "token_refreshes": 0,
+}
+
+
+def _bump(key: str, n: int = 1) -> None:
+    with _lock:
+        _stats[key] = _stats.get(key, 0) + n
+
+
+def _read_sa_info() -> dict:
+    """
+    Service Account bilgilerini şu sırayla dener:
+    1) GOOGLE_SERVICE_ACCOUNT_INFO_B64  (base64 JSON)
+    2) GOOGLE_SERVICE_ACCOUNT_INFO      (düz JSON string)
+    3) GOOGLE_SERVICE_ACCOUNT_FILE      (dosya yolu)
+    4) SHEETS_CREDENTIALS_FILE / GOOGLE_APPLICATION_CREDENTIALS (eski gspread yolları)
+    """
+    info_b64 = (getattr(settings, "GOOGLE_SERVICE_ACCOUNT_INFO_B64", "") or "").strip()
+    if info_b64:
+        return json.loads(base64.b64decode(info_b64).decode("utf-8"))
+
+    info_raw = (getattr(settings, "GOOGLE_SERVICE_ACCOUNT_INFO", "") or "").strip()
+    if info_raw:
+        return json.loads(info_raw)
+
+    paths = [
+        getattr(settings, "GOOGLE_SERVICE_ACCOUNT_FILE", ""),
+        getattr(settings, "SHEETS_CREDENTIALS_FILE", ""),
+        os.getenv("GOOGLE_APPLICATION_CREDENTIALS", ""),
+    ]
+    for path in paths:
+        path = (path or "").strip()
+        if not path:
+            continue
+        path = os.path.expandvars(os.path.expanduser(path))
+        if not os.path.exists(path):
+            raise RuntimeError(f"Service Account dosyası bulunamadı: {path}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    raise RuntimeError("Service Account bilgisi bulunamadı. .env ayarlarını kontrol et.")
+
+
+def load_sa_info() -> dict:
+    """Service Account JSON'unu süreç başına bir kez okur."""
+    global _sa_info
+    with _lock:
+        if _sa_info is None:
+            _sa_info = _read_sa_info()
+            _stats["sa_info_loads"] += 1
+        return _sa_info
+
+
+def credentials(scopes: Iterable[str] = SCOPES):
+    """Verilen scope seti için paylaşılan Credentials nesnesi."""
+    from google.oauth2.service_account import Credentials
+
+    key = tuple(scopes)
+    with _lock:
+        creds = _creds_cache.get(key)
+        if creds is None:
+            creds = Credentials.from_service_account_info(load_sa_info(), scopes=list(key))
+            _creds_cache[key] = creds
+            _stats["credentials_builds"] += 1
+        return creds
+
+
+def ensure_token(creds) -> None:
+    """
+    Token geçersizse (hiç alınmamış / süresi dolmak üzere) kilit altında
+    bir kez yenile. Aynı anda gelen diğer thread'ler yenilenmiş token'ı kullanır.
+    """
+    if creds.valid:
+        return
+    from google.auth.transport.requests import Request
+
+    with _lock:
+        if not creds.valid:
+            creds.refresh(Request())
+            _stats["token_refreshes"] += 1
+
+
+def sheets_service():
+    """
+    googleapiclient Sheets v4 service'i. Thread başına bir kez kurulur;
+    Credentials, token ve HTTP bağlantı havuzu tüm thread'ler arasında paylaşılır.
+    SHEETS_FAKE açıksa istekler süreç içi sahte uca (sheets_fake) gider.
+    """
+    fake = sheets_fake.enabled()
+    creds = None if fake else credentials(SCOPES)
+    srv = getattr(_local, "service", None)
+    if srv is None or getattr(_local, "generation", None) != _generation:
+        from googleapiclient.discovery import build
+
+        from .sheets_ratelimit import RateLimitedHttpRequest
+
+        if fake:
+            auth = {"http": sheets_fake.FakeHttp()}
+        else:
+            auth = {"http": google_http.Http(google_http.session(creds, tuple(SCOPES)))}
+        srv = build(
+            "sheets", "v4", cache_discovery=False,
+            requestBuilder=RateLimitedHttpRequest, **auth,
+        )
+        _local.service = srv
+        _local.generation = _generation
+        _bump("service_builds")
+    if creds is not None:
+        ensure_token(creds)
+    return srv
+
+
+def gspread_client():
+    """Süreç başına tek gspread Client (requests session'ı thread'ler arası paylaşılır)."""
+    global _gspread_client
+    if sheets_fake.enabled():
+        with _lock:
+            if _gspread_client is None:
+                import gspread
+
+                from .sheets_ratelimit import RateLimitedHTTPClient
+
+                _gspread_client = gspread.Client(
+                    None, session=sheets_fake.session(), http_client=RateLimitedHTTPClient
+                )
+                _stats["gspread_builds"] += 1
+            return _gspread_client
+
+    creds = credentials(GSPREAD_SCOPES)
+    with _lock:
+        if _gspread_client is None:
+            import gspread
+
+            from .sheets_ratelimit import RateLimitedHTTPClient
+
+            _gspread_client = gspread.Client(
+                creds,
+                session=google_http.session(creds, tuple(GSPREAD_SCOPES)),
+                http_client=RateLimitedHTTPClient,
+            )
+            _stats["gspread_builds"] += 1
+    ensure_token(creds)
+    return _gspread_client
+
+
+def stats() -> dict:
+    """Kurulum/yenileme sayaçlarının kopyası."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset() -> None:
+    """
+    Önbelleği temizle (ör. credential rotasyonu ya da SHEETS_FAKE değişimi sonrası).
+    Diğer thread'lerdeki service nesneleri bir sonraki çağrıda yeniden kurulur.
+    """
+    global _sa_info, _gspread_client, _generation
+    with _lock:
+        _sa_info = None
+        _creds_cache.clear()
+        _gspread_client = None
+        _generation += 1
+    google_http.reset()
@@ -0,0 +1,186 @@
+# tickets/google_http.py
+"""
+Google API trafiği için paylaşılan, keep-alive bağlantı havuzlu HTTP taşıma katmanı.
+
+Eskiden googleapiclient her thread'de kendi httplib2.Http'sini kuruyordu;
+yeni thread / yeniden kurulum = yeni TCP + TLS el sıkışması, ve httplib2
+thread-safe olmadığı için bağlantılar thread'ler arasında paylaşılamıyordu.
+gspread ise ayrı bir requests session'ı (ayrı havuz) kullanıyordu. Artık:
+
+  - credential kapsamı başına süreçte tek bir requests (AuthorizedSession)
+    oturumu vardır; urllib3 havuzu thread'ler arasında paylaşılır,
+  - havuz boyutu SHEETS_HTTP_POOL_SIZE; dolunca yeni bağlantı açmak yerine
+    boşalan bağlantı beklenir (pool_block),
+  - her isteğe (bağlantı, okuma) zaman aşımı uygulanır
+    (SHEETS_HTTP_CONNECT_TIMEOUT / SHEETS_HTTP_READ_TIMEOUT); call_timeout()
+    ile tek çağrı için değiştirilebilir,
+  - Http sınıfı googleapiclient'ın beklediği httplib2 arayüzünü aynı oturum
+    üzerinden sağlar; gspread aynı oturumu doğrudan kullanır.
+
+Tekrar deneme burada yapılmaz (max_retries=0): sheets_ratelimit'in işidir.
+stats(): istek / yeni bağlantı sayısı, yeniden kullanım oranı ve el sıkışma
+sürelerinden hesaplanan tasarruf.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_local = threading.local()
+_sessions: Dict[tuple, object] = {}
+_stats = {"requests": 0, "connections": 0, "connect_seconds": 0.0, "timeouts": 0}
+
+
+def _bump(key: str, n=1) -> None:
+    with _lock:
+        _stats[key] += n
+
+
+def pool_size() -> int:
+    return max(1, int(getattr(settings, "SHEETS_HTTP_POOL_SIZE", 10)))
+
+
+def default_timeout():
+    return (
+        float(getattr(settings, "SHEETS_HTTP_CONNECT_TIMEOUT", 5)),
+        float(getattr(settings, "SHEETS_HTTP_READ_TIMEOUT", 60)),
+    )
+
+
+@contextmanager
+def call_timeout(read: float, connect: Optional[float] = None):
+    """Bu thread'deki çağrılar için geçici zaman aşımı (ör. büyük toplu yazımlar)."""
+    previous = getattr(_local, "timeout", None)
+    _local.timeout = (connect if connect is not None else default_timeout()[0], read)
+    try:
+        yield
+    finally:
+        _local.timeout = previous
+
+
+def _timeout(requested):
+    if requested is not None:
+        return requested
+    return getattr(_local, "timeout", None) or default_timeout()
+
+
+# ====== urllib3 / requests kancaları ======
+def _adapter():
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPSConnection
+    from urllib3.connectionpool import HTTPSConnectionPool
+
+    class _TimedHTTPSConnection(HTTPSConnection):
+        """Yeni bağlantıları ve TCP + TLS kurulum süresini sayar."""
+
+        def connect(self):
+            started = time.perf_counter()
+            super().connect()
+            with _lock:
+                _stats["connections"] += 1
+                _stats["connect_seconds"] += time.perf_counter() - started
+
+    class _PooledHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = _TimedHTTPSConnection
+
+    class PooledAdapter(HTTPAdapter):
+        def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+            super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+            self.poolmanager.pool_classes_by_scheme = dict(
+                self.poolmanager.pool_classes_by_scheme, https=_PooledHTTPSConnectionPool
+            )
+
+        def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+            _bump("requests")
+            try:
+                return super().send(request, stream=stream, timeout=_timeout(timeout),
+                                    verify=verify, cert=cert, proxies=proxies)
+            except Exception as e:
+                if "Timeout" in type(e).__name__:
+                    _bump("timeouts")
+                raise
+
+    size = pool_size()
+    return PooledAdapter(pool_connections=4, pool_maxsize=size, pool_block=True, max_retries=0)
+
+
+def session(creds, key: tuple = ()):
+    """
+    creds için süreç başına tek AuthorizedSession (havuzlu adaptör takılı).
+    key: aynı credential'ın farklı kapsamlarını ayırmak için.
+    """
+    with _lock:
+        s = _sessions.get(key)
+        if s is None:
+            from google.auth.transport.requests import AuthorizedSession
+
+            s = AuthorizedSession(creds)
+            s.mount("https://", _adapter())
+            _sessions[key] = s
+        return s
+
+
+def reset() -> None:
+    """Oturumları kapat (credential rotasyonu / google_client.reset())."""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for s in sessions:
+        try:
+            s.close()
+        except Exception:
+            logger.debug("Oturum kapatılamadı", exc_info=True)
+
+
+# ====== googleapiclient için httplib2 arayüzü ======
+class Http:
+    """build(http=Http(session)) için httplib2.Http yerine geçer; thread-safe."""
+
+    # requests yanıtı zaten açar; googleapiclient'a bu başlıklar gitmesin
+    _DROP = {"content-encoding", "content-length", "transfer-encoding"}
+
+    def __init__(self, session):
+        self.session = session
+        self.timeout = None
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        import httplib2
+
+        resp = self.session.request(
+            method, uri, data=body, headers=headers,
+            timeout=_timeout(self.timeout), allow_redirects=redirections > 0,
+        )
+        info = {k.lower(): v for k, v in resp.headers.items() if k.lower() not in self._DROP}
+        info["status"] = str(resp.status_code)
+        out = httplib2.Response(info)
+        out.reason = resp.reason or ""
+        return out, resp.content
+
+    def close(self):
+        pass  # oturum paylaşılıyor; reset() kapatır
+
+
+# ====== Metrikler ======
+def stats() -> dict:
+    """İstek / bağlantı sayıları, yeniden kullanım ve tahmini el sıkışma tasarrufu."""
+    with _lock:
+        st = dict(_stats)
+    requests_, conns = st["requests"], st["connections"]
+    reused = max(0, requests_ - conns)
+    avg = st["connect_seconds"] / conns if conns else 0.0
+    st.update(
+        pool_size=pool_size(),
+        reused=reused,
+        reuse_ratio=(reused / requests_) if requests_ else 0.0,
+        avg_connect_ms=avg * 1000,
+        saved_seconds=reused * avg,
+    )
+    return st
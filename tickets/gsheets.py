@@ -1,47 +1,20 @@
 # tickets/gsheets.py
 from __future__ import annotations
-import os, json, base64, string
+import string
+from functools import partial
 from typing import Dict, Any, List
 from django.conf import settings
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 import logging
+from googleapiclient.errors import HttpError
 
+from . import google_client, sheets_async, sheets_headers, sheets_index, sheets_shards, ticket_rows
 
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+SCOPES = google_client.SCOPES
 logger = logging.getLogger(__name__)
-def _load_sa_info() -> dict:
-    """
-    Service Account bilgilerini şu sırayla dener:
-    1) GOOGLE_SERVICE_ACCOUNT_INFO_B64  (base64 JSON)
-    2) GOOGLE_SERVICE_ACCOUNT_INFO      (düz JSON string)
-    3) GOOGLE_SERVICE_ACCOUNT_FILE      (dosya yolu)
-    """
-    info_b64 = getattr(settings, "GOOGLE_SERVICE_ACCOUNT_INFO_B64", "").strip()
-    logger.warning(info_b64)
-    if info_b64:
-        return json.loads(base64.b64decode(info_b64).decode("utf-8"))
-
-    info_raw = getattr(settings, "GOOGLE_SERVICE_ACCOUNT_INFO", "").strip()
-    if info_raw:
-        return json.loads(info_raw)
-
-    path = getattr(settings, "GOOGLE_SERVICE_ACCOUNT_FILE", "").strip()
-    if path:
-        path = os.path.expandvars(os.path.expanduser(path))
-        if not os.path.exists(path):
-            raise RuntimeError(f"Service Account dosyası bulunamadı: {path}")
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    raise RuntimeError("Service Account bilgisi bulunamadı. .env ayarlarını kontrol et.")
-
-def _creds():
-    info = _load_sa_info()
-    return Credentials.from_service_account_info(info, scopes=SCOPES)
 
 def service():
-    return build("sheets", "v4", credentials=_creds(), cache_discovery=False)
+    """Paylaşılan (süreç/thread başına önbellekli) Sheets service."""
+    return google_client.sheets_service()
 
 def _ssid() -> str:
     ssid = getattr(settings, "GOOGLE_SHEETS_SPREADSHEET_ID", "").strip()
@@ -62,19 +35,43 @@ def _col_to_a1(n: int) -> str:
         letters.append(string.ascii_uppercase[rem])
     return "".join(reversed(letters))
 
-def get_headers(sheet_name: str) -> List[str]:
+def _fetch_headers(sheet_name: str) -> List[str]:
     srv = service()
     resp = srv.spreadsheets().values().get(
         spreadsheetId=_ssid(), range=f"{sheet_name}!1:1"
     ).execute()
     return (resp.get("values", [[]]) or [[]])[0]
 
+def get_headers(sheet_name: str, refresh: bool = False) -> List[str]:
+    """Başlık satırı (worksheet başına önbellekli, bkz. sheets_headers)."""
+    return sheets_headers.layout(_ssid(), sheet_name, _fetch_headers, refresh=refresh).headers
+
+def _with_header_retry(sheet_name: str, write):
+    """
+    write(headers) çağırır; başlıkla ilgili bir API hatasında önbelleği
+    düşürüp güncel başlıkla bir kez daha dener.
+    """
+    try:
+        return write(get_headers(sheet_name))
+    except HttpError as e:
+        if not sheets_headers.is_header_error(e):
+            raise
+        logger.warning("'%s' yazımında başlık hatası; başlıklar yeniden okunuyor: %s", sheet_name, e)
+        sheets_headers.invalidate(_ssid(), sheet_name)
+        return write(get_headers(sheet_name, refresh=True))
+
 def append_by_headers(sheet_name: str, values: Dict[str, Any]) -> dict:
-    headers = get_headers(sheet_name)
+    return _with_header_retry(sheet_name, lambda headers: _append_with_headers(sheet_name, headers, values))
+
+def _row_for_headers(headers: List[str], values: Dict[str, Any]) -> List[str]:
     row = ["" for _ in headers]
     for i, h in enumerate(headers):
         v = values.get(str(h).strip(), "")
         row[i] = "" if v is None else str(v)
+    return row
+
+def _append_with_headers(sheet_name: str, headers: List[str], values: Dict[str, Any]) -> dict:
+    row = _row_for_headers(headers, values)
     srv = service()
     return srv.spreadsheets().values().append(
         spreadsheetId=_ssid(),
@@ -85,92 +82,180 @@ def append_by_headers(sheet_name: str, values: Dict[str, Any]) -> dict:
     ).execute()
 
 def upsert_by_tracking(sheet_name: str, values: Dict[str, Any], tracking_key: str="tracking_code") -> dict:
-    headers = get_headers(sheet_name)
+    return _with_header_retry(
+        sheet_name, lambda headers: _upsert_with_headers(sheet_name, headers, values, tracking_key)
+    )
+
+def _tracking_column(sheet_name: str, headers: List[str], tracking_key: str):
+    """(güncel başlıklar, tracking sütun harfi)"""
     header_map = {str(h).strip(): idx+1 for idx, h in enumerate(headers)}
+    if tracking_key not in header_map:
+        # Önbellekteki düzen eskimiş olabilir: bir kez tazele
+        headers = get_headers(sheet_name, refresh=True)
+        header_map = {str(h).strip(): idx+1 for idx, h in enumerate(headers)}
     if tracking_key not in header_map:
         raise RuntimeError(f"Sheet '{sheet_name}' içinde '{tracking_key}' başlığı yok.")
+    return headers, _col_to_a1(header_map[tracking_key])
 
-    col_idx = header_map[tracking_key]
-    col_a1 = _col_to_a1(col_idx)
+def _reloaded_headers(sheet_name: str, headers: List[str]):
+    """İndeks yüklemesi başlık satırını da okudu; düzen değiştiyse yeni başlıklar (yoksa None)."""
+    current = sheets_headers.cached(_ssid(), sheet_name)
+    if current is None or current.headers == [str(h).strip() for h in headers]:
+        return None
+    return current.headers
 
-    srv = service()
-    resp = srv.spreadsheets().values().get(
-        spreadsheetId=_ssid(), range=f"{sheet_name}!{col_a1}2:{col_a1}"
-    ).execute()
-    col_vals = [r[0] if r else "" for r in resp.get("values", [])]
+def _upsert_with_headers(sheet_name: str, headers: List[str], values: Dict[str, Any],
+                         tracking_key: str) -> dict:
+    headers, col_a1 = _tracking_column(sheet_name, headers, tracking_key)
 
+    srv = service()
     target = str(values.get(tracking_key, "")).strip()
-    row_index = None
-    for i, val in enumerate(col_vals, start=2):
-        if str(val).strip().upper() == target.upper():
-            row_index = i
-            break
+    index = sheets_index.get_index(_ssid(), sheet_name, col_a1)
+    row_index = index.lookup(srv, _ssid(), target)
+    fresh = _reloaded_headers(sheet_name, headers)
+    if fresh is not None:
+        return _upsert_with_headers(sheet_name, fresh, values, tracking_key)
 
-    row = ["" for _ in headers]
-    for i, h in enumerate(headers):
-        v = values.get(str(h).strip(), "")
-        row[i] = "" if v is None else str(v)
+    row = _row_for_headers(headers, values)
 
     if row_index is None:
-        return srv.spreadsheets().values().append(
+        resp = srv.spreadsheets().values().append(
             spreadsheetId=_ssid(),
             range=f"{sheet_name}!A:Z",
             valueInputOption="USER_ENTERED",
             insertDataOption="INSERT_ROWS",
             body={"values":[row]},
         ).execute()
+        index.record_append(target, resp)
+        return resp
     else:
         last_col_a1 = _col_to_a1(len(headers))
-        return srv.spreadsheets().values().update(
+        resp = srv.spreadsheets().values().update(
             spreadsheetId=_ssid(),
             range=f"{sheet_name}!A{row_index}:{last_col_a1}{row_index}",
             valueInputOption="USER_ENTERED",
             body={"values":[row]},
         ).execute()
+        index.record(target, row_index)
+        return resp
+
+def batch_upsert_by_tracking(sheet_name: str, records: List[Dict[str, Any]],
+                             tracking_key: str = "tracking_code") -> dict:
+    """
+    Birden çok kaydı tek seferde yaz: bilinen satırlar tek bir
+    values().batchUpdate, yeni satırlar tek bir çok satırlı append.
+    """
+    return _with_header_retry(
+        sheet_name, lambda headers: _batch_upsert_with_headers(sheet_name, headers, records, tracking_key)
+    )
+
+def _batch_upsert_with_headers(sheet_name: str, headers: List[str], records: List[Dict[str, Any]],
+                               tracking_key: str) -> dict:
+    headers, col_a1 = _tracking_column(sheet_name, headers, tracking_key)
+    srv = service()
+    index = sheets_index.get_index(_ssid(), sheet_name, col_a1)
+    last_col_a1 = _col_to_a1(len(headers))
+
+    # Tüm kodlar tek seferde çözülür: en fazla bir sütun okuması, kayıt başına okuma yok
+    targets = [str(values.get(tracking_key, "")).strip() for values in records]
+    rows_of = index.lookup_many(srv, _ssid(), targets)
+    fresh = _reloaded_headers(sheet_name, headers)
+    if fresh is not None:
+        return _batch_upsert_with_headers(sheet_name, fresh, records, tracking_key)
+
+    data, updated = [], []
+    new_rows, new_codes = [], []
+    for target, values in zip(targets, records):
+        row = _row_for_headers(headers, values)
+        row_index = rows_of.get(target.upper())
+        if row_index is None:
+            new_rows.append(row)
+            new_codes.append(target)
+        else:
+            data.append({"range": f"{sheet_name}!A{row_index}:{last_col_a1}{row_index}", "values": [row]})
+            updated.append((target, row_index))
+
+    if data:
+        srv.spreadsheets().values().batchUpdate(
+            spreadsheetId=_ssid(),
+            body={"valueInputOption": "USER_ENTERED", "data": data},
+        ).execute()
+        for target, row_index in updated:
+            index.record(target, row_index)
+    if new_rows:
+        resp = srv.spreadsheets().values().append(
+            spreadsheetId=_ssid(),
+            range=f"{sheet_name}!A:Z",
+            valueInputOption="USER_ENTERED",
+            insertDataOption="INSERT_ROWS",
+            body={"values": new_rows},
+        ).execute()
+        index.record_append_many(new_codes, resp)
+    return {"updated": len(data), "appended": len(new_rows)}
 
 def ticket_to_dict(ticket) -> Dict[str, Any]:
-    return {
-        "tracking_code": ticket.tracking_code,
-        "user_type": ticket.user_type,
-        "full_name": ticket.full_name,
-        "email": ticket.email or "",
-        "birth_date": ticket.birth_date.isoformat() if t.birth_date else "",
-        "tc_no": ticket.tc_no or "",
-        "phone": ticket.phone or "",
-        "origin": ticket.origin or "",
-        "destination":ticket.destination or "",
-        "travel_date": str(ticket.travel_date) if ticket.travel_date else "",
-        "departure_time": str(ticket.departure_time) if ticket.departure_time else "",
-        "return_destination": ticket.return_destination or "",
-        "return_date": str(ticket.return_date) if ticket.return_date else "",
-        "return_time": str(ticket.return_time) if ticket.return_time else "",
-        "reason":ticket.reason or "",
-        "reason_other": ticket.reason_other or "",
-        "preferred_airline": ticket.preferred_airline or "",
-        "flight_number": ticket.flight_number or "",
-        "transport": ticket.transport or "",
-        "status": ticket.status,
-        "pnr_code": ticket.pnr_code or "",
-        "created_at": str(ticket.created_at),
-        "purchased_by": ticket.purchased_by.get_full_name() if ticket.purchased_by else "",
-        "rejected_by": ticket.rejected_by.get_full_name() if getattr(ticket, "rejected_by", None) else "",
-        "rejection_reason": (ticket.rejection_reason or "") if hasattr(ticket, "rejection_reason") else "",
-        "trip_type": ticket.trip_type,
-    }
+    """Sayfa başlıklarıyla eşleşecek tüm alanlar (bkz. ticket_rows.DICT_COLUMNS)."""
+    return ticket_rows.ticket_dict(ticket)
 
 def upsert_ticket(ticket) -> dict:
-    return upsert_by_tracking(_tickets_sheet(), ticket_to_dict(ticket))
+    """Bileti bulunduğu sayfaya (canlı ya da arşiv, bkz. sheets_shards) yaz."""
+    return upsert_by_tracking(sheets_shards.ticket_sheet(ticket), ticket_to_dict(ticket))
+
+def _change_row(change) -> List[str]:
+    return [
+        change.ticket.tracking_code,
+        change.reason,
+        str(change.created_at),
+    ]
 
 def append_change(change) -> dict:
+    return append_changes([change])
+
+def append_changes(changes) -> dict:
+    """Değişiklikleri sırayla, tek bir çok satırlı append ile ekle."""
+    return _append_change_rows([_change_row(c) for c in changes])
+
+def _append_change_rows(rows: List[List[str]]) -> dict:
     srv = service()
     return srv.spreadsheets().values().append(
         spreadsheetId=_ssid(),
         range=f"{_changes_sheet()}!A:Z",
         valueInputOption="USER_ENTERED",
         insertDataOption="INSERT_ROWS",
-        body={"values":[[
-            change.ticket.tracking_code,
-            change.reason,
-            str(change.created_at),
-        ]]},
+        body={"values": rows},
     ).execute()
+
+def write_batch(tickets, changes) -> dict:
+    """
+    Toplu yazım: biletler sayfa başına tek batchUpdate + tek append,
+    değişiklikler tek append. Bilet sayfaları birbirinden bağımsız olduğundan
+    sheets_async üzerinden eşzamanlı gider (satırlar burada, DB'ye erişebilen
+    bu thread'de hazırlanır). Changes append'i idempotent değildir: yalnızca
+    bilet yazımları başarılı olunca gönderilir; bilet yazımı hata verirse
+    outbox partiyi yeniden denediğinde değişiklik satırları çift eklenmez.
+    """
+    out = {}
+    calls = []
+    by_sheet: Dict[str, List[Dict[str, Any]]] = {}
+    if tickets:
+        # Sayfa (shard) başına bir toplu yazım; sharding kapalıyken tek sayfa
+        resolve = sheets_shards.ticket_resolver()
+        for t in tickets:
+            by_sheet.setdefault(resolve(t), []).append(ticket_to_dict(t))
+        calls += [partial(batch_upsert_by_tracking, sheet, records) for sheet, records in by_sheet.items()]
+    change_rows = [_change_row(c) for c in changes] if changes else []
+
+    pool = sheets_async.client()
+    results = pool.gather(calls) if pool is not None else [fn() for fn in calls]
+    if change_rows:
+        _append_change_rows(change_rows)
+
+    if tickets:
+        res = {"updated": 0, "appended": 0}
+        for r in results[:len(by_sheet)]:
+            res["updated"] += r["updated"]
+            res["appended"] += r["appended"]
+        out["tickets"] = res
+    if changes:
+        out["changes"] = len(changes)
+    return out
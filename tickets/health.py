@@ -0,0 +1,168 @@
+# tickets/health.py
+"""
+Yük dengeleyici / izleme için sağlık (liveness) ve hazırlık (readiness) raporu.
+
+Eskiden yük dengeleyici yalnızca Django'nun yanıt verip vermediğini
+biliyordu; Sheets senkronunun saatlerce geride kalması ya da DB'nin
+yavaşlaması görünmüyordu. Artık /healthz ve /readyz şunları raporlar:
+
+  - DB gidiş-dönüş süresi (her istekte tek `SELECT 1`),
+  - seçili Sheets backend'i (sheets_backend: gsheets / sheets_api) ve
+    devre kesici durumu,
+  - son başarılı senkron: worker'ın son yazımı ve son tam / artımlı push
+    (SyncState), bekleyen yazım kuyruğu (outbox) ve gecikmesi (lag).
+
+Her birkaç saniyede bir yoklanabilsin diye DB ping'i dışındaki kısım
+HEALTH_CACHE_SECONDS boyunca süreç belleğinde tutulur (kuyruk sayımları
+(status, id) indeksinden gelir).
+
+Hazırlık (readyz 503): DB hatası ya da HEALTH_DB_MAX_MS'den yavaş yanıt.
+Sheets gecikmesi istekleri etkilemez (yazımlar outbox'ta bekler): gecikme
+HEALTH_SYNC_WARN_LAG_SECONDS'ı aşınca yalnızca "degraded" raporlanır;
+HEALTH_SYNC_MAX_LAG_SECONDS (varsayılan 0 = kapalı) açıkça verilirse hazırlığı
+da düşürür. healthz süreç ayaktaysa hep 200.
+
+Ayrıntılı rapor (DB türü, kuyruk, devre kesici) yalnızca personele ya da
+HEALTH_TOKEN ile gelen isteğe döner; diğerleri yalnızca durumu görür (views).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import outbox, sheets_backend, sheets_breaker
+from .models import SyncState
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+DEGRADED = "degraded"
+FAIL = "fail"
+
+_lock = threading.Lock()
+_cached: Optional[dict] = None
+_cached_at = 0.0
+
+
+def cache_seconds() -> float:
+    return float(getattr(settings, "HEALTH_CACHE_SECONDS", 5))
+
+
+def db_max_ms() -> float:
+    return float(getattr(settings, "HEALTH_DB_MAX_MS", 500))
+
+
+def sync_warn_lag() -> float:
+    return float(getattr(settings, "HEALTH_SYNC_WARN_LAG_SECONDS", 3600))
+
+
+def sync_max_lag() -> float:
+    return float(getattr(settings, "HEALTH_SYNC_MAX_LAG_SECONDS", 0))
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def check_db() -> dict:
+    started = time.perf_counter()
+    try:
+        with connection.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+    except Exception as e:
+        logger.warning("Sağlık kontrolü: DB erişilemedi: %s", e)
+        return {"status": FAIL, "error": type(e).__name__}
+    ms = (time.perf_counter() - started) * 1000.0
+    return {"status": FAIL if ms > db_max_ms() else OK, "round_trip_ms": round(ms, 2),
+            "vendor": connection.vendor}
+
+
+def _check_sheets() -> dict:
+    backend = sheets_backend.backend_name()
+    out = {"backend": backend or None, "enabled": sheets_backend.enabled()}
+    try:
+        queue = outbox.queue_stats()
+        states = {
+            st.name: st for st in SyncState.objects.filter(name__in=("tickets", "changes", "reconcile"))
+        }
+    except Exception as e:
+        logger.warning("Sağlık kontrolü: senkron durumu okunamadı: %s", e)
+        out.update(status=FAIL, error=type(e).__name__)
+        return out
+    br = sheets_breaker.state()
+    now = timezone.now()
+    pushes = [st.updated_at for name, st in states.items() if name != "reconcile"]
+    last_push = max(pushes) if pushes else None
+    last = max([t for t in (queue["last_done_at"], last_push) if t], default=None)
+    out.update(
+        last_write_at=_iso(queue["last_done_at"]),
+        last_push_at=_iso(last_push),
+        last_reconcile_at=_iso(states["reconcile"].updated_at) if "reconcile" in states else None,
+        last_success_at=_iso(last),
+        since_last_success_seconds=round((now - last).total_seconds(), 1) if last else None,
+        pending=queue["pending"],
+        retrying=queue["retrying"],
+        dead=queue["dead"],
+        lag_seconds=round(queue["lag_seconds"], 1),
+        breaker=br["state"],
+    )
+    status = OK
+    if not out["enabled"]:
+        status = DEGRADED if queue["pending"] else OK
+    elif queue["dead"] or br["state"] != sheets_breaker.CLOSED:
+        status = DEGRADED
+    lag = queue["lag_seconds"] if out["enabled"] else 0
+    warn_lag, max_lag = sync_warn_lag(), sync_max_lag()
+    if warn_lag and lag > warn_lag:
+        status = DEGRADED
+    if max_lag and lag > max_lag:
+        status = FAIL  # yalnızca açıkça istenirse
+    out["status"] = status
+    return out
+
+
+def _cached_checks() -> dict:
+    global _cached, _cached_at
+    now = time.monotonic()
+    with _lock:
+        if _cached is not None and now - _cached_at < cache_seconds():
+            return dict(_cached, cached_for=round(now - _cached_at, 2))
+    checks = {"sheets": _check_sheets()}
+    with _lock:
+        _cached, _cached_at = checks, time.monotonic()
+    return dict(checks, cached_for=0.0)
+
+
+def report() -> dict:
+    """{'status': ok|degraded|fail, 'ready': bool, 'checks': {...}}"""
+    db = check_db()
+    # DB'ye hiç ulaşılamıyorsa diğer kontroller de DB okur: beklemeden yalnızca DB raporlanır
+    cached = _cached_checks() if "error" not in db else {}
+    checks = {"db": db, **{k: v for k, v in cached.items() if k != "cached_for"}}
+    statuses = [c["status"] for c in checks.values()]
+    status = FAIL if FAIL in statuses else DEGRADED if DEGRADED in statuses else OK
+    return {
+        "status": status,
+        "ready": status != FAIL,
+        "time": timezone.now().isoformat(),
+        "cached_for": cached.get("cached_for"),
+        "checks": checks,
+    }
+
+
+def summary(rep: dict) -> dict:
+    """Kimliği doğrulanmamış yoklayıcılar için: yalnızca durum."""
+    return {"status": rep["status"], "ready": rep["ready"]}
+
+
+def reset() -> None:
+    global _cached, _cached_at
+    with _lock:
+        _cached, _cached_at = None, 0.0
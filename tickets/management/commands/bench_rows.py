@@ -0,0 +1,124 @@
+# tickets/management/commands/bench_rows.py
+import datetime as dt
+import timeit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from tickets import ticket_rows
+from tickets.models import TicketRequest
+
+
+# ---- Karşılaştırma için eski (ticket_rows öncesi) uygulamalar ----
+def _legacy_lambda_dict(t):
+    """Eski sheets_api._row_from_ticket: her satırda 22 lambda'lık dict kurar."""
+    get = {
+        "tracking_code": lambda: t.tracking_code,
+        "user_type": lambda: t.user_type,
+        "full_name": lambda: t.full_name,
+        "tc_no": lambda: t.tc_no,
+        "phone": lambda: t.phone,
+        "origin": lambda: t.origin,
+        "destination": lambda: t.destination,
+        "travel_date": lambda: t.travel_date or "",
+        "departure_time": lambda: t.departure_time or "",
+        "return_destination": lambda: t.return_destination or "",
+        "return_date": lambda: t.return_date or "",
+        "return_time": lambda: t.return_time or "",
+        "reason": lambda: t.reason,
+        "reason_other": lambda: t.reason_other or "",
+        "preferred_airline": lambda: t.preferred_airline or "",
+        "transport": lambda: t.transport,
+        "status": lambda: t.status,
+        "pnr_code": lambda: t.pnr_code or "",
+        "created_at": lambda: t.created_at,
+        "purchased_by": lambda: (t.purchased_by.get_full_name() if t.purchased_by else ""),
+        "rejected_by": lambda: (t.rejected_by.get_full_name() if getattr(t, "rejected_by", None) else ""),
+        "rejection_reason": lambda: (t.rejection_reason or "") if hasattr(t, "rejection_reason") else "",
+    }
+    return ["" if get[k]() is None else str(get[k]()) for k in ticket_rows.SHEET_COLUMNS]
+
+
+def _legacy_inline(t):
+    """Eski tam senkron / CSV export satırı (elle yazılmış liste)."""
+    return [
+        t.tracking_code, t.user_type, t.full_name, t.tc_no, t.phone, t.origin, t.destination,
+        str(t.travel_date) if t.travel_date else "",
+        str(t.departure_time) if t.departure_time else "",
+        t.return_destination or "",
+        str(t.return_date) if t.return_date else "",
+        str(t.return_time) if t.return_time else "",
+        t.reason, t.reason_other or "", t.preferred_airline or "", t.transport, t.status,
+        t.pnr_code or "", str(t.created_at),
+        (t.purchased_by.get_full_name() if t.purchased_by else ""),
+        (t.rejected_by.get_full_name() if t.rejected_by else ""),
+        (t.rejection_reason or ""),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Bilet -> satır dönüşümü mikro-benchmark'ı (ticket_rows vs eski uygulamalar). DB gerekmez."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def _tickets(self, n):
+        User = get_user_model()
+        staff = User(username="ops", first_name="Ayşe", last_name="Yılmaz")
+        now = dt.datetime(2025, 1, 1, 9, 30)
+        out = []
+        for i in range(n):
+            t = TicketRequest(
+                tracking_code=f"T{i:011d}", user_type="staff", full_name=f"Yolcu {i}",
+                tc_no="12345678901", phone="555-555-55-55", email="a@example.com",
+                origin="ANK", destination="IST", travel_date=now.date(), departure_time=now.time(),
+                reason="meeting", transport="plane", status="ticketed" if i % 2 else "pending",
+                pnr_code=f"P{i}" if i % 2 else None, created_at=now, updated_at=now,
+            )
+            t.purchased_by = staff if i % 2 else None
+            out.append(t)
+        return out
+
+    def _values(self, tickets, s):
+        # values_list tuple'larının bellek içi karşılığı (DB gidiş-dönüşü ölçüme girmesin)
+        rows = []
+        for t in tickets:
+            rows.append(tuple(
+                ticket_rows.attr_getter(p)(t) for p in s.value_fields
+            ))
+        return rows
+
+    def _sql_values(self, tickets, s):
+        # sql_values(qs) tuple'larının karşılığı: personel adı SQL'de hesaplanmış gibi
+        getters = []
+        for p in s.sql_fields:
+            if p.startswith("_sql_"):
+                col = ticket_rows.COLUMNS[p[len("_sql_"):]]
+                parts = [ticket_rows.attr_getter(x) for x in col.paths]
+                getters.append(lambda t, parts=parts, fmt=col.fmt: fmt(*(g(t) for g in parts)))
+            else:
+                getters.append(ticket_rows.attr_getter(p))
+        return [tuple(g(t) for g in getters) for t in tickets]
+
+    def handle(self, *args, **options):
+        n, repeat = options["rows"], options["repeat"]
+        tickets = self._tickets(n)
+        s = ticket_rows.SHEET_ROW
+        values = self._values(tickets, s)
+        sql_values = self._sql_values(tickets, s)
+
+        cases = [
+            ("eski: lambda dict (sheets_api)", lambda: [_legacy_lambda_dict(t) for t in tickets]),
+            ("eski: elle liste (sync/export)", lambda: [_legacy_inline(t) for t in tickets]),
+            ("ticket_rows.from_instance", lambda: [s.from_instance(t) for t in tickets]),
+            ("ticket_rows.from_values", lambda: [s.from_values(v) for v in values]),
+            ("ticket_rows.from_sql_values", lambda: [s.from_sql_values(v) for v in sql_values]),
+        ]
+        base = None
+        for name, fn in cases:
+            best = min(timeit.repeat(fn, number=1, repeat=repeat))
+            base = base or best
+            self.stdout.write(
+                f"{name:<34} {best * 1000:8.2f} ms  {n / best:10.0f} satır/s  x{base / best:4.2f}"
+            )
@@ -0,0 +1,147 @@
+# tickets/management/commands/sheets_bench.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from tickets import google_client, gsheets, sheets_async, sheets_fake, sheets_headers, sheets_index, sheets_sync
+from tickets.sheets_api import HEADERS
+from tickets.sheets_batch import max_rows
+
+BENCH_SSID = "BENCH"
+
+
+class Command(BaseCommand):
+    help = "Sahte (süreç içi) Sheets ucuna karşı upsert / toplu yazım / senkron ölçümü. Ağ gerekmez."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="Upsert / toplu yazım için kayıt sayısı.")
+        parser.add_argument(
+            "--only", default="upsert,batch,worker,sync",
+            help="Virgülle: upsert, batch, worker, sync (varsayılan hepsi).",
+        )
+        parser.add_argument("--latency-ms", type=float, default=0.0, help="İstek başına sahte gecikme.")
+        parser.add_argument("--quota", type=int, default=0, help="Dakikalık okuma/yazma kotası (0 = sınırsız).")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Rastgele 429 oranı (0..1).")
+        parser.add_argument(
+            "--concurrency", default="1",
+            help="Virgülle eşzamanlılık değerleri; her aşama her değer için ölçülür (ör. 1,4). 1 = sıralı yol.",
+        )
+        parser.add_argument(
+            "--block-rows", type=int, default=None,
+            help="sync aşamasında istek başına satır (varsayılan SHEETS_SYNC_BLOCK_ROWS).",
+        )
+        parser.add_argument(
+            "--ratelimit", action="store_true",
+            help="Ortak hız sınırlayıcıyı da devrede tut (varsayılan: kapalı).",
+        )
+
+    def _reset(self):
+        sheets_fake.reset()
+        google_client.reset()
+        sheets_index.invalidate_all()
+        sheets_headers.invalidate()
+        sheets_fake.seed(BENCH_SSID, "Tickets", [HEADERS])
+        sheets_fake.seed(BENCH_SSID, "Changes", [["tracking_code", "change_text", "created_at"]])
+
+    def _report(self, name, n, started):
+        elapsed = time.perf_counter() - started
+        st = sheets_fake.stats()
+        self.stdout.write(
+            f"{name:<10} {n:>6} kayıt  {elapsed:8.3f}s  {n / elapsed if elapsed else 0:9.1f} kayıt/s  "
+            f"okuma={st.get('reads', 0)} yazma={st.get('writes', 0)} 429={st.get('quota_errors', 0)}"
+        )
+
+    def _records(self, n):
+        # Yarısı yeni satır, yarısı mevcut satırın güncellemesi
+        half = max(1, n // 2)
+        return [
+            {"tracking_code": f"BENCH{i % half:06d}", "full_name": f"Yolcu {i}", "status": "pending"}
+            for i in range(n)
+        ]
+
+    def handle(self, *args, **options):
+        only = {x.strip() for x in options["only"].split(",") if x.strip()}
+        n = options["rows"]
+        self.block_rows = options["block_rows"]
+        levels = [int(x) for x in options["concurrency"].split(",") if x.strip()]
+        if not levels or min(levels) < 1:
+            raise CommandError("--concurrency en az 1 olmalı.")
+        if len(levels) > 1:
+            if not options["latency_ms"]:
+                raise CommandError(
+                    "--concurrency karşılaştırması için --latency-ms verin: gecikmesiz sahte uçta "
+                    "eşzamanlılık yalnızca CPU'yu ölçer."
+                )
+            self.stdout.write(
+                f"Not: sahte uca karşı, istek başına {options['latency_ms']:g} ms yapay gecikmeyle; "
+                "gerçek Sheets kotası / sunucu tarafı sıralaması ölçülmez. sync aşaması geri alınan "
+                "bir transaction içinde çalıştığından sayfalar sırayla yazılır (yalnızca bloklar eşzamanlı)."
+            )
+        overrides = dict(
+            SHEETS_FAKE=True,
+            SHEETS_FAKE_LATENCY_MS=options["latency_ms"],
+            SHEETS_FAKE_QUOTA_PER_MINUTE=options["quota"],
+            SHEETS_FAKE_ERROR_RATE=options["error_rate"],
+            SHEETS_RATELIMIT_ENABLED=options["ratelimit"],
+            GOOGLE_SHEETS_SPREADSHEET_ID=BENCH_SSID,
+            SHEETS_SPREADSHEET_ID=BENCH_SSID,
+        )
+        phases = [
+            ("upsert", self._bench_upsert),
+            ("batch", self._bench_batch),
+            ("worker", self._bench_worker),
+            ("sync", self._bench_sync),
+        ]
+        with override_settings(**overrides):
+            try:
+                for name, fn in phases:
+                    if name not in only:
+                        continue
+                    for level in levels:
+                        label = name if len(levels) == 1 else f"{name}/c{level}"
+                        self._reset()
+                        started = time.perf_counter()
+                        try:
+                            with override_settings(SHEETS_ASYNC_CONCURRENCY=level):
+                                done = fn(n)
+                        except Exception as e:
+                            self.stderr.write(f"{label:<10} başarısız: {type(e).__name__}: {e}")
+                            continue
+                        self._report(label, done, started)
+            finally:
+                # Gerçek istemciler bir sonraki çağrıda yeniden kurulsun
+                google_client.reset()
+                sheets_async.reset()
+                sheets_index.invalidate_all()
+                sheets_headers.invalidate()
+
+    def _bench_upsert(self, n):
+        for rec in self._records(n):
+            gsheets.upsert_by_tracking("Tickets", rec)
+        return n
+
+    def _bench_batch(self, n):
+        recs = self._records(n)
+        size = max_rows()
+        for i in range(0, len(recs), size):
+            gsheets.batch_upsert_by_tracking("Tickets", recs[i:i + size])
+        return n
+
+    def _bench_worker(self, n):
+        # Worker'ın toplu yazımı: Tickets upsert'ü, ardından (başarılıysa) Changes append'i
+        recs = self._records(n)
+        rows = [[r["tracking_code"], "bench", "2025-01-01 00:00:00"] for r in recs]
+        size = max_rows()
+        for i in range(0, len(recs), size):
+            gsheets.batch_upsert_by_tracking("Tickets", recs[i:i + size])
+            gsheets._append_change_rows(rows[i:i + size])
+        return 2 * n
+
+    def _bench_sync(self, n):
+        # Senkron durumu (mark / satır hash'leri) gerçek senkronu etkilemesin
+        with transaction.atomic():
+            out = sheets_sync.push_all(full=True, block_rows=self.block_rows)
+            transaction.set_rollback(True)
+        return out["tickets_rows"] + out["changes_rows"]
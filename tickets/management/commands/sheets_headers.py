@@ -0,0 +1,58 @@
+# tickets/management/commands/sheets_headers.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tickets import gsheets, sheets_headers
+
+
+class Command(BaseCommand):
+    help = "Sheet başlık düzenini (önbellek + parmak izi) kodda beklenen başlıklarla karşılaştırır."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--refresh", action="store_true",
+            help="Önbelleği yok sayıp başlıkları sheet'ten yeniden oku.",
+        )
+
+    def handle(self, *args, **options):
+        from tickets.sheets_api import HEADERS
+        from tickets.sheets_sync import TICKETS_HEADERS, CHANGES_HEADERS
+
+        checks = [
+            (settings.SHEETS_TICKETS_WORKSHEET, [
+                ("sheets_api.HEADERS", HEADERS),
+                ("sheets_sync.TICKETS_HEADERS", TICKETS_HEADERS),
+            ]),
+            (settings.SHEETS_CHANGES_WORKSHEET, [
+                ("sheets_sync.CHANGES_HEADERS", CHANGES_HEADERS),
+            ]),
+        ]
+
+        differs = False
+        for sheet_name, expected_sets in checks:
+            headers = gsheets.get_headers(sheet_name, refresh=options["refresh"])
+            fp = sheets_headers.fingerprint(headers)
+            self.stdout.write(f"{sheet_name}: {len(headers)} sütun, parmak izi {fp}")
+
+            for label, expected in expected_sets:
+                d = sheets_headers.diff(headers, expected)
+                if d["same"]:
+                    self.stdout.write(self.style.SUCCESS(f"  = {label} ({sheets_headers.fingerprint(expected)})"))
+                    continue
+                differs = True
+                self.stdout.write(self.style.WARNING(
+                    f"  ≠ {label} ({sheets_headers.fingerprint(expected)})"
+                ))
+                if d["missing"]:
+                    self.stdout.write(f"      eksik: {', '.join(d['missing'])}")
+                if d["extra"]:
+                    self.stdout.write(f"      fazla: {', '.join(d['extra'])}")
+                if d["moved"]:
+                    self.stdout.write(f"      yeri farklı: {', '.join(d['moved'])}")
+
+        st = sheets_headers.stats()
+        self.stdout.write(
+            f"Önbellek: {st['entries']} kayıt, {st['loads']} yükleme, {st['hits']} isabet."
+        )
+        if differs:
+            self.stdout.write(self.style.WARNING("Başlık düzeni beklenenden farklı."))
@@ -0,0 +1,100 @@
+# tickets/management/commands/sheets_worker.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tickets import google_http, outbox, sheets_async, sheets_breaker, sheets_metrics
+from tickets.sheets_batch import window_seconds
+
+
+class Command(BaseCommand):
+    help = "Sheets outbox kuyruğunu boşaltan uzun süreli worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Kuyruğu bir kez boşalt ve çık.")
+        parser.add_argument("--stats", action="store_true", help="Sadece kuyruk derinliği / gecikmeyi yaz.")
+        parser.add_argument(
+            "--breaker-reset", action="store_true",
+            help="Sheets devre kesicisini elle kapat ve çık.",
+        )
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--interval", type=float,
+            default=getattr(settings, "SHEETS_WORKER_POLL_SECONDS", 2.0),
+            help="Kuyruk boşken bekleme süresi (sn).",
+        )
+
+    def _report(self):
+        st = outbox.queue_stats()
+        self.stdout.write(
+            f"[outbox] bekleyen={st['pending']} (retry={st['retrying']}) dead={st['dead']} "
+            f"lag={st['lag_seconds']:.1f}s son_yazım={st['last_done_at'] or '-'}"
+        )
+        br = sheets_breaker.state()
+        self.stdout.write(
+            f"[devre] durum={br['state']} hata={br['failures']}/{br['threshold']} "
+            f"açılma={br['trips']} reddedilen={br['rejected']}"
+            + (f" yeniden_deneme={br['retry_in']:.0f}s" if br["retry_in"] else "")
+        )
+        http = google_http.stats()
+        if http["requests"]:
+            self.stdout.write(
+                f"[http] istek={http['requests']} yeni_bağlantı={http['connections']} "
+                f"yeniden_kullanım=%{http['reuse_ratio'] * 100:.0f} "
+                f"el_sıkışma={http['avg_connect_ms']:.0f}ms kazanç={http['saved_seconds']:.1f}s"
+            )
+        conc = sheets_async.stats()
+        if conc["calls"]:
+            self.stdout.write(f"[async] çağrı={conc['calls']} en_yüksek_eşzamanlı={conc['peak']}")
+        return st
+
+    def handle(self, *args, **options):
+        if options["breaker_reset"]:
+            sheets_breaker.reset()
+            self.stdout.write(self.style.SUCCESS("Sheets devresi kapatıldı."))
+            return
+        if options["stats"]:
+            self._report()
+            return
+
+        batch_size = options["batch_size"]
+        interval = options["interval"]
+        last_purge = 0.0
+
+        self.stdout.write(self.style.SUCCESS("Sheets worker başladı."))
+        try:
+            while True:
+                close_old_connections()
+                res = outbox.drain(batch_size=batch_size, wait_for_batch=not options["once"])
+                if res["done"] or res["failed"] or res["dead"]:
+                    self.stdout.write(
+                        f"[outbox] yazıldı={res['done']} hata={res['failed']} dead={res['dead']} "
+                        f"bekletildi={res['skipped']}"
+                    )
+                    self._report()
+                elif res["deferred"]:
+                    self.stdout.write(f"[outbox] devre açık, ertelendi={res['deferred']}")
+
+                # telemetri web sürecinden görülsün (bkz. sheets_metrics; zaman sınırlı)
+                sheets_metrics.flush()
+
+                if time.monotonic() - last_purge > 3600:
+                    outbox.purge_done()
+                    last_purge = time.monotonic()
+
+                if options["once"]:
+                    # Hemen işlenebilecek iş kalmayana kadar devam
+                    if res["done"] or res["failed"] or res["dead"]:
+                        continue
+                    self._report()
+                    return
+
+                if res["waiting"]:
+                    # parti dolsun diye kısa bekle (bkz. SHEETS_BATCH_WINDOW_SECONDS)
+                    time.sleep(min(interval, window_seconds()))
+                elif not (res["done"] or res["failed"] or res["dead"]):
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write("Worker durduruldu.")
@@ -1,15 +1,188 @@
 # tickets/management/commands/sync_sheets.py
-from django.core.management.base import BaseCommand
-from tickets.sheets_sync import push_all
+import datetime as dt
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from tickets.sheets_sync import SHEETS, pull_tickets, push_all, push_incremental, reconcile_tickets
 
 
 class Command(BaseCommand):
-    help = "Google Sheets ile toplu senkronizasyon (tam tablo yazma)."
+    help = "Google Sheets ile toplu senkronizasyon (tam tablo yazma, alım, mutabakat)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental", action="store_true",
+            help="Sadece son senkrondan beri değişen satırları yaz (sapma varsa tam yazım).",
+        )
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Satır hash'lerini yok say, tüm tabloyu yeniden yaz (sheet elle bozulduysa).",
+        )
+        parser.add_argument(
+            "--pull", action="store_true",
+            help="Sheet'te elle düzeltilen alanları (durum, PNR, ret nedeni) DB'ye al.",
+        )
+        parser.add_argument(
+            "--reconcile", action="store_true",
+            help="Tickets sayfasını blok özetleriyle DB ile karşılaştır; eksik / tekrar eden / eski satırları listele.",
+        )
+        parser.add_argument(
+            "--repair", action="store_true",
+            help="--reconcile ile: yalnızca eksik / tekrar eden / eski satırları onar.",
+        )
+        parser.add_argument(
+            "--only", choices=SHEETS, default=None,
+            help="Yalnızca bu sayfayı yaz (tickets / changes).",
+        )
+        parser.add_argument(
+            "--since", default=None,
+            help="Yalnızca bu andan sonra değişen satırları yaz (YYYY-MM-DD ya da ISO zaman damgası).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=None,
+            help="İstek başına en fazla satır (varsayılan SHEETS_SYNC_BLOCK_ROWS).",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=None,
+            help="Aynı anda yoldaki en fazla Sheets çağrısı (varsayılan SHEETS_ASYNC_CONCURRENCY; 1 = sıralı).",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Hiçbir şey yazma; yazılacak satırları raporla.",
+        )
+
+    def _since(self, raw):
+        if not raw:
+            return None
+        value = parse_datetime(raw)
+        if value is None:
+            day = parse_date(raw)
+            if day is None:
+                raise CommandError(f"--since anlaşılamadı: {raw!r} (YYYY-MM-DD ya da ISO zaman damgası)")
+            value = dt.datetime.combine(day, dt.time.min)
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def _progress(self, name, done, total, written, elapsed):
+        rate = done / elapsed if elapsed else 0.0
+        of = f"/{total}" if total else ""
+        self.stdout.write(
+            f"[{name}] {done}{of} satır, {written} yazılacak/yazıldı, {rate:,.0f} satır/s, {elapsed:.1f}s"
+        )
+
+    def _reconcile_progress(self, sheet, done, total, mismatched, elapsed):
+        of = f"/{total}" if total else ""
+        self.stdout.write(
+            f"[{sheet}] {done}{of} satır karşılaştırıldı, {mismatched} satır tek tek incelenecek, {elapsed:.1f}s"
+        )
+
+    def _codes(self, label, codes, verbosity):
+        shown = codes if verbosity > 1 else codes[:50]
+        if shown:
+            self.stdout.write(f"  {label}: " + ", ".join(shown)
+                              + (f" … (+{len(codes) - len(shown)})" if len(codes) > len(shown) else ""))
 
     def handle(self, *args, **options):
-        out = push_all()
+        if options["repair"] and not options["reconcile"]:
+            raise CommandError("--repair yalnızca --reconcile ile kullanılabilir.")
+        if options["reconcile"]:
+            if options["batch_size"] is not None and options["batch_size"] < 1:
+                raise CommandError("--batch-size en az 1 olmalı.")
+            out = reconcile_tickets(repair=options["repair"], block_rows=options["batch_size"],
+                                    progress=self._reconcile_progress)
+            self.stdout.write(
+                f"{len(out['sheets'])} sayfa, {out['rows']} DB satırı / {out['sheet_rows']} sheet satırı, "
+                f"{out['blocks']} blok ({out['mismatched_blocks']} blok uyuşmadı), "
+                f"{out['moved']} satır yeri kaymış, {out['blank']} satırda tracking_code boş."
+            )
+            for key, label in (("missing", "eksik"), ("duplicates", "tekrar eden"),
+                               ("stale", "eski"), ("extra", "DB'de yok")):
+                self._codes(f"{label} ({len(out[key])})", out[key], options["verbosity"])
+            rep = out["repaired"]
+            if rep is not None:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Onarım: {rep['updated']} satır güncellendi, {rep['deleted']} tekrar silindi, "
+                    f"{rep['appended']} eksik eklendi."
+                ))
+            elif out["missing"] or out["duplicates"] or out["stale"]:
+                self.stdout.write(self.style.WARNING("Sapma var; onarmak için --repair ekleyin."))
+            else:
+                self.stdout.write(self.style.SUCCESS("Sheet DB ile uyumlu."))
+            return
+
+        if options["pull"]:
+            out = pull_tickets()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Sheet'ten alım tamamlandı. {out['rows']} satır okundu, {out['changed']} farklı, "
+                    f"{out['applied']} uygulandı, {out['conflicts']} çakışma (DB daha yeni), "
+                    f"{out['invalid']} geçersiz, {out['missing']} DB'de yok ({out['sheets']} sayfa)."
+                )
+            )
+            return
+
+        if options["batch_size"] is not None and options["batch_size"] < 1:
+            raise CommandError("--batch-size en az 1 olmalı.")
+        if options["concurrency"] is not None and options["concurrency"] < 1:
+            raise CommandError("--concurrency en az 1 olmalı.")
+        since = self._since(options["since"])
+        only = (options["only"],) if options["only"] else SHEETS
+
+        if options["incremental"]:
+            if since or options["dry_run"] or options["batch_size"]:
+                raise CommandError("--incremental ile --since / --dry-run / --batch-size birlikte kullanılamaz.")
+            out = push_incremental(only=only, concurrency=options["concurrency"])
+            parts = []
+            if "tickets" in only:
+                parts.append(
+                    f"Tickets: tam yazım ({out['tickets_rows']} satır)" if out["tickets_full"]
+                    else f"Tickets: {out['tickets_updated']} güncellendi, {out['tickets_appended']} eklendi"
+                )
+            if "changes" in only:
+                parts.append(
+                    f"Changes: tam yazım ({out['changes_rows']} satır)" if out["changes_full"]
+                    else f"Changes: {out['changes_appended']} eklendi"
+                )
+            if out.get("rollover"):
+                parts.append(f"arşiv kesimi {out['rollover']}")
+            self.stdout.write(self.style.SUCCESS(f"Artımlı senkron tamamlandı. {'; '.join(parts)}."))
+            return
+
+        out = push_all(
+            full=options["full"], only=only, since=since, block_rows=options["batch_size"],
+            dry_run=options["dry_run"], progress=self._progress, concurrency=options["concurrency"],
+        )
+        parts = []
+        for name, title in (("tickets", "Tickets"), ("changes", "Changes")):
+            if name not in only:
+                continue
+            resumed = out[f"{name}_resumed_from"]
+            parts.append(
+                f"{title}: {out[f'{name}_rows']} satır "
+                f"({out[f'{name}_written']} {'yazılacak' if options['dry_run'] else 'yazıldı'}, "
+                f"{out[f'{name}_skipped']} atlandı"
+                + (f", {resumed}. satırdan devam edildi" if resumed else "")
+                + ")"
+            )
+        if out["rollover"]:
+            parts.append(f"arşiv kesimi {out['rollover']} (eski satırlar aylık sayfalara taşındı)")
+        if options["dry_run"]:
+            for name in only:
+                keys = out[f"{name}_keys"] or []
+                shown = keys if options["verbosity"] > 1 else keys[:50]
+                if shown:
+                    self.stdout.write(f"[{name}] yazılacak: " + ", ".join(shown)
+                                      + (f" … (+{len(keys) - len(shown)})" if len(keys) > len(shown) else ""))
+            self.stdout.write(self.style.WARNING(
+                f"Deneme (dry-run): hiçbir şey yazılmadı. {', '.join(parts)}, "
+                f"~{out['bytes_sent']} bayt gönderilecekti."
+            ))
+            return
         self.stdout.write(
             self.style.SUCCESS(
-                f"Senkron tamamlandı. Tickets: {out['tickets_rows']} satır, Changes: {out['changes_rows']} satır."
+                f"Senkron tamamlandı. {', '.join(parts)}, {out['bytes_sent']} bayt gönderildi."
             )
         )
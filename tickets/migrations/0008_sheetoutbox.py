@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_option_ticketrequest_birth_date_ticketrequest_email_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SheetOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ticket', 'Bilet upsert'), ('change', 'Değişiklik ekleme')], max_length=20)),
+                ('tracking_code', models.CharField(max_length=12)),
+                ('object_id', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Bekliyor'), ('done', 'Yazıldı'), ('dead', 'Başarısız (dead-letter)')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='tickets_she_status_ef8ad3_idx'), models.Index(fields=['tracking_code', 'id'], name='tickets_she_trackin_018374_idx'), models.Index(fields=['processed_at'], name='tickets_she_process_1a0044_idx')],
+            },
+        ),
+    ]
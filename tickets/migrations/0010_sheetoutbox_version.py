@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-16 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_syncstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sheetoutbox',
+            name='version',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='sheetoutbox',
+            index=models.Index(fields=['kind', 'object_id', 'id'], name='tickets_she_kind_68f592_idx'),
+        ),
+    ]
@@ -138,3 +138,64 @@ class ChangeRequest(models.Model):
 
     def __str__(self):
         return f"Değişiklik Talebi: {self.ticket.tracking_code}"
+
+
+class SheetOutbox(models.Model):
+    """
+    Google Sheets'e yazılacak işlerin kalıcı kuyruğu (transactional outbox).
+    Kayıt, TicketRequest/ChangeRequest ile aynı DB transaction'ında yazılır;
+    `manage.py sheets_worker` kuyruğu boşaltır.
+    """
+    KIND_TICKET = "ticket"
+    KIND_CHANGE = "change"
+    KINDS = [
+        (KIND_TICKET, "Bilet upsert"),
+        (KIND_CHANGE, "Değişiklik ekleme"),
+    ]
+    STATUS_PENDING = "pending"
+    STATUS_DONE = "done"
+    STATUS_DEAD = "dead"
+    STATUS = [
+        (STATUS_PENDING, "Bekliyor"),
+        (STATUS_DONE, "Yazıldı"),
+        (STATUS_DEAD, "Başarısız (dead-letter)"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    tracking_code = models.CharField(max_length=12)
+    object_id = models.BigIntegerField()
+    # Bilet satırının içerik hash'i: kuyruğa alınırken görülen, yazıldıktan sonra yazılan hâl
+    version = models.CharField(max_length=16, blank=True, default="")
+    status = models.CharField(max_length=10, choices=STATUS, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["status", "id"]),
+            models.Index(fields=["tracking_code", "id"]),
+            models.Index(fields=["kind", "object_id", "id"]),
+            models.Index(fields=["processed_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.tracking_code} ({self.status})"
+
+
+class SyncState(models.Model):
+    """
+    Sheets senkronu için kalıcı durum (high-water mark vb.).
+    Örn. name="tickets": son push'ta görülen en büyük updated_at.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    mark = models.DateTimeField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.mark or '-'}"
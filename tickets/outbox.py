@@ -0,0 +1,374 @@
+# tickets/outbox.py
+"""
+Google Sheets yazımları için transactional outbox.
+
+View'lar (ve açıksa signals) Google'ı çağırmaz; aynı DB transaction'ı
+içinde SheetOutbox'a bir kayıt düşer. `manage.py sheets_worker` kuyruğu
+boşaltır:
+
+  - view ve signal aynı bileti kuyruğa atsa da her farklı bilet hâli
+    (içerik sürümü) bir kez yazılır (bkz. _enqueue),
+  - aynı tracking_code'un işleri id sırasıyla işlenir; baştaki iş
+    beklemedeyse (retry) arkasındakiler de bekler,
+  - bir partideki işler tek toplu yazımla gider (sheets_batch.BatchWriter):
+    aynı bilete ait upsert'ler birleşir, worker DB'deki güncel hali yazar,
+  - değişiklik talepleri (Changes satırları) kuyrukta daha uzun biriktirilir
+    ve sırasıyla tek çok satırlı append ile eklenir (bkz. _changes_due),
+  - hata alan iş üstel geri çekilmeyle tekrar denenir, SHEETS_OUTBOX_MAX_ATTEMPTS
+    aşılınca 'dead' (dead-letter) olur; admin'den yeniden kuyruğa alınabilir,
+  - Sheets devresi açıkken (sheets_breaker) işler Google'a gitmez; deneme
+    sayılmadan devrenin yeniden deneneceği ana ertelenir.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Min, OuterRef, Q
+from django.utils import timezone
+
+from . import sheets_backend, sheets_breaker, sheets_ratelimit, ticket_rows
+from .sheets_batch import BatchWriter, changes_max_rows, changes_window_seconds, max_rows, window_seconds
+from .models import ChangeRequest, SheetOutbox, TicketRequest
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+# ====== Kuyruğa ekleme (request / signal tarafı) ======
+# View + signal aynı bileti aynı transaction'da birden çok kez kuyruğa
+# atabilir (ör. TICKETS_ENABLE_SIGNALS=1 iken post_save + view). Her iş
+# (kind, object_id) ve içerik sürümüyle (version) anahtarlanır:
+#   - worker'ın henüz almadığı aynı iş varsa (aynı transaction'da açılmış olsa
+#     da) yeni iş açılmaz, yalnızca sürümü güncellenir,
+#   - son yazılan hâl aynı sürümse (ve yolda iş yoksa) yeni iş açılmaz.
+# Google'a yazım zaten commit sonrası worker'da olur; iş kaydı ise
+# atomiklik için çağıranın transaction'ında kalır.
+def _version(row) -> str:
+    return hashlib.blake2b("\x1f".join(row).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def content_version(ticket) -> str:
+    """Biletin sheet satırının içerik hash'i (aynı hâl = aynı sürüm)."""
+    return _version(ticket_rows.ticket_row(ticket))
+
+
+def _enqueue(kind: str, tracking_code: str, object_id: int, version: str = "") -> Optional[SheetOutbox]:
+    if not sheets_backend.enabled():
+        return None
+    with transaction.atomic(savepoint=False):
+        return _enqueue_locked(kind, tracking_code, object_id, version)
+
+
+def _enqueue_locked(kind: str, tracking_code: str, object_id: int, version: str) -> Optional[SheetOutbox]:
+    # Aynı nesneyi kuyruğa atan eşzamanlı transaction'lar sıraya girsin: kaynak
+    # satırı (bilet / değişiklik) kilitlenir. View zaten satırı güncellediyse kilit
+    # onundur; diğeri commit'i bekler ve aşağıdaki kilitli okuma onun işini görür
+    # (REPEATABLE READ'de de). Aksi halde ikisi de "iş yok" görüp iki iş açardı.
+    source = TicketRequest if kind == SheetOutbox.KIND_TICKET else ChangeRequest
+    list(source.objects.select_for_update().filter(pk=object_id).values_list("pk", flat=True))
+
+    # Worker'ın henüz almadığı aynı iş varsa (aynı transaction'da az önce açılan
+    # dahil) o iş güncel hali zaten yazacak. UPDATE satırı commit'e kadar kilitler:
+    # worker işi bu transaction bitince alır. Geri alınan savepoint'in işi de bu
+    # sorguda görünmez; transaction dışında tutulan bir kayıt yoktur.
+    job = None
+    pending = SheetOutbox.objects.filter(
+        kind=kind, object_id=object_id,
+        status=SheetOutbox.STATUS_PENDING, locked_until__isnull=True,
+    )
+    job_id = pending.select_for_update().values_list("id", flat=True).first()
+    if job_id is None or not pending.filter(pk=job_id).update(version=version):
+        last = (
+            SheetOutbox.objects.filter(kind=kind, object_id=object_id)
+            .exclude(status=SheetOutbox.STATUS_DEAD)
+            .order_by("-id")
+            .values_list("status", "version")
+            .first()
+        )
+        # Yolda (worker'ın aldığı) iş yoksa ve son yazılan hâl aynıysa yazılacak bir
+        # şey yok. Değişiklik satırlarının sürümü boştur: yalnızca bir kez eklenir.
+        if last is not None and last == (SheetOutbox.STATUS_DONE, version):
+            return None
+        job = SheetOutbox.objects.create(
+            kind=kind, tracking_code=tracking_code, object_id=object_id, version=version
+        )
+    return job
+
+
+def enqueue_ticket(ticket) -> Optional[SheetOutbox]:
+    """Biletin sheet'e yazılmasını kuyruğa al. Çağıranın transaction'ında çalışır."""
+    return _enqueue(SheetOutbox.KIND_TICKET, ticket.tracking_code, ticket.pk, content_version(ticket))
+
+
+def enqueue_change(change) -> Optional[SheetOutbox]:
+    """Değişiklik talebinin Changes sayfasına eklenmesini kuyruğa al."""
+    return _enqueue(SheetOutbox.KIND_CHANGE, change.ticket.tracking_code, change.pk)
+
+
+# ====== Worker tarafı ======
+def _retry_delay(attempts: int) -> timedelta:
+    base = float(_setting("SHEETS_OUTBOX_RETRY_BASE_SECONDS", 5))
+    cap = float(_setting("SHEETS_OUTBOX_RETRY_MAX_SECONDS", 900))
+    return timedelta(seconds=min(cap, base * (2 ** max(0, attempts - 1))))
+
+
+def _claim(item: SheetOutbox, now) -> bool:
+    """Başka bir worker almadıysa işi kısa süreliğine kilitle (lease)."""
+    lease = now + timedelta(seconds=float(_setting("SHEETS_OUTBOX_LEASE_SECONDS", 120)))
+    return bool(
+        SheetOutbox.objects.filter(pk=item.pk, status=SheetOutbox.STATUS_PENDING)
+        .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+        .update(locked_until=lease)
+    )
+
+
+def _push(item: SheetOutbox) -> None:
+    """Tek işi yaz (toplu yazım başarısız olursa hatalı işi ayıklamak için)."""
+    if item.kind == SheetOutbox.KIND_TICKET:
+        ticket = (
+            TicketRequest.objects.select_related("purchased_by", "rejected_by")
+            .filter(pk=item.object_id)
+            .first()
+        )
+        if ticket is None:
+            return  # bilet silinmiş; yazılacak bir şey yok
+        # Tekrar denemede çift satır olmasın diye her zaman upsert
+        resp = sheets_backend.sheet_update(ticket)
+        item.version = content_version(ticket)
+    else:
+        change = ChangeRequest.objects.select_related("ticket").filter(pk=item.object_id).first()
+        if change is None:
+            return
+        resp = sheets_backend.sheet_change_append(change)
+    if resp is None:
+        raise RuntimeError("Sheet backend bulunamadı (gsheets/sheets_api yok).")
+
+
+def _push_batch(items) -> None:
+    """İşleri tek BatchWriter flush'ı ile yaz (worksheet başına tek çağrı)."""
+    ticket_ids = [i.object_id for i in items if i.kind == SheetOutbox.KIND_TICKET]
+    change_ids = [i.object_id for i in items if i.kind == SheetOutbox.KIND_CHANGE]
+    tickets = (
+        TicketRequest.objects.select_related("purchased_by", "rejected_by").in_bulk(ticket_ids)
+        if ticket_ids else {}
+    )
+    changes = ChangeRequest.objects.select_related("ticket").in_bulk(change_ids) if change_ids else {}
+
+    writer = BatchWriter(limit=len(items) + 1)
+    for item in items:
+        if item.kind == SheetOutbox.KIND_TICKET:
+            obj = tickets.get(item.object_id)
+            if obj is not None:
+                writer.add_ticket(obj)
+                item.version = content_version(obj)
+        else:
+            obj = changes.get(item.object_id)
+            if obj is not None:
+                writer.add_change(obj)
+    if len(writer) and writer.flush() is None:
+        raise RuntimeError("Sheet backend bulunamadı (gsheets/sheets_api yok).")
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Kota / sunucu / ağ hataları: toplu işi bölmeye gerek yok, sonra tekrar denenir."""
+    return sheets_ratelimit.is_retryable(exc)
+
+
+def _mark_done_many(items) -> None:
+    now = timezone.now()
+    SheetOutbox.objects.filter(pk__in=[i.pk for i in items]).update(
+        status=SheetOutbox.STATUS_DONE, processed_at=now, locked_until=None, last_error=""
+    )
+    # Sürüm = sheet'e gerçekten yazılan hâl (kuyruğa alındıktan sonra değişmiş olabilir)
+    tickets = [i for i in items if i.kind == SheetOutbox.KIND_TICKET]
+    if tickets:
+        SheetOutbox.objects.bulk_update(tickets, ["version"])
+
+
+def _defer(items, exc: sheets_breaker.CircuitOpenError) -> None:
+    """Devre açık: işleri deneme saymadan devrenin yeniden deneneceği ana ertele."""
+    when = datetime.fromtimestamp(exc.retry_at, tz=dt_timezone.utc)
+    SheetOutbox.objects.filter(pk__in=[i.pk for i in items]).update(
+        next_attempt_at=when, locked_until=None
+    )
+
+
+def _mark_failed(item: SheetOutbox, exc: Exception) -> bool:
+    """Hata kaydı; dead-letter olduysa True."""
+    now = timezone.now()
+    attempts = item.attempts + 1
+    max_attempts = int(_setting("SHEETS_OUTBOX_MAX_ATTEMPTS", 8))
+    dead = attempts >= max_attempts
+    SheetOutbox.objects.filter(pk=item.pk).update(
+        attempts=attempts,
+        status=SheetOutbox.STATUS_DEAD if dead else SheetOutbox.STATUS_PENDING,
+        next_attempt_at=None if dead else now + _retry_delay(attempts),
+        locked_until=None,
+        last_error=f"{type(exc).__name__}: {exc}"[:2000],
+        processed_at=now if dead else None,
+    )
+    return dead
+
+
+def _changes_due(changes, now, batch_size: int) -> bool:
+    """Biriken Changes işleri gönderilmeli mi (satır sayısı ya da en eskinin yaşı)?"""
+    if len(changes) >= min(batch_size, changes_max_rows()):
+        return True
+    return min(i.created_at for i in changes) <= now - timedelta(seconds=changes_window_seconds())
+
+
+def drain(batch_size: Optional[int] = None, wait_for_batch: bool = True) -> dict:
+    """
+    Bekleyen işlerden bir parti işle ve tek toplu yazımla gönder.
+    Parti SHEETS_BATCH_MAX_ROWS'a ulaşmadıysa ve en eski iş
+    SHEETS_BATCH_WINDOW_SECONDS'tan gençse biraz daha beklenir.
+    Dönüş: {'done', 'failed', 'dead', 'skipped', 'waiting', 'deferred'}.
+    """
+    batch_size = batch_size or int(_setting("SHEETS_WORKER_BATCH_SIZE", 50))
+    now = timezone.now()
+    result = {"done": 0, "failed": 0, "dead": 0, "skipped": 0, "waiting": 0, "deferred": 0}
+
+    # 1) Sırası gelmiş işleri SQL'de seç: kilitli (lease) ya da tekrar denemesini
+    # bekleyen işler ve -sıra bozulmasın diye- aynı kodda onların arkasındaki işler
+    # dilimden önce elenir; kuyruğun başı bekleyen işlerle dolsa da parti boş kalmaz.
+    not_ready = Q(locked_until__gt=now) | Q(next_attempt_at__gt=now)
+    waiting_before = SheetOutbox.objects.filter(
+        not_ready, status=SheetOutbox.STATUS_PENDING,
+        tracking_code=OuterRef("tracking_code"), id__lt=OuterRef("id"),
+    )
+    ready = list(
+        SheetOutbox.objects.filter(status=SheetOutbox.STATUS_PENDING)
+        .exclude(not_ready)
+        .exclude(Exists(waiting_before))
+        .order_by("id")[:batch_size]
+    )
+    blocked = set()
+
+    # 1b) Changes satırları ayrı tamponda birikir: SHEETS_CHANGES_FLUSH_ROWS satıra
+    # ulaşınca ya da en eskisi SHEETS_CHANGES_FLUSH_SECONDS'ı geçince tek append ile
+    # gider. Bekleyen değişiklik aynı koddaki bilet işlerini bekletmez (ayrı sayfa).
+    changes = [i for i in ready if i.kind == SheetOutbox.KIND_CHANGE]
+    if changes and wait_for_batch and not _changes_due(changes, now, batch_size):
+        ready = [i for i in ready if i.kind != SheetOutbox.KIND_CHANGE]
+        result["waiting"] += len(changes)
+    if not ready:
+        return result
+
+    # 2) Pencere: parti dolmadıysa biraz daha biriksin
+    window = timedelta(seconds=window_seconds())
+    if (wait_for_batch and len(ready) < min(batch_size, max_rows())
+            and min(i.created_at for i in ready) > now - window):
+        result["waiting"] += len(ready)
+        return result
+
+    # 3) Kilitle (lease)
+    claimed = []
+    for item in ready:
+        if item.tracking_code in blocked:
+            continue
+        if _claim(item, now):
+            claimed.append(item)
+        else:
+            blocked.add(item.tracking_code)
+            result["skipped"] += 1
+    if not claimed:
+        return result
+
+    # 4) Toplu yaz; kalıcı bir hata varsa işleri tek tek deneyip hatalıyı ayıkla
+    try:
+        _push_batch(claimed)
+    except sheets_breaker.CircuitOpenError as e:
+        _defer(claimed, e)
+        result["deferred"] += len(claimed)
+        return result
+    except Exception as e:
+        if len(claimed) > 1 and not _is_transient(e):
+            logger.warning("Toplu Sheets yazımı başarısız (%s); işler tek tek deneniyor.", e)
+            _push_one_by_one(claimed, result)
+            return result
+        logger.exception("Toplu Sheets yazımı başarısız (%d iş)", len(claimed))
+        for item in claimed:
+            if _mark_failed(item, e):
+                result["dead"] += 1
+            else:
+                result["failed"] += 1
+        return result
+
+    _mark_done_many(claimed)
+    result["done"] += len(claimed)
+    return result
+
+
+def _push_one_by_one(items, result: dict) -> None:
+    failed_codes = set()
+    for n, item in enumerate(items):
+        if item.tracking_code in failed_codes:
+            # aynı kodun önceki işi başarısız: sıra korunsun, bu iş de beklesin
+            SheetOutbox.objects.filter(pk=item.pk).update(locked_until=None)
+            result["skipped"] += 1
+            continue
+        try:
+            _push(item)
+        except sheets_breaker.CircuitOpenError as e:
+            # Tek tek denerken devre açıldı: kalanlar deneme sayılmadan bekler
+            _defer(items[n:], e)
+            result["deferred"] += len(items) - n
+            return
+        except Exception as e:
+            logger.exception("Outbox işi başarısız: %s", item)
+            failed_codes.add(item.tracking_code)
+            if _mark_failed(item, e):
+                result["dead"] += 1
+            else:
+                result["failed"] += 1
+            continue
+        _mark_done_many([item])
+        result["done"] += 1
+
+
+def queue_stats() -> dict:
+    """Kuyruk derinliği ve gecikme (lag) bilgisi."""
+    now = timezone.now()
+    qs = SheetOutbox.objects
+    pending = qs.filter(status=SheetOutbox.STATUS_PENDING)
+    oldest = pending.aggregate(m=Min("created_at"))["m"]
+    last_done = (
+        qs.filter(status=SheetOutbox.STATUS_DONE)
+        .order_by("-processed_at")
+        .values_list("processed_at", flat=True)
+        .first()
+    )
+    return {
+        "pending": pending.count(),
+        "retrying": pending.filter(attempts__gt=0).count(),
+        "dead": qs.filter(status=SheetOutbox.STATUS_DEAD).count(),
+        "lag_seconds": (now - oldest).total_seconds() if oldest else 0.0,
+        "last_done_at": last_done,
+    }
+
+
+def purge_done(older_than_hours: Optional[float] = None) -> int:
+    """Eski 'done' kayıtlarını sil (tablo şişmesin)."""
+    hours = float(older_than_hours if older_than_hours is not None
+                  else _setting("SHEETS_OUTBOX_KEEP_DONE_HOURS", 24))
+    cutoff = timezone.now() - timedelta(hours=hours)
+    deleted, _ = SheetOutbox.objects.filter(
+        status=SheetOutbox.STATUS_DONE, processed_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def requeue(queryset) -> int:
+    """Dead-letter işleri yeniden kuyruğa al."""
+    return queryset.filter(status=SheetOutbox.STATUS_DEAD).update(
+        status=SheetOutbox.STATUS_PENDING, attempts=0, next_attempt_at=None,
+        locked_until=None, processed_at=None,
+    )
@@ -1,16 +1,14 @@
 # tickets/sheets_api.py
-import os
-import json
 import logging
 from decimal import Decimal
+from functools import partial
 from django.conf import settings
-import base64
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
+
+from . import google_client, sheets_async, sheets_index, sheets_shards, ticket_rows
 
 logger = logging.getLogger(__name__)
 
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+SCOPES = google_client.SCOPES
 SPREADSHEET_ID = settings.GOOGLE_SHEETS_SPREADSHEET_ID
 TICKETS_SHEET = "Tickets"
 CHANGES_SHEET = "Changes"
@@ -40,26 +38,10 @@ HEADERS = [
     "rejected_by",
     "rejection_reason",
 ]
-
-def _creds():
-    """Service Account cred'lerini hem FILE hem INFO'dan destekle."""
-    if getattr(settings, "GOOGLE_SERVICE_ACCOUNT_INFO_B64", "").strip():
-        info_b64 = settings.GOOGLE_SERVICE_ACCOUNT_INFO_B64.strip()
-        info = json.loads(base64.b64decode(info_b64).decode("utf-8"))
-        print(info)
-        return Credentials.from_service_account_info(info, scopes=SCOPES)
-
-    if getattr(settings, "GOOGLE_SERVICE_ACCOUNT_FILE", ""):
-        return Credentials.from_service_account_file(
-            settings.GOOGLE_SERVICE_ACCOUNT_FILE, scopes=SCOPES
-        )
-    if getattr(settings, "GOOGLE_SERVICE_ACCOUNT_INFO", ""):
-        info = json.loads(settings.GOOGLE_SERVICE_ACCOUNT_INFO)
-        return Credentials.from_service_account_info(info, scopes=SCOPES)
-    raise RuntimeError("Service Account bilgisi yok. .env ayarlarını kontrol et.")
+_ROW = ticket_rows.serializer(HEADERS)
 
 def _service():
-    return build("sheets", "v4", credentials=_creds(), cache_discovery=False)
+    return google_client.sheets_service()
 
 def _to_str(x):
     if x is None:
@@ -70,31 +52,7 @@ def _to_str(x):
 
 def _row_from_ticket(t):
     """Model -> Sheet satırı (HEADERS sırasına göre)."""
-    get = {
-        "tracking_code": lambda: t.tracking_code,
-        "user_type": lambda: t.user_type,
-        "full_name": lambda: t.full_name,
-        "tc_no": lambda: t.tc_no,
-        "phone": lambda: t.phone,
-        "origin": lambda: t.origin,
-        "destination": lambda: t.destination,
-        "travel_date": lambda: t.travel_date or "",
-        "departure_time": lambda: t.departure_time or "",
-        "return_destination": lambda: t.return_destination or "",
-        "return_date": lambda: t.return_date or "",
-        "return_time": lambda: t.return_time or "",
-        "reason": lambda: t.reason,
-        "reason_other": lambda: t.reason_other or "",
-        "preferred_airline": lambda: t.preferred_airline or "",
-        "transport": lambda: t.transport,
-        "status": lambda: t.status,
-        "pnr_code": lambda: t.pnr_code or "",
-        "created_at": lambda: t.created_at,  # datetime; str() ile ISO gibi gidecek
-        "purchased_by": lambda: (t.purchased_by.get_full_name() if t.purchased_by else ""),
-        "rejected_by": lambda: (t.rejected_by.get_full_name() if getattr(t, "rejected_by", None) else ""),
-        "rejection_reason": lambda: (t.rejection_reason or "") if hasattr(t, "rejection_reason") else "",
-    }
-    return [_to_str(get[k]()) for k in HEADERS]
+    return _ROW.from_instance(t)
 
 def _col_letter(n: int) -> str:
     """1->A, 26->Z, 27->AA ..."""
@@ -104,34 +62,36 @@ def _col_letter(n: int) -> str:
         s = chr(65 + r) + s
     return s
 
-def _find_ticket_row_index(service, tracking_code: str) -> int:
-    """Tracking code'un satır numarasını bul (yoksa -1)."""
+def _ticket_sheet(ticket, resolve=None) -> str:
+    """Biletin bulunduğu sayfa: sharding açıksa canlı ya da aylık arşiv (bkz. sheets_shards)."""
+    sheet = (resolve or sheets_shards.ticket_sheet)(ticket)
+    return TICKETS_SHEET if sheet == sheets_shards.tickets_sheet() else sheet
+
+def _find_ticket_row_index(service, tracking_code: str, sheet: str = TICKETS_SHEET) -> int:
+    """Tracking code'un satır numarasını bul (yoksa -1). Önbellekli indeks kullanır."""
     if not tracking_code:
         return -1
-    col = "A"  # tracking_code = A sütunu varsayımı
-    rng = f"{TICKETS_SHEET}!{col}2:{col}"  # A2:A
-    res = service.spreadsheets().values().get(
-        spreadsheetId=SPREADSHEET_ID, range=rng
-    ).execute()
-    vals = res.get("values", [])
-    for i, row in enumerate(vals, start=2):
-        if row and str(row[0]).strip().upper() == str(tracking_code).strip().upper():
-            return i
-    return -1
+    # tracking_code = A sütunu varsayımı
+    row = sheets_index.get_index(SPREADSHEET_ID, sheet, "A").lookup(
+        service, SPREADSHEET_ID, tracking_code
+    )
+    return -1 if row is None else row
 
 # --------- Public API (views.py bunları çağırıyor) ---------
 
 def create_ticket(ticket):
     """Yeni satır ekle. tracking_code boşsa olduğu gibi yazar (otomatik üretim gerekiyorsa Django tarafında)."""
     srv = _service()
+    sheet = _ticket_sheet(ticket)
     body = {"values": [_row_from_ticket(ticket)]}
     res = srv.spreadsheets().values().append(
         spreadsheetId=SPREADSHEET_ID,
-        range=f"{TICKETS_SHEET}!A:Z",
+        range=f"{sheet}!A:Z",
         valueInputOption="USER_ENTERED",
         insertDataOption="INSERT_ROWS",
         body=body,
     ).execute()
+    sheets_index.get_index(SPREADSHEET_ID, sheet, "A").record_append(ticket.tracking_code, res)
     logger.warning("Sheets APPEND: %s", res)
     # Service API tracking_code üretmez; Apps Script'teki gibi geri dönmüyoruz.
     return {"ok": True}
@@ -139,40 +99,46 @@ def create_ticket(ticket):
 def update_ticket(ticket):
     """tracking_code'a göre satırı güncelle; yoksa append (upsert)."""
     srv = _service()
-    row_idx = _find_ticket_row_index(srv, ticket.tracking_code)
+    sheet = _ticket_sheet(ticket)
+    row_idx = _find_ticket_row_index(srv, ticket.tracking_code, sheet)
     values = [_row_from_ticket(ticket)]
     last_col = _col_letter(len(HEADERS))  # 22 -> 'V'
     if row_idx == -1:
         # yoksa ekle
         res = srv.spreadsheets().values().append(
             spreadsheetId=SPREADSHEET_ID,
-            range=f"{TICKETS_SHEET}!A:Z",
+            range=f"{sheet}!A:Z",
             valueInputOption="USER_ENTERED",
             insertDataOption="INSERT_ROWS",
             body={"values": values},
         ).execute()
+        sheets_index.get_index(SPREADSHEET_ID, sheet, "A").record_append(ticket.tracking_code, res)
         logger.warning("Sheets UPSERT(APPEND): %s", res)
         return {"ok": True, "appended": True}
     else:
         # var olan satırı güncelle
-        rng = f"{TICKETS_SHEET}!A{row_idx}:{last_col}{row_idx}"
+        rng = f"{sheet}!A{row_idx}:{last_col}{row_idx}"
         res = srv.spreadsheets().values().update(
             spreadsheetId=SPREADSHEET_ID,
             range=rng,
             valueInputOption="USER_ENTERED",
             body={"values": values},
         ).execute()
+        sheets_index.get_index(SPREADSHEET_ID, sheet, "A").record(ticket.tracking_code, row_idx)
         logger.warning("Sheets UPDATE row=%s: %s", row_idx, res)
         return {"ok": True, "updated": True, "row": row_idx}
 
-def create_change(change):
-    """Changes sheet'ine basit append."""
-    srv = _service()
-    vals = [[
+def _change_row(change):
+    return [
         str(change.ticket.tracking_code),
         str(change.reason or ""),
         _to_str(change.created_at),
-    ]]
+    ]
+
+def create_change(change):
+    """Changes sheet'ine basit append."""
+    srv = _service()
+    vals = [_change_row(change)]
     res = srv.spreadsheets().values().append(
         spreadsheetId=SPREADSHEET_ID,
         range=f"{CHANGES_SHEET}!A:C",
@@ -182,3 +148,81 @@ def create_change(change):
     ).execute()
     logger.warning("Sheets CHANGE APPEND: %s", res)
     return {"ok": True}
+
+def write_batch(tickets, changes):
+    """
+    Toplu yazım: bilinen satırlar tek values().batchUpdate, yeni biletler
+    sayfa başına tek çok satırlı append, değişiklikler tek append. Bilet
+    çağrıları birbirinden bağımsızdır; sheets_async üzerinden eşzamanlı gider.
+    Changes append'i (idempotent değil) yalnızca bilet yazımları başarılı
+    olunca gönderilir: outbox'un yeniden denemesi değişiklik satırlarını çift eklemez.
+    """
+    srv = _service()
+    last_col = _col_letter(len(HEADERS))
+    # Sayfa (shard) başına: bilinen satırlar batchUpdate'e, yeniler o sayfaya tek append
+    data, updated, appends = [], [], {}
+    resolve = sheets_shards.ticket_resolver()
+    by_sheet = {}
+    for t in tickets:
+        by_sheet.setdefault(_ticket_sheet(t, resolve), []).append(t)
+    # Sayfa başına tüm kodlar tek seferde çözülür (en fazla bir sütun okuması)
+    rows_of = {
+        sheet: sheets_index.get_index(SPREADSHEET_ID, sheet, "A").lookup_many(
+            srv, SPREADSHEET_ID, [t.tracking_code for t in group]
+        )
+        for sheet, group in by_sheet.items()
+    }
+    for sheet, group in by_sheet.items():
+        for t in group:
+            row_idx = rows_of[sheet].get(str(t.tracking_code or "").strip().upper())
+            if row_idx is None:
+                rows, codes = appends.setdefault(sheet, ([], []))
+                rows.append(_row_from_ticket(t))
+                codes.append(t.tracking_code)
+            else:
+                data.append({"range": f"{sheet}!A{row_idx}:{last_col}{row_idx}",
+                             "values": [_row_from_ticket(t)]})
+                updated.append((sheet, t.tracking_code, row_idx))
+    change_rows = [_change_row(c) for c in changes]
+
+    # Havuz thread'lerinde çalışır: yalnızca hazır satırlar, DB erişimi yok
+    def update_known():
+        _service().spreadsheets().values().batchUpdate(
+            spreadsheetId=SPREADSHEET_ID,
+            body={"valueInputOption": "USER_ENTERED", "data": data},
+        ).execute()
+        for sheet, code, row_idx in updated:
+            sheets_index.get_index(SPREADSHEET_ID, sheet, "A").record(code, row_idx)
+
+    def append_new(sheet, rows, codes):
+        res = _service().spreadsheets().values().append(
+            spreadsheetId=SPREADSHEET_ID,
+            range=f"{sheet}!A:Z",
+            valueInputOption="USER_ENTERED",
+            insertDataOption="INSERT_ROWS",
+            body={"values": rows},
+        ).execute()
+        sheets_index.get_index(SPREADSHEET_ID, sheet, "A").record_append_many(codes, res)
+
+    def append_changes():
+        _service().spreadsheets().values().append(
+            spreadsheetId=SPREADSHEET_ID,
+            range=f"{CHANGES_SHEET}!A:C",
+            valueInputOption="USER_ENTERED",
+            insertDataOption="INSERT_ROWS",
+            body={"values": change_rows},
+        ).execute()
+
+    calls = [update_known] if data else []
+    calls += [partial(append_new, sheet, rows, codes) for sheet, (rows, codes) in appends.items()]
+    pool = sheets_async.client()
+    if pool is not None:
+        pool.gather(calls)
+    else:
+        for fn in calls:
+            fn()
+    if change_rows:
+        append_changes()
+    appended = sum(len(rows) for rows, _ in appends.values())
+    logger.warning("Sheets BATCH: %s update, %s append, %s change", len(data), appended, len(changes))
+    return {"ok": True, "updated": len(data), "appended": appended, "changes": len(changes)}
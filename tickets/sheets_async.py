@@ -0,0 +1,181 @@
+# tickets/sheets_async.py
+"""
+Google Sheets çağrıları için asyncio tabanlı, eşzamanlılığı sınırlı istemci.
+
+Eskiden gsheets / sheets_api / sheets_sync'teki tüm Sheets G/Ç'si sıralıydı:
+push_all önce Tickets'ı sonra Changes'i, blok blok ve her bloğun yanıtını
+bekleyerek yazıyordu; worker'ın toplu yazımında her worksheet'in çağrısı bir
+öncekini bekliyordu. Artık:
+
+  - istemci kendi thread'inde bir olay döngüsü (event loop) çalıştırır;
+    mevcut (bloklayan) gspread / googleapiclient çağrıları
+    SHEETS_ASYNC_CONCURRENCY thread'lik bir havuzda, asyncio.Semaphore ile
+    sınırlanarak yürür,
+  - hız sınırı değişmez: her HTTP isteği yine sheets_ratelimit'ten geçer
+    (token bucket süreçler arasında paylaşılır). Eşzamanlılık kotayı artırmaz,
+    yalnızca ağ gecikmesini örter; kota dolunca istekler bucket'ta bekler,
+  - senkron kod submit() (concurrent.futures.Future) ve gather() kullanır,
+    olay döngüsündeki kod `await call(...)`; jobs() bağımsız işleri (ör.
+    farklı worksheet'ler) ayrı thread'lerde çalıştırır (DB okuyabilirler,
+    bağlantıları iş bitince kapatılır),
+  - SHEETS_ASYNC_CONCURRENCY=1 eski sıralı yoldur; karşılaştırma:
+    `manage.py sheets_bench --concurrency N`.
+
+Havuz thread'leri DB'ye dokunmamalı: satırlar çağıran thread'de hazırlanır.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, connections
+
+_lock = threading.Lock()
+_clients: Dict[int, "AsyncSheetsClient"] = {}
+
+
+def concurrency() -> int:
+    return max(1, int(getattr(settings, "SHEETS_ASYNC_CONCURRENCY", 4)))
+
+
+class AsyncSheetsClient:
+    """
+    Aynı anda en fazla `concurrency` Sheets çağrısı. Olay döngüsü ve thread
+    havuzu ilk kullanımda kurulur; close() ile kapatılır (with bloğu da olur).
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self.concurrency = max(1, int(size or concurrency()))
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self.stats = {"calls": 0, "jobs": 0, "peak": 0}
+        self._active = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---- olay döngüsü ----
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="sheets-io")
+                self._sem = asyncio.Semaphore(self.concurrency)
+                self._thread = threading.Thread(target=loop.run_forever, name="sheets-async", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def close(self) -> None:
+        with self._lock:
+            loop, thread, pool = self._loop, self._thread, self._pool
+            self._loop = self._thread = self._pool = self._sem = None
+        if loop is None:
+            return
+        # Yoldaki çağrılar bitsin (sonuçlarını bekleyen olmasa da yazım yarıda kalmasın)
+        asyncio.run_coroutine_threadsafe(_drain(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        pool.shutdown(wait=True)
+
+    # ---- çağrılar ----
+    async def call(self, fn: Callable, *args, **kwargs):
+        """fn(*args, **kwargs)'ı havuzda çalıştır (istemcinin olay döngüsünde await edilir)."""
+        async with self._sem:
+            self._active += 1
+            self.stats["calls"] += 1
+            self.stats["peak"] = max(self.stats["peak"], self._active)
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+            finally:
+                self._active -= 1
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Senkron koddan: çağrıyı kuyruğa al, hemen Future dön."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.call(fn, *args, **kwargs), loop)
+
+    def gather(self, calls: Iterable[Callable]) -> List:
+        """Argümansız çağrıları eşzamanlı çalıştır; sonuçlar aynı sırada. İlk hata yükselir."""
+        futures = [self.submit(fn) for fn in calls]
+        return [f.result() for f in futures]
+
+    def jobs(self, fns: Iterable[Callable]) -> List:
+        """
+        Bağımsız işleri (kendi içinde submit() edebilen, DB okuyan) ayrı
+        thread'lerde çalıştır; sonuçlar aynı sırada. İş thread'leri havuzu
+        tüketmez, yalnızca içlerindeki Sheets çağrıları sınırlanır.
+        Çağıran bir atomic blok içindeyse işler sırayla bu thread'de çalışır
+        (başka thread'in bağlantısı transaction'ı görmez).
+        """
+        fns = list(fns)
+        if len(fns) < 2 or self.concurrency < 2 or connection.in_atomic_block:
+            return [fn() for fn in fns]
+        self.stats["jobs"] += len(fns)
+        futures: List[Future] = []
+        for fn in fns:
+            fut: Future = Future()
+            threading.Thread(target=_run_job, args=(fn, fut), name="sheets-job", daemon=True).start()
+            futures.append(fut)
+        return [f.result() for f in futures]
+
+
+async def _drain() -> None:
+    tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _run_job(fn: Callable, fut: Future) -> None:
+    try:
+        fut.set_result(fn())
+    except BaseException as e:  # noqa: BLE001 - çağırana taşınır
+        fut.set_exception(e)
+    finally:
+        connections.close_all()  # yalnızca bu thread'in bağlantıları
+
+
+def client(size: Optional[int] = None) -> Optional[AsyncSheetsClient]:
+    """
+    Süreçte eşzamanlılık değeri başına paylaşılan istemci (varsayılan
+    SHEETS_ASYNC_CONCURRENCY). Eşzamanlılık 1 ise None: eski sıralı yol.
+    """
+    n = max(1, int(size or concurrency()))
+    if n < 2:
+        return None
+    with _lock:
+        c = _clients.get(n)
+        if c is None:
+            c = _clients[n] = AsyncSheetsClient(n)
+        return c
+
+
+def stats() -> dict:
+    """Süreçteki istemcilerin toplamı: çağrı, iş ve aynı anda yoldaki en yüksek çağrı sayısı."""
+    with _lock:
+        clients = list(_clients.values())
+    out = {"clients": len(clients), "calls": 0, "jobs": 0, "peak": 0}
+    for c in clients:
+        out["calls"] += c.stats["calls"]
+        out["jobs"] += c.stats["jobs"]
+        out["peak"] = max(out["peak"], c.stats["peak"])
+    return out
+
+
+def reset() -> None:
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for c in clients:
+        c.close()
@@ -0,0 +1,92 @@
+# tickets/sheets_backend.py
+"""
+Sheet backend'i otomatik seç (önce Service Account, sonra Apps Script).
+
+Eskiden views.py içindeydi; HTTP isteği artık Google'ı beklemediği için
+bu çağrıları yalnızca outbox worker'ı (tickets.outbox) yapıyor.
+Yazım çağrıları devre kesiciden (tickets.sheets_breaker) geçer: Google /
+credential çökükken CircuitOpenError ile hemen düşerler.
+"""
+from __future__ import annotations
+
+import logging
+
+from django.conf import settings
+
+from tickets import sheets_breaker
+
+logger = logging.getLogger(__name__)
+
+_gs = None
+_apps = None
+try:
+    from tickets import gsheets as _gs  # Service Account tabanlı
+except Exception:
+    logger.exception("gsheets backend'i yüklenemedi")
+    _gs = None
+
+
+try:
+    from tickets import sheets_api as _apps
+except Exception:
+    logger.exception("sheets_api backend'i yüklenemedi")
+    _apps = None
+
+
+def backend_name() -> str:
+    if _gs:
+        return "gsheets"
+    if _apps:
+        return "sheets_api"
+    return ""
+
+
+def enabled() -> bool:
+    """Backend yüklü ve spreadsheet tanımlı mı?"""
+    return bool(backend_name()) and bool(
+        (getattr(settings, "GOOGLE_SHEETS_SPREADSHEET_ID", "") or "").strip()
+    )
+
+
+@sheets_breaker.guarded
+def sheet_create(ticket) -> dict | None:
+    """Yeni kayıt/insert. (gsheets: upsert, apps: create)"""
+    if _gs:
+        return _gs.upsert_ticket(ticket)
+    if _apps:
+        return _apps.create_ticket(ticket)
+    logger.warning("Sheet backend bulunamadı (gsheets/sheets_api yok).")
+    return None
+
+
+@sheets_breaker.guarded
+def sheet_update(ticket) -> dict | None:
+    """Güncelleme/upsert."""
+    if _gs:
+        return _gs.upsert_ticket(ticket)
+    if _apps:
+        return _apps.update_ticket(ticket)
+    logger.warning("Sheet backend bulunamadı (gsheets/sheets_api yok).")
+    return None
+
+
+@sheets_breaker.guarded
+def sheet_change_append(change) -> dict | None:
+    """Changes sekmesine ekle."""
+    if _gs:
+        return _gs.append_change(change)
+    if _apps:
+        return _apps.create_change(change)
+    logger.warning("Sheet backend bulunamadı (gsheets/sheets_api yok).")
+    return None
+
+
+@sheets_breaker.guarded
+def sheet_batch(tickets, changes) -> dict | None:
+    """Toplu yazım (bilet upsert'leri + değişiklik eklemeleri tek seferde)."""
+    if _gs:
+        return _gs.write_batch(tickets, changes)
+    if _apps:
+        return _apps.write_batch(tickets, changes)
+    logger.warning("Sheet backend bulunamadı (gsheets/sheets_api yok).")
+    return None
@@ -0,0 +1,106 @@
+# tickets/sheets_batch.py
+"""
+Sheets yazımlarını biriktirip tek seferde gönderen yazıcı.
+
+Her bilet değişikliği ayrı bir values().update/append, her değişiklik
+talebi ayrı bir append olunca yoğun saatlerde dakikalık yazma kotası
+hızla tükeniyordu. BatchWriter:
+
+  - bilet upsert'lerini tracking_code başına birleştirir (en yeni hal kalır),
+  - değişiklikleri geliş sırasıyla tutar,
+  - SHEETS_BATCH_MAX_ROWS satıra ulaşınca ya da ilk kayıttan bu yana
+    SHEETS_BATCH_WINDOW_SECONDS geçince due() olur,
+  - flush() ile worksheet başına tek batchUpdate + tek çok satırlı append yapar.
+"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+
+from . import sheets_backend
+
+
+def max_rows() -> int:
+    return int(getattr(settings, "SHEETS_BATCH_MAX_ROWS", 100))
+
+
+def window_seconds() -> float:
+    return float(getattr(settings, "SHEETS_BATCH_WINDOW_SECONDS", 1.0))
+
+
+def changes_max_rows() -> int:
+    """Changes tamponu bu kadar satıra ulaşınca gönderilir (outbox.drain)."""
+    return int(getattr(settings, "SHEETS_CHANGES_FLUSH_ROWS", 100))
+
+
+def changes_window_seconds() -> float:
+    """... ya da en eski satır bu kadar saniyedir bekliyorsa."""
+    return float(getattr(settings, "SHEETS_CHANGES_FLUSH_SECONDS", 10.0))
+
+
+class BatchWriter:
+    def __init__(self, limit: Optional[int] = None, window: Optional[float] = None):
+        self.max_rows = limit or max_rows()
+        self.window = window_seconds() if window is None else window
+        self._tickets: "OrderedDict[str, object]" = OrderedDict()
+        self._changes: list = []
+        self._opened_at: Optional[float] = None
+        self.stats = {"merged": 0, "flushes": 0, "tickets": 0, "changes": 0}
+
+    def __len__(self) -> int:
+        return len(self._tickets) + len(self._changes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and len(self):
+            self.flush()
+
+    def _touch(self) -> None:
+        if self._opened_at is None:
+            self._opened_at = time.monotonic()
+
+    def add_ticket(self, ticket) -> None:
+        """Aynı tracking_code tekrar gelirse yalnızca en yeni hal yazılır."""
+        code = ticket.tracking_code
+        prev = self._tickets.get(code)
+        if prev is not None:
+            self.stats["merged"] += 1
+            prev_ts = getattr(prev, "updated_at", None)
+            new_ts = getattr(ticket, "updated_at", None)
+            if prev_ts and new_ts and new_ts < prev_ts:
+                return
+        self._tickets[code] = ticket
+        self._touch()
+
+    def add_change(self, change) -> None:
+        self._changes.append(change)
+        self._touch()
+
+    def due(self) -> bool:
+        if not len(self):
+            return False
+        if len(self) >= self.max_rows:
+            return True
+        return self._opened_at is not None and (time.monotonic() - self._opened_at) >= self.window
+
+    def flush(self) -> Optional[dict]:
+        """Biriken her şeyi yaz. Backend yoksa None döner (kayıtlar korunur)."""
+        if not len(self):
+            return {}
+        tickets = list(self._tickets.values())
+        changes = list(self._changes)
+        resp = sheets_backend.sheet_batch(tickets, changes)
+        if resp is None:
+            return None
+        self._tickets.clear()
+        self._changes.clear()
+        self._opened_at = None
+        self.stats["flushes"] += 1
+        self.stats["tickets"] += len(tickets)
+        self.stats["changes"] += len(changes)
+        return resp
@@ -0,0 +1,208 @@
+# tickets/sheets_breaker.py
+"""
+Sheets backend'i (sheets_backend) için devre kesici (circuit breaker).
+
+Google erişilemezken ya da credential bozukken her outbox partisi tam
+hata yolunu (SHEETS_MAX_RETRIES kadar HTTP denemesi + traceback) ödüyordu.
+Artık:
+
+  - closed   : çağrılar geçer; art arda SHEETS_BREAKER_FAILURES bağlantı /
+               sunucu / yetki hatası devreyi açar (kod / veri hataları sayılmaz),
+  - open     : çağrılar Google'a gitmeden CircuitOpenError ile hemen düşer;
+               outbox işleri deneme sayılmadan ertelenir (replay),
+  - half_open: SHEETS_BREAKER_RESET_SECONDS sonra tek bir deneme çağrısına
+               izin verilir; başarılıysa devre kapanır, değilse yeniden açılır.
+
+Veriye özgü 4xx hatalar (400 / 404 vb.) Google'ın ayakta olduğunu gösterir,
+devreyi etkilemez. Durum sheets_ratelimit'in dosya kilidiyle tüm süreçler
+(web + worker) arasında paylaşılır; personel raporlar sayfasından görür.
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import time
+from typing import Callable
+
+from django.conf import settings
+
+from . import sheets_ratelimit
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Bu durumlar Google'ın / credential'ın sorunu sayılır
+_FAILURE_STATUSES = {401, 403} | sheets_ratelimit.RETRYABLE_STATUSES
+# HTTP yanıtı olmadan gelen credential hatası (google-auth token yenileyemedi)
+_CREDENTIAL_ERRORS = {"RefreshError"}
+
+
+class CircuitOpenError(RuntimeError):
+    """Devre açık: çağrı yapılmadı. retry_at: yeniden denenebileceği an (epoch sn)."""
+
+    def __init__(self, retry_at: float, last_error: str = ""):
+        super().__init__(f"Sheets devresi açık ({max(0.0, retry_at - time.time()):.0f} sn); "
+                         f"son hata: {last_error or '-'}")
+        self.retry_at = retry_at
+        self.last_error = last_error
+
+
+def _enabled() -> bool:
+    return bool(getattr(settings, "SHEETS_BREAKER_ENABLED", True))
+
+
+def _threshold() -> int:
+    return max(1, int(getattr(settings, "SHEETS_BREAKER_FAILURES", 5)))
+
+
+def _reset_seconds() -> float:
+    return float(getattr(settings, "SHEETS_BREAKER_RESET_SECONDS", 60))
+
+
+def _probe_seconds() -> float:
+    return float(getattr(settings, "SHEETS_BREAKER_PROBE_SECONDS", 120))
+
+
+def counts_as_failure(exc: Exception) -> bool:
+    """
+    Sunucu / kota / yetki durumları ve HTTP yanıtı olmayan bağlantı / zaman
+    aşımı hataları (sheets_ratelimit.is_transport_error). Kod ve veri hataları
+    (eksik başlık RuntimeError'ı, KeyError, ValidationError...) Google'ın
+    durumunu göstermez; devreyi açmaz.
+    """
+    if isinstance(exc, CircuitOpenError):
+        return False
+    status = sheets_ratelimit.status_of(exc)
+    if status is None:
+        return sheets_ratelimit.is_transport_error(exc) or type(exc).__name__ in _CREDENTIAL_ERRORS
+    return status in _FAILURE_STATUSES
+
+
+def _locked():
+    return sheets_ratelimit._locked_state("breaker")
+
+
+def _effective(st: dict, now: float) -> str:
+    state = st.get("state", CLOSED)
+    if state == OPEN and float(st.get("open_until", 0)) <= now:
+        return HALF_OPEN
+    return state
+
+
+def _trip(st: dict, now: float, error: str) -> None:
+    st["state"] = OPEN
+    st["opened_at"] = now
+    st["open_until"] = now + _reset_seconds()
+    st["probe_until"] = 0
+    st["trips"] = int(st.get("trips", 0)) + 1
+    st["changed_at"] = now
+    logger.warning("Sheets devresi açıldı (%d. kez): %s", st["trips"], error)
+
+
+# ====== Çağrı öncesi / sonrası ======
+def before_call() -> None:
+    """Devre açıksa CircuitOpenError; yarı açıkta yalnızca bir deneme çağrısı geçer."""
+    if not _enabled():
+        return
+    with _locked() as st:
+        now = time.time()
+        state = _effective(st, now)
+        if state == CLOSED:
+            return
+        if state == HALF_OPEN and float(st.get("probe_until", 0)) <= now:
+            # Bu süreç deneme hakkını aldı; diğerleri sonuca kadar beklesin
+            st["state"] = HALF_OPEN
+            st["probe_until"] = now + _probe_seconds()
+            return
+        st["rejected"] = int(st.get("rejected", 0)) + 1
+        retry_at = float(st.get("open_until", now)) if state == OPEN else float(st.get("probe_until", now))
+        last_error = st.get("last_error", "")
+    raise CircuitOpenError(retry_at, last_error)
+
+
+def record_success() -> None:
+    if not _enabled():
+        return
+    with _locked() as st:
+        now = time.time()
+        if st.get("state", CLOSED) != CLOSED:
+            logger.warning("Sheets devresi kapandı (Google yeniden yanıt veriyor).")
+            st["changed_at"] = now
+        st["state"] = CLOSED
+        st["failures"] = 0
+        st["probe_until"] = 0
+        st["last_success_at"] = now
+
+
+def record_failure(exc: Exception) -> None:
+    if not _enabled() or not counts_as_failure(exc):
+        return
+    error = f"{type(exc).__name__}: {exc}"[:500]
+    with _locked() as st:
+        now = time.time()
+        st["failures"] = int(st.get("failures", 0)) + 1
+        st["last_error"] = error
+        st["last_failure_at"] = now
+        state = _effective(st, now)
+        if state == HALF_OPEN or (state == CLOSED and st["failures"] >= _threshold()):
+            _trip(st, now, error)
+
+
+def call(fn: Callable, *args, **kwargs):
+    """fn'i devre kesici üzerinden çağır."""
+    before_call()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        if counts_as_failure(e):
+            record_failure(e)
+        elif sheets_ratelimit.status_of(e) is not None:
+            record_success()  # veriye özgü 4xx: Google erişilebilir
+        # HTTP yanıtı olmayan kod / veri hatası Google hakkında bir şey söylemez: durum değişmez
+        raise
+    record_success()
+    return result
+
+
+def guarded(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return call(fn, *args, **kwargs)
+    return wrapper
+
+
+# ====== Durum (personel sayfası / worker) ======
+def state() -> dict:
+    """Devre durumu: state, failures, trips, rejected, last_error, open_until..."""
+    with _locked() as st:
+        now = time.time()
+        out = {
+            "enabled": _enabled(),
+            "state": _effective(st, now),
+            "failures": int(st.get("failures", 0)),
+            "threshold": _threshold(),
+            "trips": int(st.get("trips", 0)),
+            "rejected": int(st.get("rejected", 0)),
+            "last_error": st.get("last_error", ""),
+        }
+        for key in ("opened_at", "open_until", "changed_at", "last_failure_at", "last_success_at"):
+            out[key] = float(st[key]) if st.get(key) else None
+    out["retry_in"] = max(0.0, out["open_until"] - now) if out["state"] == OPEN else 0.0
+    return out
+
+
+def reset(trips: bool = False) -> None:
+    """Devreyi elle kapat (trips=True: sayaçları da sıfırla)."""
+    with _locked() as st:
+        st["state"] = CLOSED
+        st["failures"] = 0
+        st["probe_until"] = 0
+        st["changed_at"] = time.time()
+        if trips:
+            st["trips"] = 0
+            st["rejected"] = 0
+            st["last_error"] = ""
+
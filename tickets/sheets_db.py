@@ -1,39 +1,45 @@
 # tickets/sheets_db.py
-import os, time, uuid
+import os, threading, uuid
 from datetime import datetime
-from functools import wraps
 
 import gspread
-from google.oauth2.service_account import Credentials
+from django.conf import settings
+
+from . import google_client
+from .sheets_index import row_from_range
+from .sheets_snapshot import WorksheetSnapshot
+
+# Kota / yeniden deneme gspread HTTP katmanında (sheets_ratelimit) yapılır;
+# burada ayrıca kör retry yok — 4xx hatalar doğrudan yükselir.
 
 # ====== Bağlantı / yardımcılar ======
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+SCOPES = google_client.SCOPES
 SPREADSHEET_ID = os.getenv("SHEETS_SPREADSHEET_ID")
 
 def _gc():
-    creds = Credentials.from_service_account_file(
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"], scopes=SCOPES
-    )
-    return gspread.authorize(creds)
+    return google_client.gspread_client()
+
+_ws_cache = {}
+_ws_lock = threading.Lock()
 
 def _ws(title: str):
-    return _gc().open_by_key(SPREADSHEET_ID).worksheet(title)
-
-def backoff(retries=6, base=0.4, factor=1.7):
-    def deco(fn):
-        @wraps(fn)
-        def wrap(*a, **kw):
-            delay = base
-            for i in range(retries):
-                try:
-                    return fn(*a, **kw)
-                except Exception:
-                    if i == retries - 1:
-                        raise
-                    time.sleep(delay)
-                    delay *= factor
-        return wrap
-    return deco
+    """Worksheet nesnesi süreç başına bir kez açılır (her çağrıda metadata okunmaz)."""
+    with _ws_lock:
+        ws = _ws_cache.get(title)
+        if ws is None:
+            ws = _ws_cache[title] = _gc().open_by_key(SPREADSHEET_ID).worksheet(title)
+        return ws
+
+# tickets sayfasının indeksli anlık görüntüsü (list / get / update buradan yanıtlanır)
+_tickets = WorksheetSnapshot(
+    lambda: _ws("tickets"), key="tracking_code", indexed=("status", "transport", "user_type"),
+)
+
+def invalidate():
+    """Snapshot'ı ve worksheet önbelleğini düşür (sheet elle değiştiyse)."""
+    _tickets.invalidate()
+    with _ws_lock:
+        _ws_cache.clear()
 
 # ====== Şema ======
 TICKET_FIELDS = [
@@ -46,34 +52,25 @@ TICKET_FIELDS = [
     "created_at","updated_at","rejected_by_email","reject_reason",
 ]
 
-@backoff()
-def _headers_map(ws):
-    heads = ws.row_values(1)
-    return {h: i+1 for i, h in enumerate(heads)}  # 1-based
-
 def _now():
     return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
 def _gen_tracking():
     return uuid.uuid4().hex[:12].upper()
 
-@backoff()
 def _find_row_by_tracking(ws, tracking_code: str):
-    hm = _headers_map(ws)
-    col = hm.get("tracking_code")
-    if not col:
+    """Snapshot'tan satır numarası. Snapshot eskiyse satır tek hücreyle doğrulanır."""
+    if "tracking_code" not in _tickets.positions():
         raise RuntimeError("tickets sayfasında 'tracking_code' başlığı yok.")
-    values = ws.col_values(col)
-    # Satırlar 1’den başlar; 1 başlık, 2.. data
-    for idx, val in enumerate(values, start=1):
-        if idx == 1:  # başlığı geç
-            continue
-        if val == tracking_code:
-            return idx
-    return None
+    idx = _tickets.row_of(tracking_code)
+    if idx and _tickets.age() > float(getattr(settings, "SHEETS_ROW_INDEX_VERIFY_SECONDS", 30)):
+        col = _tickets.positions()["tracking_code"]
+        if ws.cell(idx, col).value != tracking_code:
+            _tickets.load()
+            idx = _tickets.row_of(tracking_code)
+    return idx
 
 # ====== CREATE ======
-@backoff()
 def tickets_create(data: dict) -> str:
     """
     data: Django formundan temizlenmiş sözlük.
@@ -92,28 +89,24 @@ def tickets_create(data: dict) -> str:
         if k == "updated_at":   row.append(updated_at); continue
         row.append("" if data.get(k) is None else str(data.get(k)))
 
-    ws.append_row(row)
+    resp = ws.append_row(row)
+    updated = ((resp or {}).get("updates") or {}).get("updatedRange", "")
+    _tickets.apply_append(row, row_from_range(updated))
     return tracking
 
 # ====== READ (listeleme + filtre) ======
-@backoff()
 def tickets_list(filters: dict | None = None, q: str | None = None) -> list[dict]:
     """
     filters: {'status':'pending', 'transport':'plane', 'user_type':'staff', 'has_changes':True}
     q: basit arama (full_name, tracking_code, pnr_code)
     """
-    ws = _ws("tickets")
-    hm = _headers_map(ws)
-    all_rows = ws.get_all_records()  # list[dict]
+    # Eşitlik filtreleri snapshot indeksleriyle; metin araması yalnızca kalan adaylarda
+    f = filters or {}
+    all_rows = _tickets.filter(
+        status=f.get("status"), transport=f.get("transport"), user_type=f.get("user_type"),
+    )
 
     def ok(rec: dict):
-        if filters:
-            if "status" in filters and filters["status"]:
-                if rec.get("status") != filters["status"]: return False
-            if "transport" in filters and filters["transport"]:
-                if rec.get("transport") != filters["transport"]: return False
-            if "user_type" in filters and filters["user_type"]:
-                if rec.get("user_type") != filters["user_type"]: return False
         if q:
             ql = q.lower()
             hit = False
@@ -133,41 +126,34 @@ def tickets_list(filters: dict | None = None, q: str | None = None) -> list[dict
     return rows
 
 # ====== READ (tek kayıt) ======
-@backoff()
 def tickets_get(tracking_code: str) -> dict | None:
-    ws = _ws("tickets")
-    idx = _find_row_by_tracking(ws, tracking_code)
-    if not idx:
-        return None
-    # A:Z aralığını geniş tutuyoruz (başlık sayısına göre)
-    values = ws.row_values(idx)
-    heads = ws.row_values(1)
-    rec = {h: (values[i] if i < len(values) else "") for i, h in enumerate(heads)}
-    return rec
+    return _tickets.get(tracking_code)
 
 # ====== UPDATE ======
-@backoff()
 def tickets_update(tracking_code: str, **fields):
     ws = _ws("tickets")
-    hm = _headers_map(ws)
+    hm = _tickets.positions()
     row_idx = _find_row_by_tracking(ws, tracking_code)
     if not row_idx:
         return False
     updates = []
+    applied = {}
     for k, v in fields.items():
         if k not in hm:
             continue
         a1 = gspread.utils.rowcol_to_a1(row_idx, hm[k])
         updates.append({"range": a1, "values": [[("" if v is None else str(v))]]})
+        applied[k] = v
     if "updated_at" in hm:
         a1 = gspread.utils.rowcol_to_a1(row_idx, hm["updated_at"])
-        updates.append({"range": a1, "values": [[ _now() ]]})
+        applied["updated_at"] = _now()
+        updates.append({"range": a1, "values": [[ applied["updated_at"] ]]})
     if updates:
         ws.batch_update(updates)
+        _tickets.apply_update(tracking_code, applied)
     return True
 
 # ====== CHANGES ======
-@backoff()
 def changes_append(tracking_code: str, change_text: str):
     ws = _ws("changes")
     ws.append_row([tracking_code, change_text, _now()])
@@ -0,0 +1,448 @@
+# tickets/sheets_fake.py
+"""
+Google Sheets v4 `values` uç noktalarının süreç içi taklidi (ağ / credential yok).
+
+SHEETS_FAKE=true iken google_client hem googleapiclient service'ini hem de
+gspread Client'ını buraya yönlendirir; böylece gsheets / sheets_api /
+sheets_db / sheets_sync hiç değişmeden laptopta ölçülebilir ve denenebilir.
+İstekler HTTP katmanında yakalanır (googleapiclient için httplib2 benzeri
+FakeHttp, gspread için requests adapter'ı), yani sheets_ratelimit de devrededir.
+
+Desteklenenler:
+  - values: get, update, append, clear, batchGet, batchUpdate, batchClear
+  - spreadsheet: metadata (get), batchUpdate (addSheet / deleteSheet)
+
+Ayarlanabilir davranış:
+  - SHEETS_FAKE_LATENCY_MS        her isteğe eklenen gecikme
+  - SHEETS_FAKE_QUOTA_PER_MINUTE  dakikalık okuma / yazma kotası (aşılınca 429)
+  - SHEETS_FAKE_ERROR_RATE        rastgele 429 oranı (0..1)
+  - SHEETS_FAKE_MAX_ROWS          worksheet başına satır sınırı (aşılınca 400)
+  - SHEETS_FAKE_SHEETS            yeni spreadsheet'te hazır gelen worksheet'ler
+
+Veri süreç belleğindedir; reset() / seed() / rows() / stats() test ve
+benchmark'lar içindir.
+"""
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from django.conf import settings
+
+_lock = threading.RLock()
+_books: Dict[str, "_Book"] = {}
+_calls: Dict[str, deque] = {"read": deque(), "write": deque()}
+_stats: Counter = Counter()
+
+_CELL_RE = re.compile(r"^\$?([A-Za-z]*)\$?(\d*)$")
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "SHEETS_FAKE", False))
+
+
+class FakeSheetsError(Exception):
+    def __init__(self, code: int, status: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.message = message
+
+    def payload(self) -> dict:
+        return {"error": {"code": self.code, "message": self.message, "status": self.status}}
+
+
+# ====== A1 yardımcıları ======
+def col_to_num(letters: str) -> int:
+    n = 0
+    for ch in letters.upper():
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def num_to_col(n: int) -> str:
+    s = ""
+    while n:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def _split_sheet(a1: str) -> Tuple[str, str]:
+    if "!" not in a1:
+        return a1.strip("'").replace("''", "'"), ""
+    sheet, rng = a1.rsplit("!", 1)
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    return sheet, rng
+
+
+def parse_range(a1: str):
+    """
+    'Tickets!A2:V' -> ('Tickets', r1, c1, r2, c2); açık uçlar None.
+    Satır / sütun 1 tabanlı.
+    """
+    sheet, rng = _split_sheet(a1)
+    if not rng:
+        return sheet, 1, 1, None, None
+    start, _, end = rng.partition(":")
+    m1, m2 = _CELL_RE.match(start), _CELL_RE.match(end or start)
+    if not m1 or not m2:
+        raise FakeSheetsError(400, "INVALID_ARGUMENT", f"Unable to parse range: {a1}")
+    c1 = col_to_num(m1.group(1)) if m1.group(1) else 1
+    r1 = int(m1.group(2)) if m1.group(2) else 1
+    c2 = col_to_num(m2.group(1)) if m2.group(1) else None
+    r2 = int(m2.group(2)) if m2.group(2) else None
+    return sheet, r1, c1, r2, c2
+
+
+def _a1(sheet: str, r1: int, c1: int, r2: int, c2: int) -> str:
+    return f"{sheet}!{num_to_col(c1)}{r1}:{num_to_col(c2)}{r2}"
+
+
+def _cell(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    return str(v)
+
+
+# ====== Veri ======
+class _Book:
+    def __init__(self, ssid: str):
+        self.ssid = ssid
+        self.sheets: Dict[str, List[List[str]]] = {}
+        self.sheet_ids: Dict[str, int] = {}
+        names = [s.strip() for s in str(getattr(settings, "SHEETS_FAKE_SHEETS", "Tickets,Changes")).split(",")]
+        for name in names:
+            if name:
+                self.add_sheet(name)
+
+    def add_sheet(self, title: str) -> dict:
+        if title in self.sheets:
+            raise FakeSheetsError(400, "INVALID_ARGUMENT",
+                                  f'A sheet with the name "{title}" already exists.')
+        self.sheets[title] = []
+        self.sheet_ids[title] = max(self.sheet_ids.values(), default=-1) + 1
+        return self.properties(title)
+
+    def properties(self, title: str) -> dict:
+        rows = self.sheets[title]
+        width = max((len(r) for r in rows), default=0)
+        return {
+            "sheetId": self.sheet_ids[title],
+            "title": title,
+            "index": list(self.sheets).index(title),
+            "sheetType": "GRID",
+            "gridProperties": {"rowCount": max(1000, len(rows)), "columnCount": max(26, width)},
+        }
+
+    def rows(self, title: str) -> List[List[str]]:
+        try:
+            return self.sheets[title]
+        except KeyError:
+            raise FakeSheetsError(400, "INVALID_ARGUMENT", f"Unable to parse range: {title}")
+
+    # ---- values ----
+    def get(self, a1: str, major: str = "ROWS") -> dict:
+        sheet, r1, c1, r2, c2 = parse_range(a1)
+        rows = self.rows(sheet)
+        last = len(rows) if r2 is None else min(r2, len(rows))
+        block = [r[c1 - 1:c2] if c2 is not None else r[c1 - 1:] for r in rows[r1 - 1:last]]
+        if major == "COLUMNS":
+            width = max((len(r) for r in block), default=0)
+            block = [[r[j] if j < len(r) else "" for r in block] for j in range(width)]
+        out = []
+        for cells in block:
+            cells = list(cells)
+            while cells and cells[-1] == "":
+                cells.pop()
+            out.append(cells)
+        while out and not out[-1]:
+            out.pop()
+        res = {"range": a1, "majorDimension": major}
+        if out:
+            res["values"] = out
+        return res
+
+    def _check_rows(self, sheet: str, last_row: int) -> None:
+        limit = int(getattr(settings, "SHEETS_FAKE_MAX_ROWS", 0) or 0)
+        if limit and last_row > limit:
+            raise FakeSheetsError(
+                400, "INVALID_ARGUMENT",
+                f"Range ({sheet}!A{last_row}) exceeds grid limits. Max rows: {limit}",
+            )
+
+    def write(self, sheet: str, r1: int, c1: int, values) -> dict:
+        rows = self.rows(sheet)
+        values = values or []
+        self._check_rows(sheet, r1 + len(values) - 1)
+        width = 0
+        for i, vals in enumerate(values):
+            idx = r1 - 1 + i
+            while len(rows) <= idx:
+                rows.append([])
+            row = rows[idx]
+            need = c1 - 1 + len(vals)
+            if len(row) < need:
+                row.extend([""] * (need - len(row)))
+            row[c1 - 1:need] = [_cell(v) for v in vals]
+            width = max(width, len(vals))
+        n = len(values)
+        _stats["cells_written"] += sum(len(v) for v in values)
+        return {
+            "spreadsheetId": self.ssid,
+            "updatedRange": _a1(sheet, r1, c1, r1 + max(n, 1) - 1, c1 + max(width, 1) - 1),
+            "updatedRows": n,
+            "updatedColumns": width,
+            "updatedCells": sum(len(v) for v in values),
+        }
+
+    def update(self, a1: str, values) -> dict:
+        sheet, r1, c1, _, _ = parse_range(a1)
+        return self.write(sheet, r1, c1, values)
+
+    def append(self, a1: str, values) -> dict:
+        sheet, r1, c1, _, _ = parse_range(a1)
+        rows = self.rows(sheet)
+        last = len(rows)
+        while last and not any(rows[last - 1]):
+            last -= 1
+        start = max(r1, last + 1)
+        upd = self.write(sheet, start, c1, values)
+        return {
+            "spreadsheetId": self.ssid,
+            "tableRange": f"{sheet}!A{r1}:{num_to_col(c1)}{last}" if last else "",
+            "updates": upd,
+        }
+
+    def clear(self, a1: str) -> dict:
+        sheet, r1, c1, r2, c2 = parse_range(a1)
+        rows = self.rows(sheet)
+        last = len(rows) if r2 is None else min(r2, len(rows))
+        for r in rows[r1 - 1:last]:
+            end = len(r) if c2 is None else min(c2, len(r))
+            for j in range(c1 - 1, end):
+                r[j] = ""
+        while rows and not any(rows[-1]):
+            rows.pop()
+        return {"spreadsheetId": self.ssid, "clearedRange": a1}
+
+
+def _book(ssid: str) -> _Book:
+    with _lock:
+        book = _books.get(ssid)
+        if book is None:
+            book = _books[ssid] = _Book(ssid)
+        return book
+
+
+# ====== Test / benchmark yardımcıları ======
+def reset() -> None:
+    with _lock:
+        _books.clear()
+        for q in _calls.values():
+            q.clear()
+        _stats.clear()
+
+
+def seed(ssid: str, sheet: str, rows) -> None:
+    """Worksheet'i verilen satırlarla doldur (yoksa oluşturur)."""
+    with _lock:
+        book = _book(ssid)
+        if sheet not in book.sheets:
+            book.add_sheet(sheet)
+        book.sheets[sheet] = [[_cell(v) for v in r] for r in rows]
+
+
+def rows(ssid: str, sheet: str) -> List[List[str]]:
+    with _lock:
+        return [list(r) for r in _book(ssid).rows(sheet)]
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
+
+
+# ====== İstek yönlendirme ======
+def _latency() -> None:
+    """Ağ gecikmesi: kilit dışında uyunur, eşzamanlı istekler gecikmelerini örtebilsin."""
+    delay = float(getattr(settings, "SHEETS_FAKE_LATENCY_MS", 0) or 0) / 1000.0
+    if delay:
+        time.sleep(delay)
+
+
+def _throttle(kind: str) -> None:
+    """Kota / rastgele 429 (kilit altında çağrılır)."""
+    rate = float(getattr(settings, "SHEETS_FAKE_ERROR_RATE", 0) or 0)
+    if rate and random.random() < rate:
+        _stats["quota_errors"] += 1
+        raise FakeSheetsError(429, "RESOURCE_EXHAUSTED", "Quota exceeded (random).")
+    quota = int(getattr(settings, "SHEETS_FAKE_QUOTA_PER_MINUTE", 0) or 0)
+    if quota:
+        now = time.monotonic()
+        q = _calls[kind]
+        while q and now - q[0] > 60:
+            q.popleft()
+        if len(q) >= quota:
+            _stats["quota_errors"] += 1
+            raise FakeSheetsError(
+                429, "RESOURCE_EXHAUSTED",
+                f"Quota exceeded for quota metric '{kind.title()} requests' (per minute).",
+            )
+        q.append(now)
+
+
+def _values_route(book: _Book, method: str, tail: str, query: dict, body: dict):
+    """tail: 'values/<range>[:op]' ya da 'values:<op>' (URL-encoded)."""
+    major = (query.get("majorDimension") or ["ROWS"])[0]
+    if tail.startswith("values:"):
+        op = tail[len("values:"):]
+        if op == "batchGet" and method == "GET":
+            ranges = query.get("ranges", [])
+            return "batchGet", {"spreadsheetId": book.ssid,
+                                "valueRanges": [book.get(r, major) for r in ranges]}
+        if op == "batchUpdate" and method == "POST":
+            responses = [book.update(d["range"], d.get("values")) for d in body.get("data", [])]
+            return "batchUpdate", {
+                "spreadsheetId": book.ssid,
+                "totalUpdatedRows": sum(r["updatedRows"] for r in responses),
+                "totalUpdatedCells": sum(r["updatedCells"] for r in responses),
+                "responses": responses,
+            }
+        if op == "batchClear" and method == "POST":
+            cleared = [book.clear(r)["clearedRange"] for r in body.get("ranges", [])]
+            return "batchClear", {"spreadsheetId": book.ssid, "clearedRanges": cleared}
+        raise FakeSheetsError(404, "NOT_FOUND", f"Unsupported: {method} {tail}")
+
+    raw = tail[len("values/"):]
+    rng, _, op = raw.partition(":")
+    rng = unquote(rng)
+    if not op and method == "GET":
+        return "get", book.get(rng, major)
+    if not op and method == "PUT":
+        return "update", book.update(rng, body.get("values"))
+    if op == "append" and method == "POST":
+        return "append", book.append(rng, body.get("values"))
+    if op == "clear" and method == "POST":
+        return "clear", book.clear(rng)
+    raise FakeSheetsError(404, "NOT_FOUND", f"Unsupported: {method} {tail}")
+
+
+def _spreadsheet_route(book: _Book, method: str, op: str, body: dict):
+    if not op and method == "GET":
+        return "metadata", {
+            "spreadsheetId": book.ssid,
+            "properties": {"title": f"fake-{book.ssid}", "locale": "tr_TR", "timeZone": "Europe/Istanbul"},
+            "sheets": [{"properties": book.properties(t)} for t in book.sheets],
+        }
+    if op == "batchUpdate" and method == "POST":
+        replies = []
+        for req in body.get("requests", []):
+            if "addSheet" in req:
+                title = req["addSheet"].get("properties", {}).get("title") or f"Sheet{len(book.sheets) + 1}"
+                replies.append({"addSheet": {"properties": book.add_sheet(title)}})
+            elif "deleteSheet" in req:
+                sid = req["deleteSheet"]["sheetId"]
+                for title, i in list(book.sheet_ids.items()):
+                    if i == sid:
+                        del book.sheets[title], book.sheet_ids[title]
+                replies.append({})
+            else:
+                replies.append({})  # biçimlendirme vb. istekler yok sayılır
+        return "spreadsheetBatchUpdate", {"spreadsheetId": book.ssid, "replies": replies}
+    raise FakeSheetsError(404, "NOT_FOUND", f"Unsupported: {method} spreadsheet:{op}")
+
+
+def handle(method: str, url: str, body=None) -> Tuple[int, dict]:
+    """Tek bir Sheets REST isteğini işle: (HTTP durum, JSON gövde)."""
+    method = (method or "GET").upper()
+    parts = urlsplit(url)
+    path = parts.path
+    query = parse_qs(parts.query)
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode("utf-8")
+    try:
+        data = json.loads(body) if body else {}
+    except ValueError:
+        data = {}
+
+    marker = "/v4/spreadsheets/"
+    if marker not in path:
+        return 404, FakeSheetsError(404, "NOT_FOUND", f"Unsupported URL: {url}").payload()
+    rest = path.split(marker, 1)[1]
+    ssid_part, _, tail = rest.partition("/")
+    ssid, _, op = ssid_part.partition(":")
+    ssid = unquote(ssid)
+
+    kind = "read" if method == "GET" else "write"
+    _latency()
+    try:
+        with _lock:
+            _throttle(kind)
+            book = _book(ssid)
+            if tail:
+                name, payload = _values_route(book, method, tail, query, data)
+            else:
+                name, payload = _spreadsheet_route(book, method, op, data)
+            _stats[name] += 1
+            _stats[kind + "s"] += 1
+        return 200, payload
+    except FakeSheetsError as e:
+        _stats[f"errors_{e.code}"] += 1
+        return e.code, e.payload()
+
+
+# ====== Taşıma katmanı: googleapiclient (httplib2 benzeri) ======
+class FakeHttp:
+    """build(http=FakeHttp()) için httplib2.Http yerine geçer."""
+
+    def __init__(self):
+        self.timeout = None
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        import httplib2
+
+        status, payload = handle(method, uri, body)
+        resp = httplib2.Response({"status": str(status), "content-type": "application/json; charset=UTF-8"})
+        resp.reason = "OK" if status == 200 else payload["error"]["status"]
+        return resp, json.dumps(payload).encode("utf-8")
+
+    def close(self):
+        pass
+
+
+# ====== Taşıma katmanı: gspread (requests) ======
+def session():
+    """gspread.Client(session=...) için sahte uca bağlı requests.Session."""
+    import requests
+    from requests.adapters import BaseAdapter
+
+    class _Adapter(BaseAdapter):
+        def send(self, request, **kwargs):
+            status, payload = handle(request.method, request.url, request.body)
+            resp = requests.Response()
+            resp.status_code = status
+            resp.reason = "OK" if status == 200 else payload["error"]["status"]
+            resp._content = json.dumps(payload).encode("utf-8")
+            resp.headers["Content-Type"] = "application/json; charset=UTF-8"
+            resp.encoding = "utf-8"
+            resp.url = request.url
+            resp.request = request
+            return resp
+
+        def close(self):
+            pass
+
+    s = requests.Session()
+    s.mount("https://", _Adapter())
+    s.mount("http://", _Adapter())
+    return s
@@ -0,0 +1,133 @@
+# tickets/sheets_headers.py
+"""
+Worksheet başlık satırı (1. satır) önbelleği.
+
+append_by_headers / upsert_by_tracking her yazmada başlığı yeniden
+okuyordu; başlık neredeyse hiç değişmediği için bu, gereksiz bir okuma
+çağrısı ve okuma kotası demek. Başlıklar worksheet başına önbelleğe alınır
+ve bir parmak izi (fingerprint) ile etiketlenir:
+
+  - SHEETS_HEADER_CACHE_SECONDS (varsayılan 60 sn) dolunca yeniden okunur,
+  - satır indeksi tracking sütununu her okuduğunda 1. satırı da aynı
+    batchGet'te okur ve observe() ile buraya bildirir: yazımlar başlığı
+    ayrıca okumadan, indeksle aynı tazelikte başlıkla yapılır,
+  - beklenen başlık bulunamazsa ya da başlıkla ilgili bir API hatası
+    (400 / range parse) gelirse invalidate() edilip tekrar yüklenir,
+  - parmak izi değiştiğinde uyarı loglanır.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(headers: Sequence) -> str:
+    """Başlık sırası + adlarından kısa, kararlı bir özet."""
+    norm = [str(h).strip() for h in headers]
+    raw = json.dumps(norm, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+class HeaderLayout:
+    __slots__ = ("headers", "fingerprint", "positions", "loaded_at")
+
+    def __init__(self, headers: Sequence):
+        self.headers: List[str] = [str(h).strip() for h in headers]
+        self.fingerprint = fingerprint(self.headers)
+        self.positions: Dict[str, int] = {}
+        for i, h in enumerate(self.headers):
+            self.positions.setdefault(h, i)
+        self.loaded_at = time.monotonic()
+
+
+_cache: Dict[Tuple[str, str], HeaderLayout] = {}
+_lock = threading.RLock()
+_stats = {"hits": 0, "loads": 0, "invalidations": 0, "fingerprint_changes": 0}
+
+
+def _max_age() -> float:
+    return float(getattr(settings, "SHEETS_HEADER_CACHE_SECONDS", 60))
+
+
+def layout(ssid: str, sheet_name: str, loader: Callable[[str], List[str]],
+           refresh: bool = False) -> HeaderLayout:
+    """
+    Önbellekteki başlık düzeni; yoksa / bayatsa / refresh=True ise loader(sheet_name)
+    ile yeniden okunur.
+    """
+    key = (ssid, sheet_name)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and not refresh and (time.monotonic() - entry.loaded_at) <= _max_age():
+            _stats["hits"] += 1
+            return entry
+
+    return observe(ssid, sheet_name, loader(sheet_name))
+
+
+def observe(ssid: str, sheet_name: str, headers: Sequence) -> HeaderLayout:
+    """Başka bir okumayla (ör. satır indeksi yüklemesi) gelen başlık satırını önbelleğe yaz."""
+    fresh = HeaderLayout(headers)
+    with _lock:
+        old = _cache.get((ssid, sheet_name))
+        if old is not None and old.fingerprint != fresh.fingerprint:
+            _stats["fingerprint_changes"] += 1
+            logger.warning(
+                "'%s' başlık düzeni değişti: %s -> %s", sheet_name, old.fingerprint, fresh.fingerprint
+            )
+        _cache[(ssid, sheet_name)] = fresh
+        _stats["loads"] += 1
+    return fresh
+
+
+def cached(ssid: str, sheet_name: str) -> Optional[HeaderLayout]:
+    with _lock:
+        return _cache.get((ssid, sheet_name))
+
+
+def invalidate(ssid: Optional[str] = None, sheet_name: Optional[str] = None) -> None:
+    with _lock:
+        for key in list(_cache):
+            if (ssid is None or key[0] == ssid) and (sheet_name is None or key[1] == sheet_name):
+                del _cache[key]
+                _stats["invalidations"] += 1
+
+
+def is_header_error(exc: Exception) -> bool:
+    """
+    Başlık/düzen kaynaklı olabilecek API hataları: 400 (range parse,
+    sütun sayısı uyuşmazlığı vb.). Kota / sunucu hataları sayılmaz.
+    """
+    resp = getattr(exc, "resp", None)
+    status = getattr(resp, "status", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    try:
+        return int(status) == 400
+    except (TypeError, ValueError):
+        return False
+
+
+def diff(actual: Sequence, expected: Sequence) -> dict:
+    """İki başlık düzeni arasındaki farklar (komut çıktısı için)."""
+    a = [str(h).strip() for h in actual]
+    e = [str(h).strip() for h in expected]
+    return {
+        "missing": [h for h in e if h not in a],
+        "extra": [h for h in a if h not in e],
+        "moved": [h for i, h in enumerate(e) if h in a and a.index(h) != i],
+        "same": a == e,
+    }
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats, entries=len(_cache))
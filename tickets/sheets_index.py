@@ -0,0 +1,316 @@
+# tickets/sheets_index.py
+"""
+tracking_code -> satır numarası önbelleği.
+
+Eskiden her upsert'te tracking_code sütunu baştan sona indirilip lineer
+taranıyordu (O(satır) ağ yükü + CPU). Artık sütun süreç başına bir kez
+okunur; append/update yanıtlarıyla güncel tutulur. Upsert başına tek yazım:
+
+  - İndekste olmayan kod yeni satırdır: append edilir, record_append ile
+    indekse yazılır (sütun yeniden okunmaz).
+  - İndeksteki satırların tracking_code hücreleri yazmadan önce tek
+    batchGet ile okunur (toplu yazımda da tek istek). Biri tutmazsa
+    (personel elle satır eklemiş / silmiş) indeks kirlenir, sütun yeniden
+    okunur ve satırlar yeniden çözülür: başka biletin satırı ezilmez.
+  - Sütun yalnızca şu durumlarda yeniden okunur: append yanıtındaki satır
+    beklenen "son satır + 1" değilse (başka biri satır eklemiş/silmiş),
+    paylaşılan nesil (generation) değiştiyse ya da yükleme
+    SHEETS_ROW_INDEX_MAX_AGE_SECONDS'tan eskiyse.
+  - Nesil, SHEETS_RATELIMIT_DIR altındaki küçük dosyalardadır (aynı
+    makinedeki tüm süreçler görür). Satır ekleyen her süreç sayfanın
+    neslini, satırları kaydıran işler (sync_sheets tam / delta push,
+    mutabakat onarımı, rollover) mark_changed() ile genel nesli değiştirir.
+    Kontrol ağ çağrısı değil, yerel dosya okumasıdır.
+  - Sütun okuması başlık satırını da getirir (sheets_headers.observe):
+    yazımı yapan gsheets, başlık düzeni değiştiyse satırı yeni düzenle kurar.
+
+Personelin elle yaptığı satır kaydırmaları nesil sinyaliyle görülmez; yazılacak
+satırlar yukarıdaki hücre doğrulamasıyla yakalanır, diğerleri en geç MAX_AGE
+dolunca düzelir (`sync_sheets --reconcile` de bulur).
+Ağ çağrıları kilit dışında yapılır; kilit yalnızca indeks durumunu korur.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+
+from . import sheets_headers
+
+logger = logging.getLogger(__name__)
+
+_RANGE_ROW_RE = re.compile(r"!\$?[A-Za-z]+\$?(\d+)")
+
+
+def _norm(code) -> str:
+    return str(code or "").strip().upper()
+
+
+def _max_age() -> float:
+    return float(getattr(settings, "SHEETS_ROW_INDEX_MAX_AGE_SECONDS", 300))
+
+
+def row_from_range(a1: str) -> Optional[int]:
+    """'Tickets!A58:V58' -> 58"""
+    m = _RANGE_ROW_RE.search(a1 or "")
+    return int(m.group(1)) if m else None
+
+
+# ====== Süreçler arası nesil (generation) ======
+def _generation_path(ssid: Optional[str], sheet_name: Optional[str]) -> str:
+    base = getattr(settings, "SHEETS_RATELIMIT_DIR", "") or tempfile.gettempdir()
+    key = "all" if sheet_name is None else hashlib.sha1(f"{ssid}\x1f{sheet_name}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(base, f"t3ticket-sheets-rows-{key}.gen")
+
+
+def _read_generation(ssid: Optional[str], sheet_name: Optional[str]) -> str:
+    try:
+        with open(_generation_path(ssid, sheet_name), "r", encoding="ascii") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def _bump_generation(ssid: Optional[str], sheet_name: Optional[str]) -> str:
+    """Yeni nesil değeri yaz (atomik os.replace); her değer benzersizdir."""
+    token = uuid.uuid4().hex
+    path = _generation_path(ssid, sheet_name)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(tmp, "w", encoding="ascii") as f:
+            f.write(token)
+        os.replace(tmp, path)
+    except OSError:
+        logger.exception("Satır indeksi nesli yazılamadı (%s).", path)
+    return token
+
+
+def mark_changed(ssid: Optional[str] = None, sheet_name: Optional[str] = None) -> None:
+    """
+    Satırlar kaydı / yeniden yazıldı: tüm süreçlerdeki indeksler (sheet_name
+    verilirse yalnızca o sayfanınki) bir sonraki sorguda sütunu yeniden okur.
+    """
+    _bump_generation(ssid if sheet_name else None, sheet_name)
+
+
+class TrackingRowIndex:
+    """Tek bir worksheet'in tracking_code sütunu için satır indeksi."""
+
+    def __init__(self, sheet_name: str, column: str = "A", first_row: int = 2, ssid: str = ""):
+        self.sheet_name = sheet_name
+        self.column = column
+        self.first_row = first_row
+        self.ssid = ssid
+        self._rows: Dict[str, int] = {}
+        self._last_row = first_row - 1
+        self._loaded_at: Optional[float] = None
+        self._generation: Tuple[str, str] = ("", "")
+        self._dirty = True
+        # yükleme sürerken yapılan kayıtlar: okunan sütunun üstüne uygulanır
+        self._loading = 0
+        self._recorded: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.stats = {"loads": 0, "hits": 0, "misses": 0, "verifies": 0, "mismatches": 0,
+                      "append_mismatches": 0}
+
+    def _current_generation(self) -> Tuple[str, str]:
+        return _read_generation(None, None), _read_generation(self.ssid, self.sheet_name)
+
+    # ---- yükleme ----
+    def _fetch(self, srv, ssid: str) -> Tuple[Dict[str, int], int]:
+        # Başlık satırı aynı istekte gelir: sheets_headers önbelleği indeksle birlikte tazelenir
+        rng = f"{self.sheet_name}!{self.column}{self.first_row}:{self.column}"
+        resp = srv.spreadsheets().values().batchGet(
+            spreadsheetId=ssid, ranges=[rng, f"{self.sheet_name}!1:1"]
+        ).execute()
+        ranges = resp.get("valueRanges") or []
+        vals = ranges[0].get("values", []) if ranges else []
+        header = (ranges[1].get("values") or [[]])[0] if len(ranges) > 1 else []
+        if header:
+            sheets_headers.observe(ssid, self.sheet_name, header)
+        rows: Dict[str, int] = {}
+        for i, r in enumerate(vals, start=self.first_row):
+            code = _norm(r[0] if r else "")
+            if code and code not in rows:
+                rows[code] = i
+        return rows, self.first_row - 1 + len(vals)
+
+    def _needs_load(self, generation: Tuple[str, str]) -> bool:
+        return (self._dirty or self._loaded_at is None
+                or generation != self._generation
+                or (time.monotonic() - self._loaded_at) > _max_age())
+
+    def load(self, srv, ssid: str, generation: Optional[Tuple[str, str]] = None) -> None:
+        """Sütunu oku (kilit dışında) ve indeksi değiştir."""
+        if generation is None:
+            generation = self._current_generation()
+        with self._lock:
+            if not self._loading:
+                self._recorded = {}
+            self._loading += 1
+        try:
+            rows, last_row = self._fetch(srv, ssid)
+        finally:
+            with self._lock:
+                self._loading -= 1
+        with self._lock:
+            rows.update(self._recorded)
+            if self._recorded:
+                last_row = max(last_row, max(self._recorded.values()))
+            self._rows = rows
+            self._last_row = last_row
+            self._loaded_at = time.monotonic()
+            self._generation = generation
+            self._dirty = False
+            self.stats["loads"] += 1
+
+    def ensure_loaded(self, srv, ssid: str) -> bool:
+        """Gerekiyorsa (kirli / nesil değişti / bayat) sütunu bir kez oku; okuduysa True."""
+        generation = self._current_generation()
+        with self._lock:
+            needed = self._needs_load(generation)
+        if needed:
+            self.load(srv, ssid, generation)
+        return needed
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._dirty = True
+
+    # ---- sorgu ----
+    def _verify(self, srv, ssid: str, hits: Dict[str, int]) -> bool:
+        """Önbellekteki satırlarda hâlâ aynı kodlar mı duruyor? (tek batchGet)"""
+        codes = list(hits)
+        resp = srv.spreadsheets().values().batchGet(
+            spreadsheetId=ssid,
+            ranges=[f"{self.sheet_name}!{self.column}{hits[c]}" for c in codes],
+        ).execute()
+        ranges = resp.get("valueRanges", [])
+        with self._lock:
+            self.stats["verifies"] += 1
+        if len(ranges) != len(codes):
+            return False
+        for code, vr in zip(codes, ranges):
+            vals = vr.get("values") or [[""]]
+            if _norm(vals[0][0] if vals[0] else "") != code:
+                return False
+        return True
+
+    def lookup(self, srv, ssid: str, tracking_code) -> Optional[int]:
+        """Satır numarası; None ise kod sayfada yok (yeni satır, append edilmeli)."""
+        code = _norm(tracking_code)
+        if not code:
+            return None
+        return self.lookup_many(srv, ssid, [code]).get(code)
+
+    def lookup_many(self, srv, ssid: str, tracking_codes: Iterable) -> Dict[str, Optional[int]]:
+        """
+        Toplu yazım için: tüm kodlar tek seferde (en fazla bir sütun okuması
+        ve bir doğrulama okuması). Anahtarlar normalize edilmiş koddur; None = yeni satır.
+        Sütun bu çağrıda okunduysa bulunan satırlar zaten günceldir, doğrulanmaz.
+        """
+        codes = [c for c in (_norm(c) for c in tracking_codes) if c]
+        if not codes:
+            return {}
+        loaded = self.ensure_loaded(srv, ssid)
+        with self._lock:
+            out = {c: self._rows.get(c) for c in codes}
+        hits = {c: r for c, r in out.items() if r is not None}
+        if hits and not loaded and not self._verify(srv, ssid, hits):
+            with self._lock:
+                self.stats["mismatches"] += 1
+            logger.info("%s: önbellekteki satırlar sayfayla uyuşmuyor; indeks tazeleniyor.", self.sheet_name)
+            self.invalidate()
+            self.ensure_loaded(srv, ssid)
+            with self._lock:
+                out = {c: self._rows.get(c) for c in codes}
+        misses = sum(1 for r in out.values() if r is None)
+        with self._lock:
+            self.stats["hits"] += len(out) - misses
+            self.stats["misses"] += misses
+        return out
+
+    # ---- yazma sonrası güncelleme ----
+    def record(self, tracking_code, row: int) -> None:
+        code = _norm(tracking_code)
+        if not code or not row:
+            return
+        with self._lock:
+            self._rows[code] = row
+            self._last_row = max(self._last_row, row)
+            if self._loading:
+                self._recorded[code] = row
+
+    def record_append(self, tracking_code, resp: dict, n_rows: int = 1) -> Optional[int]:
+        """
+        values().append yanıtından satırı çıkar ve indekse yaz.
+        Dönen satır beklenen sıradaki satır değilse indeks kirli işaretlenir.
+        """
+        codes = [tracking_code] + [None] * (n_rows - 1)
+        return self.record_append_many(codes, resp)
+
+    def record_append_many(self, tracking_codes, resp: dict) -> Optional[int]:
+        """
+        Çok satırlı append: kodlar, eklenen satırlarla aynı sırada. Sayfanın
+        nesli değiştirilir (diğer süreçler yeni satırları görsün); beklenen
+        satıra düştüyse bu indeks yeni nesli benimser, yeniden okumaz.
+        """
+        updated = ((resp or {}).get("updates") or {}).get("updatedRange", "")
+        row = row_from_range(updated)
+        codes = list(tracking_codes)
+        before = self._current_generation()
+        token = _bump_generation(self.ssid, self.sheet_name)
+        if row is None:
+            self.invalidate()
+            return None
+        with self._lock:
+            consistent = not self._dirty and row == self._last_row + 1 and before == self._generation
+            if not consistent:
+                if not self._dirty and row != self._last_row + 1:
+                    self.stats["append_mismatches"] += 1
+                    logger.info(
+                        "%s: append beklenen satıra düşmedi (%s != %s); indeks tazelenecek.",
+                        self.sheet_name, row, self._last_row + 1,
+                    )
+                self._dirty = True
+            else:
+                self._generation = (before[0], token)
+            for offset, code in enumerate(codes):
+                if code is not None:
+                    self.record(code, row + offset)
+            self._last_row = max(self._last_row, row + len(codes) - 1)
+        return row
+
+    def snapshot(self) -> Tuple[int, int]:
+        """(kayıtlı kod sayısı, bilinen son satır)"""
+        with self._lock:
+            return len(self._rows), self._last_row
+
+
+_indexes: Dict[Tuple[str, str, str], TrackingRowIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(ssid: str, sheet_name: str, column: str = "A") -> TrackingRowIndex:
+    """(spreadsheet, worksheet, sütun) başına süreç içi tek indeks."""
+    key = (ssid, sheet_name, column)
+    with _indexes_lock:
+        idx = _indexes.get(key)
+        if idx is None:
+            idx = _indexes[key] = TrackingRowIndex(sheet_name, column=column, ssid=ssid)
+        return idx
+
+
+def invalidate_all() -> None:
+    with _indexes_lock:
+        for idx in _indexes.values():
+            idx.invalidate()
+
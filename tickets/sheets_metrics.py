@@ -0,0 +1,420 @@
+# tickets/sheets_metrics.py
+"""
+Google Sheets çağrıları için süreç içi telemetri.
+
+Eskiden Sheets sağlığının tek işareti runtime.log'daki uyarı satırlarıydı.
+Artık sheets_ratelimit.call() üzerinden geçen her deneme (gsheets /
+sheets_api / sheets_db / sheets_sync fark etmez) burada kaydedilir:
+
+  - işlem (values.get, values.append, ...) ve worksheet başına gecikme
+    histogramı (sabit ms kovaları; p50 / p95 / p99 kovalar içinde
+    doğrusal yaklaşımla),
+  - çağrı / tekrar deneme / hata sayaçları, HTTP durumu dağılımı,
+  - yük: satır sayısı ve gövde bayt'ı (yazımda istek, okumada yanıt satırları),
+  - dakika başına okuma / yazma kotası tüketimi (son 60 dakika).
+
+Sheets çağrılarının neredeyse tamamı sheets_worker / sync_sheets
+süreçlerinde yapılır; sayfayı sunan gunicorn süreci ise neredeyse hiç çağrı
+yapmaz. Bu yüzden her süreç ham sayaçlarını en geç SHEETS_METRICS_FLUSH_SECONDS
+aralıkla (ve çıkışta) SHEETS_RATELIMIT_DIR altındaki kendi dosyasına yazar;
+snapshot() / prometheus() bu süreçte ve dosyalardaki tüm süreçlerin verisini
+birleştirir. SHEETS_METRICS_RETENTION_HOURS'tan eski dosyalar silinir.
+Personel sayfası: views.sheets_metrics; Prometheus: /metrics (token ile).
+"""
+from __future__ import annotations
+
+import atexit
+import glob
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from django.conf import settings
+
+# Gecikme kovaları (ms, üst sınır); sonuncusu taşma kovası
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+QUOTA_MINUTES = 60
+
+_lock = threading.Lock()
+_series: Dict[Tuple[str, str], "_Series"] = {}
+_quota: deque = deque(maxlen=QUOTA_MINUTES)  # [dakika, okuma, yazma]
+_started = time.time()
+_flushed_at = 0.0
+
+logger = logging.getLogger(__name__)
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "SHEETS_METRICS_ENABLED", True))
+
+
+def flush_seconds() -> float:
+    return float(getattr(settings, "SHEETS_METRICS_FLUSH_SECONDS", 10))
+
+
+def retention_seconds() -> float:
+    return float(getattr(settings, "SHEETS_METRICS_RETENTION_HOURS", 24)) * 3600.0
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q: float) -> float:
+        """Kova içinde doğrusal yaklaşım; taşma kovasında gözlenen en büyük değer."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if not n:
+                continue
+            if seen + n >= rank:
+                if i == len(BUCKETS_MS):
+                    return self.max
+                low = BUCKETS_MS[i - 1] if i else 0.0
+                high = min(BUCKETS_MS[i], self.max)
+                return low + (max(high, low) - low) * (rank - seen) / n
+            seen += n
+        return self.max
+
+    def merge(self, counts: List[int], count: int, total: float, mx: float) -> None:
+        for i, n in enumerate(counts[:len(self.counts)]):
+            self.counts[i] += n
+        self.count += count
+        self.total += total
+        self.max = max(self.max, mx)
+
+
+class _Series:
+    __slots__ = ("kind", "latency", "calls", "retries", "errors", "rows", "bytes", "statuses")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.latency = Histogram()
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.statuses: Dict[str, int] = {}
+
+
+# ====== İstekten işlem / worksheet / yük çıkarma ======
+_ACTIONS = {"append", "clear", "batchGet", "batchUpdate", "batchClear",
+            "batchGetByDataFilter", "batchUpdateByDataFilter", "batchClearByDataFilter", "copyTo"}
+_PATH_RE = re.compile(r"/spreadsheets/[^/:]+(?P<rest>.*)$")
+
+
+def _split_action(part: str) -> Tuple[str, str]:
+    head, sep, tail = part.rpartition(":")
+    if sep and tail in _ACTIONS:
+        return head, tail
+    return part, ""
+
+
+def _sheet_of(a1: Optional[str]) -> str:
+    if not a1:
+        return ""
+    name = a1.split("!", 1)[0] if "!" in a1 else a1
+    return name.strip("'")
+
+
+def _payload_rows(payload) -> int:
+    if not isinstance(payload, dict):
+        return 0
+    if "values" in payload:
+        return len(payload.get("values") or [])
+    for key in ("data", "valueRanges"):
+        if key in payload:
+            return sum(len(d.get("values") or []) for d in payload.get(key) or [])
+    return 0
+
+
+def _first_range(payload) -> str:
+    if isinstance(payload, dict):
+        if payload.get("range"):
+            return payload["range"]
+        for key in ("data", "valueRanges"):
+            for d in payload.get(key) or []:
+                if d.get("range"):
+                    return d["range"]
+    return ""
+
+
+def describe(method: str, url: str, body=None, params=None) -> dict:
+    """
+    İstek → {'op', 'sheet', 'rows', 'bytes'}. body: str/bytes (googleapiclient)
+    ya da dict (gspread json=). Bilinmeyen URL'lerde op "other" olur.
+    """
+    method = (method or "GET").upper()
+    parts = urlsplit(url or "")
+    m = _PATH_RE.search(unquote(parts.path))
+    op, a1 = "other", ""
+    if m:
+        rest = m.group("rest")
+        if rest.startswith("/values"):
+            a1, action = _split_action(rest[len("/values"):].lstrip("/"))
+            if not a1 and action:
+                op = f"values.{action}"
+            else:
+                op = "values." + (action or ("get" if method == "GET" else "update"))
+        else:
+            _, action = _split_action(rest)
+            op = "spreadsheets." + (action or "get")
+
+    if isinstance(body, (bytes, bytearray)):
+        raw = bytes(body)
+    elif isinstance(body, str):
+        raw = body.encode("utf-8")
+    elif body is not None:
+        raw = json.dumps(body).encode("utf-8")
+    else:
+        raw = b""
+    payload = body if isinstance(body, dict) else None
+    if payload is None and raw[:1] == b"{":
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            payload = None
+
+    if not a1:
+        a1 = _first_range(payload)
+    if not a1:
+        query = dict(params or {})
+        query.update(parse_qs(parts.query))
+        ranges = query.get("ranges") or query.get("range")
+        if isinstance(ranges, (list, tuple)):
+            ranges = ranges[0] if ranges else ""
+        a1 = ranges or ""
+    return {"op": op, "sheet": _sheet_of(a1), "rows": _payload_rows(payload), "bytes": len(raw)}
+
+
+def response_rows(result) -> int:
+    """googleapiclient okuma sonucundaki satır sayısı (gspread yanıtı açılmaz)."""
+    return _payload_rows(result) if isinstance(result, dict) else 0
+
+
+# ====== Kayıt ======
+def _quota_bucket(now: float):
+    minute = int(now // 60)
+    if not _quota or _quota[-1][0] != minute:
+        _quota.append([minute, 0, 0])
+    return _quota[-1]
+
+
+def observe(info: Optional[dict], kind: str, seconds: float, status, retry: bool = False,
+            rows: int = 0) -> None:
+    """
+    Tek bir API denemesini kaydet. status: HTTP durumu (başarıda 200) ya da
+    yanıt yoksa hata sınıfı adı. Her deneme bir kota birimi sayılır.
+    """
+    if not enabled():
+        return
+    info = info or {}
+    key = (info.get("op") or "other", info.get("sheet") or "")
+    status = str(status)
+    with _lock:
+        s = _series.get(key)
+        if s is None:
+            s = _series[key] = _Series(kind)
+        s.latency.observe(seconds * 1000.0)
+        s.calls += 1
+        if retry:
+            s.retries += 1
+        if not status.startswith("2"):
+            s.errors += 1
+        s.rows += rows or info.get("rows", 0)
+        s.bytes += info.get("bytes", 0)
+        s.statuses[status] = s.statuses.get(status, 0) + 1
+        _quota_bucket(time.time())[1 if kind == "read" else 2] += 1
+    flush()
+
+
+def reset() -> None:
+    global _started
+    with _lock:
+        _series.clear()
+        _quota.clear()
+        _started = time.time()
+
+
+# ====== Süreçler arası paylaşım (dosya) ======
+def _dir() -> str:
+    return getattr(settings, "SHEETS_RATELIMIT_DIR", "") or tempfile.gettempdir()
+
+
+def _own_path() -> str:
+    # pid + başlangıç: fork sonrası ve pid yeniden kullanımında dosyalar karışmasın
+    return os.path.join(_dir(), f"t3ticket-sheets-metrics-{os.getpid()}-{int(_started * 1000)}.json")
+
+
+def _raw() -> dict:
+    """Bu sürecin ham sayaçları (kilit altında çağrılır)."""
+    return {
+        "started": _started,
+        "series": [
+            [op, sheet, s.kind, s.latency.counts, s.latency.count, s.latency.total, s.latency.max,
+             s.calls, s.retries, s.errors, s.rows, s.bytes, s.statuses]
+            for (op, sheet), s in _series.items()
+        ],
+        "quota": [list(q) for q in _quota],
+    }
+
+
+def flush(force: bool = False) -> None:
+    """Ham sayaçları sürecin dosyasına yaz (en fazla SHEETS_METRICS_FLUSH_SECONDS'ta bir)."""
+    global _flushed_at
+    if not enabled():
+        return
+    now = time.time()
+    with _lock:
+        if not _series or (not force and now - _flushed_at < flush_seconds()):
+            return
+        _flushed_at = now
+        raw = json.dumps(_raw())
+    path = _own_path()
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(raw)
+        os.replace(tmp, path)
+    except OSError:
+        logger.exception("Sheets metrikleri yazılamadı (%s).", path)
+
+
+atexit.register(flush, True)
+
+
+def _others() -> Iterable[dict]:
+    """Diğer süreçlerin son yazdığı sayaçlar; süresi dolan dosyalar silinir."""
+    own = _own_path()
+    cutoff = time.time() - retention_seconds()
+    for path in glob.glob(os.path.join(_dir(), "t3ticket-sheets-metrics-*.json")):
+        if path == own:
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                yield json.load(f)
+        except (OSError, ValueError):
+            continue
+
+
+def _collect():
+    """(en eski başlangıç, {(op, sheet): _Series}, {dakika: [okuma, yazma]}) — tüm süreçler."""
+    with _lock:
+        states = [_raw()]
+    states += list(_others())
+    series: Dict[Tuple[str, str], _Series] = {}
+    quota: Dict[int, List[int]] = {}
+    for st in states:
+        for op, sheet, kind, counts, count, total, mx, calls, retries, errors, rows, nbytes, statuses in st["series"]:
+            s = series.get((op, sheet))
+            if s is None:
+                s = series[(op, sheet)] = _Series(kind)
+            s.latency.merge(counts, count, total, mx)
+            s.calls += calls
+            s.retries += retries
+            s.errors += errors
+            s.rows += rows
+            s.bytes += nbytes
+            for status, n in statuses.items():
+                s.statuses[status] = s.statuses.get(status, 0) + n
+        for m, r, w in st["quota"]:
+            q = quota.setdefault(m, [0, 0])
+            q[0] += r
+            q[1] += w
+    return min(st["started"] for st in states), series, quota
+
+
+# ====== Dışa aktarım ======
+def snapshot() -> dict:
+    """Seri başına sayaçlar + p50/p95/p99 ve son 60 dakikanın kota tüketimi (tüm süreçler)."""
+    now = time.time()
+    started, merged, by_minute = _collect()
+    series = []
+    for (op, sheet), s in sorted(merged.items()):
+        h = s.latency
+        series.append({
+            "op": op, "sheet": sheet, "kind": s.kind,
+            "calls": s.calls, "retries": s.retries, "errors": s.errors,
+            "rows": s.rows, "bytes": s.bytes, "statuses": dict(s.statuses),
+            "p50_ms": h.quantile(0.50), "p95_ms": h.quantile(0.95), "p99_ms": h.quantile(0.99),
+            "avg_ms": h.total / h.count if h.count else 0.0, "max_ms": h.max,
+        })
+    current = int(now // 60)
+    quota = []
+    for m in range(current - QUOTA_MINUTES + 1, current + 1):
+        r, w = by_minute.get(m, (0, 0))
+        quota.append({"minute": m * 60, "read": r, "write": w})
+    return {
+        "since": started,
+        "series": series,
+        "quota": quota,
+        "limits": {
+            "read": float(getattr(settings, "SHEETS_READ_PER_MINUTE", 60)),
+            "write": float(getattr(settings, "SHEETS_WRITE_PER_MINUTE", 60)),
+        },
+    }
+
+
+def _label(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus() -> str:
+    """Prometheus metin formatı (histogram + sayaçlar + son dakikanın kotası)."""
+    out = [
+        "# TYPE sheets_request_duration_seconds histogram",
+    ]
+    _, merged, by_minute = _collect()
+    items = sorted(merged.items())
+    for (op, sheet), s in items:
+        labels = f'op="{_label(op)}",sheet="{_label(sheet)}"'
+        cumulative = 0
+        for bound, n in zip(BUCKETS_MS, s.latency.counts):
+            cumulative += n
+            out.append(f'sheets_request_duration_seconds_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+        out.append(f'sheets_request_duration_seconds_bucket{{{labels},le="+Inf"}} {s.latency.count}')
+        out.append(f"sheets_request_duration_seconds_sum{{{labels}}} {s.latency.total / 1000:.6f}")
+        out.append(f"sheets_request_duration_seconds_count{{{labels}}} {s.latency.count}")
+    for name, attr in (("retries", "retries"), ("errors", "errors"),
+                       ("payload_rows", "rows"), ("payload_bytes", "bytes")):
+        out.append(f"# TYPE sheets_{name}_total counter")
+        for (op, sheet), s in items:
+            out.append(f'sheets_{name}_total{{op="{_label(op)}",sheet="{_label(sheet)}"}} {getattr(s, attr)}')
+    out.append("# TYPE sheets_responses_total counter")
+    for (op, sheet), s in items:
+        for status, n in sorted(s.statuses.items()):
+            out.append(
+                f'sheets_responses_total{{op="{_label(op)}",sheet="{_label(sheet)}",'
+                f'status="{_label(status)}"}} {n}'
+            )
+    current = by_minute.get(int(time.time() // 60), [0, 0])
+    out.append("# TYPE sheets_quota_used_current_minute gauge")
+    out.append(f'sheets_quota_used_current_minute{{kind="read"}} {current[0]}')
+    out.append(f'sheets_quota_used_current_minute{{kind="write"}} {current[1]}')
+    return "\n".join(out) + "\n"
@@ -0,0 +1,336 @@
+# tickets/sheets_ratelimit.py
+"""
+Tüm Google Sheets çağrıları için ortak hız sınırlayıcı + yeniden deneme.
+
+Eskiden sheets_sync 429'da sabit 60 sn uyuyor, sheets_db.backoff ise her
+hatayı (kalıcı 4xx'ler dahil) körlemesine tekrar deniyordu; gunicorn
+worker'ları da birbirinin kotasını tüketiyordu. Artık:
+
+  - okuma ve yazma için ayrı token bucket'lar var; durum bir dosyada
+    tutulur ve dosya kilidiyle aynı makinedeki tüm süreçler arasında paylaşılır,
+  - bir süreç 429 aldığında Retry-After kadar (yoksa geri çekilme süresi kadar)
+    bucket tüm süreçler için kapatılır,
+  - yalnızca tekrar denenebilir hatalar (408/429/5xx, bağlantı/zaman aşımı)
+    üstel geri çekilme + jitter ile tekrar denenir; diğerleri hemen yükselir.
+    values.append ise yalnızca 429'da ve gitmediği kesin isteklerde tekrarlanır.
+
+Sınırlayıcı HTTP katmanına takılıdır (google_client: googleapiclient
+requestBuilder ve gspread HTTPClient), böylece gsheets / sheets_api /
+sheets_db / sheets_sync ayrıca bir şey yapmadan aynı kuralı kullanır.
+Her deneme sheets_metrics'e (gecikme, durum, yük, kota) kaydedilir.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from django.conf import settings
+
+from . import sheets_metrics
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+# Tekrarı çift satır yazan istekler (sheets_metrics.describe op'ları)
+NON_IDEMPOTENT_OPS = {"values.append"}
+# HTTP yanıtı olmayan ağ / taşıma hataları (requests, urllib3, httplib2, google-auth)
+_TRANSPORT_ERRORS = {"ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "ServerNotFoundError",
+                     "RemoteDisconnected", "ProtocolError", "TransportError", "gaierror"}
+# İsteğin sunucuya hiç ulaşmadığı kesin olan hatalar (DNS, bağlantı kurulamadı)
+_UNSENT_ERRORS = {"ConnectionRefusedError", "ConnectTimeout", "ServerNotFoundError", "gaierror",
+                  "NewConnectionError", "NameResolutionError"}
+
+_thread_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "retries": 0, "throttled": 0, "wait_seconds": 0.0, "giveups": 0}
+
+
+def _bump(key: str, n=1) -> None:
+    with _stats_lock:
+        _stats[key] += n
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+# ====== Hata sınıflandırma ======
+def status_of(exc: Exception) -> Optional[int]:
+    """googleapiclient HttpError / gspread APIError / requests hatasından HTTP durumu."""
+    resp = getattr(exc, "resp", None)  # googleapiclient
+    status = getattr(resp, "status", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)  # gspread / requests
+    if status is None:
+        status = getattr(exc, "status_code", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after(exc: Exception) -> Optional[float]:
+    headers = getattr(exc, "resp", None)
+    if headers is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    except AttributeError:
+        return None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transport_error(exc: Exception) -> bool:
+    """
+    Bağlantı / zaman aşımı hatası mı? Diğer OSError'lar (PermissionError,
+    FileNotFoundError: bucket dosyası, credential) ve kod / veri hataları sayılmaz.
+    """
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return type(exc).__name__ in _TRANSPORT_ERRORS
+
+
+def is_retryable(exc: Exception) -> bool:
+    status = status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    # HTTP yanıtı yoksa: yalnızca bağlantı / zaman aşımı hataları geçicidir
+    return is_transport_error(exc)
+
+
+def is_unsent(exc: Exception) -> bool:
+    """İstek sunucuya hiç gitmedi mi? (429 da işlenmeden reddedilmiş sayılır.)"""
+    if status_of(exc) == 429:
+        return True
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if type(exc).__name__ in _UNSENT_ERRORS:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def is_idempotent(info: Optional[dict]) -> bool:
+    return not (info and info.get("op") in NON_IDEMPOTENT_OPS)
+
+
+# ====== Süreçler arası dosya kilidi ======
+def _state_path(kind: str) -> str:
+    base = getattr(settings, "SHEETS_RATELIMIT_DIR", "") or tempfile.gettempdir()
+    return os.path.join(base, f"t3ticket-sheets-{kind}.bucket")
+
+
+if os.name == "nt":  # geliştirme ortamı (Windows)
+    import msvcrt
+
+    def _flock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _funlock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _flock(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _funlock(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def _locked_state(kind: str):
+    """Bucket durumunu kilit altında oku; blok sonunda yaz."""
+    path = _state_path(kind)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    with _thread_lock, os.fdopen(fd, "r+b") as f:
+        _flock(f)
+        try:
+            f.seek(0)
+            raw = f.read()
+            try:
+                state = json.loads(raw.decode("utf-8")) if raw else {}
+            except ValueError:
+                state = {}
+            yield state
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state).encode("utf-8"))
+            f.flush()
+        finally:
+            _funlock(f)
+
+
+# ====== Token bucket ======
+def _limits(kind: str):
+    per_minute = float(getattr(settings, f"SHEETS_{kind.upper()}_PER_MINUTE", 60))
+    burst = float(getattr(settings, "SHEETS_RATELIMIT_BURST", 10))
+    return per_minute / 60.0, max(1.0, burst)
+
+
+def _enabled() -> bool:
+    return bool(getattr(settings, "SHEETS_RATELIMIT_ENABLED", True))
+
+
+def acquire(kind: str, tokens: float = 1.0) -> float:
+    """
+    kind ("read"/"write") bucket'ından token al; gerekirse bekle.
+    Dönüş: toplam bekleme süresi (sn).
+    """
+    if not _enabled():
+        return 0.0
+    rate, capacity = _limits(kind)
+    waited = 0.0
+    while True:
+        with _locked_state(kind) as st:
+            now = time.time()
+            blocked_until = float(st.get("blocked_until", 0))
+            if blocked_until > now:
+                wait = blocked_until - now
+            else:
+                last = float(st.get("updated", now))
+                level = min(capacity, float(st.get("tokens", capacity)) + (now - last) * rate)
+                if level >= tokens:
+                    st["tokens"] = level - tokens
+                    st["updated"] = now
+                    if waited:
+                        _bump("throttled")
+                        _bump("wait_seconds", waited)
+                    return waited
+                st["tokens"] = level
+                st["updated"] = now
+                wait = (tokens - level) / rate
+        wait = min(wait, 5.0)
+        time.sleep(wait)
+        waited += wait
+
+
+def penalize(kind: str, seconds: float) -> None:
+    """429 sonrası bucket'ı tüm süreçler için `seconds` kadar kapat."""
+    if not _enabled() or seconds <= 0:
+        return
+    with _locked_state(kind) as st:
+        until = time.time() + seconds
+        st["blocked_until"] = max(float(st.get("blocked_until", 0)), until)
+        st["tokens"] = 0.0
+        st["updated"] = time.time()
+
+
+# ====== Yeniden deneme ======
+def _backoff(attempt: int) -> float:
+    base = float(getattr(settings, "SHEETS_RETRY_BASE_SECONDS", 1.0))
+    cap = float(getattr(settings, "SHEETS_RETRY_MAX_SECONDS", 64.0))
+    # "full jitter": [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def call(fn: Callable, kind: str = "read", max_retries: Optional[int] = None,
+         info: Optional[dict] = None):
+    """
+    fn()'i hız sınırı altında çalıştır; tekrar denenebilir hatalarda
+    Retry-After'a uyarak üstel geri çekilme + jitter ile yeniden dene.
+    info: sheets_metrics.describe() çıktısı; her deneme telemetriye yazılır.
+    Idempotent olmayan istekler (values.append) yalnızca 429'da ve isteğin hiç
+    gitmediği kesin hatalarda tekrarlanır: 5xx / zaman aşımında satır eklenmiş
+    olabilir, hata çağırana (outbox) bırakılır.
+    """
+    if max_retries is None:
+        max_retries = int(getattr(settings, "SHEETS_MAX_RETRIES", 5))
+    attempt = 0
+    while True:
+        acquire(kind)
+        _bump("calls")
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            sheets_metrics.observe(
+                info, kind, time.perf_counter() - started,
+                status_of(e) or type(e).__name__, retry=attempt > 0,
+            )
+            retryable = is_retryable(e) if is_idempotent(info) else is_unsent(e)
+            if not retryable or attempt >= max_retries:
+                if attempt:
+                    _bump("giveups")
+                raise
+            status = status_of(e)
+            delay = retry_after(e)
+            if delay is None:
+                delay = _backoff(attempt)
+            if status == 429:
+                penalize(kind, delay)
+            attempt += 1
+            _bump("retries")
+            logger.warning(
+                "Sheets %s çağrısı başarısız (%s); %.1fs sonra tekrar (%d/%d).",
+                kind, status or type(e).__name__, delay, attempt, max_retries,
+            )
+            time.sleep(delay)
+        else:
+            sheets_metrics.observe(
+                info, kind, time.perf_counter() - started, 200, retry=attempt > 0,
+                rows=sheets_metrics.response_rows(result) if kind == "read" else 0,
+            )
+            return result
+
+
+def kind_for_method(method: str) -> str:
+    return "read" if (method or "GET").upper() == "GET" else "write"
+
+
+# ====== HTTP katmanı kancaları (google_client kullanır) ======
+try:
+    from googleapiclient.http import HttpRequest as _HttpRequest
+except Exception:  # googleapiclient kurulu değil
+    _HttpRequest = None
+
+try:
+    from gspread.http_client import HTTPClient as _HTTPClient
+except Exception:  # gspread kurulu değil
+    _HTTPClient = None
+
+
+if _HttpRequest is not None:
+    class RateLimitedHttpRequest(_HttpRequest):
+        """build(requestBuilder=...) için: her execute() limit + retry altında."""
+
+        def execute(self, http=None, num_retries=0):
+            parent = super().execute
+            return call(
+                lambda: parent(http=http, num_retries=num_retries), kind_for_method(self.method),
+                info=sheets_metrics.describe(self.method, self.uri, self.body),
+            )
+else:
+    RateLimitedHttpRequest = None
+
+
+if _HTTPClient is not None:
+    class RateLimitedHTTPClient(_HTTPClient):
+        """gspread.authorize(http_client=...) için: her istek limit + retry altında."""
+
+        def request(self, method, endpoint, params=None, data=None, json=None, files=None, headers=None):
+            parent = super().request
+            return call(
+                lambda: parent(method, endpoint, params=params, data=data, json=json,
+                               files=files, headers=headers),
+                kind_for_method(method),
+                info=sheets_metrics.describe(method, endpoint, json if json is not None else data, params),
+            )
+else:
+    RateLimitedHTTPClient = None
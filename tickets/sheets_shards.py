@@ -0,0 +1,198 @@
+# tickets/sheets_shards.py
+"""
+Tickets / Changes worksheet'lerinin zamana göre parçalanması (sharding).
+
+Eskiden her satır sonsuza dek aynı iki sayfaya ekleniyordu: tracking_code
+sütunu her yüklemede baştan sona okunuyor, sayfa büyüdükçe Sheets yavaşlıyor
+ve sonunda hücre sınırına dayanıyordu. SHEETS_SHARDING_ENABLED açıkken:
+
+  - canlı sayfa (SHEETS_TICKETS_WORKSHEET) yalnızca seyahati bitmemiş
+    biletleri tutar; son seyahat tarihi (dönüş, yoksa gidiş) kesim tarihinden
+    (cutoff) önce olan biletler "<Tickets>_YYYY-MM" arşiv sayfalarına geçer,
+  - değişiklik talepleri de oluşturulma ayına göre "<Changes>_YYYY-MM"
+    sayfalarına taşınır; yeni talepler her zaman canlı sayfaya eklenir,
+  - kesim tarihi "bugün - SHEETS_SHARD_ARCHIVE_DAYS" gününün ayının ilk
+    günüdür: taşıma (rollover) ayda bir kez, tam senkronda
+    (sheets_sync.push_all) kendiliğinden yapılır,
+  - son rollover'ın kesim tarihi ve arşiv sayfaları SyncState("shards")
+    içinde tutulur. Worker (gsheets / sheets_api) ve pull bunu okuyarak bir
+    tracking_code'un hangi sayfada olduğunu bilir. Satır indeksi
+    (sheets_index) zaten sayfa başınadır.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import threading
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from . import sheets_index
+from .models import SyncState
+
+STATE = "shards"
+
+_lock = threading.Lock()
+_seen_cutoff: Optional[str] = None  # bu süreçte en son görülen kesim (değişince indeksler düşer)
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "SHEETS_SHARDING_ENABLED", False))
+
+
+def archive_days() -> int:
+    return int(getattr(settings, "SHEETS_SHARD_ARCHIVE_DAYS", 30))
+
+
+def tickets_sheet() -> str:
+    return getattr(settings, "SHEETS_TICKETS_WORKSHEET", "Tickets")
+
+
+def changes_sheet() -> str:
+    return getattr(settings, "SHEETS_CHANGES_WORKSHEET", "Changes")
+
+
+def archive_name(base: str, month: dt.date) -> str:
+    return f"{base}_{month:%Y-%m}"
+
+
+def target_cutoff(today: Optional[dt.date] = None) -> dt.date:
+    """Şu an olması gereken kesim tarihi (ayın ilk günü)."""
+    today = today or timezone.localdate()
+    return (today - dt.timedelta(days=archive_days())).replace(day=1)
+
+
+# ====== Kalıcı durum ======
+def state() -> dict:
+    """{'cutoff': 'YYYY-MM-DD' | None, 'tickets': [arşiv sayfaları], 'changes': [...]}"""
+    st = SyncState.objects.filter(name=STATE).first()
+    data = dict(st.data or {}) if st else {}
+    data.setdefault("cutoff", None)
+    data.setdefault("tickets", [])
+    data.setdefault("changes", [])
+    return data
+
+
+def save_state(cutoff: dt.date, tickets: List[str], changes: List[str]) -> None:
+    SyncState.objects.update_or_create(
+        name=STATE,
+        defaults={
+            "mark": timezone.now(),
+            "data": {"cutoff": cutoff.isoformat(), "tickets": sorted(tickets), "changes": sorted(changes)},
+        },
+    )
+
+
+def current_cutoff() -> Optional[dt.date]:
+    """Sheet'lerin şu anki düzenini belirleyen kesim (hiç rollover yoksa None)."""
+    if not enabled():
+        return None
+    raw = state()["cutoff"]
+    return dt.date.fromisoformat(raw) if raw else None
+
+
+def rollover_due(today: Optional[dt.date] = None) -> bool:
+    return enabled() and current_cutoff() != target_cutoff(today)
+
+
+# ====== Bilet / değişiklik -> sayfa ======
+def last_travel(ticket) -> Optional[dt.date]:
+    return getattr(ticket, "return_date", None) or getattr(ticket, "travel_date", None)
+
+
+def ticket_resolver() -> Callable:
+    """
+    ticket -> worksheet adı. Durum bir kez okunur (toplu yazımda bilet başına
+    sorgu yok). Kesim başka bir süreçte değiştiyse bu süreçteki satır
+    indeksleri düşürülür (satırlar taşınmış olabilir).
+    """
+    global _seen_cutoff
+    live = tickets_sheet()
+    if not enabled():
+        return lambda ticket: live
+    st = state()
+    with _lock:
+        if _seen_cutoff is not None and _seen_cutoff != st["cutoff"]:
+            sheets_index.invalidate_all()
+        _seen_cutoff = st["cutoff"]
+    if not st["cutoff"]:
+        return lambda ticket: live
+    cutoff = dt.date.fromisoformat(st["cutoff"])
+    archives = set(st["tickets"])
+
+    def resolve(ticket) -> str:
+        day = last_travel(ticket)
+        if day is None or day >= cutoff:
+            return live
+        name = archive_name(live, day.replace(day=1))
+        # Arşiv sayfası yoksa (ör. tarih sonradan geriye alındı) sonraki rollover'a dek canlıda kalır
+        return name if name in archives else live
+
+    return resolve
+
+
+def ticket_sheet(ticket) -> str:
+    return ticket_resolver()(ticket)
+
+
+def all_ticket_sheets() -> List[str]:
+    """Canlı sayfa + bilinen bilet arşivleri (pull / sorgu için)."""
+    if not enabled():
+        return [tickets_sheet()]
+    return [tickets_sheet()] + list(state()["tickets"])
+
+
+# ====== Sorgular (tam senkron / rollover) ======
+def _with_last_travel(qs):
+    return qs.annotate(last_travel=Coalesce(F("return_date"), F("travel_date")))
+
+
+def ticket_partitions(qs, cutoff: Optional[dt.date]):
+    """[(sayfa, queryset)] — canlı sayfa ilk sırada, arşivler aya göre."""
+    live = tickets_sheet()
+    if cutoff is None:
+        return [(live, qs)]
+    qs = _with_last_travel(qs)
+    out = [(live, qs.filter(last_travel__gte=cutoff))]
+    old = qs.filter(last_travel__lt=cutoff)
+    months = old.annotate(m=TruncMonth("last_travel")).values_list("m", flat=True).distinct().order_by("m")
+    for month in months:
+        month = month.date() if isinstance(month, dt.datetime) else month
+        nxt = (month.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
+        out.append((archive_name(live, month), old.filter(last_travel__gte=month, last_travel__lt=nxt)))
+    return out
+
+
+def change_partitions(qs, cutoff: Optional[dt.date]):
+    """[(sayfa, queryset)] — oluşturulma ayına göre; kesimden yenisi canlı sayfada."""
+    live = changes_sheet()
+    if cutoff is None:
+        return [(live, qs)]
+    start = timezone.make_aware(dt.datetime.combine(cutoff, dt.time.min))
+    out = [(live, qs.filter(created_at__gte=start))]
+    old = qs.filter(created_at__lt=start)
+    months = old.annotate(m=TruncMonth("created_at")).values_list("m", flat=True).distinct().order_by("m")
+    for month in months:
+        first = timezone.localtime(month) if timezone.is_aware(month) else month
+        first = first.date().replace(day=1)
+        nxt = (first.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
+        lo = timezone.make_aware(dt.datetime.combine(first, dt.time.min))
+        hi = timezone.make_aware(dt.datetime.combine(nxt, dt.time.min))
+        out.append((archive_name(live, first), old.filter(created_at__gte=lo, created_at__lt=hi)))
+    return out
+
+
+def live_tickets(qs):
+    """Canlı sayfadaki biletler (artımlı senkron satır konumları bunlar üzerinden)."""
+    cutoff = current_cutoff()
+    return qs if cutoff is None else _with_last_travel(qs).filter(last_travel__gte=cutoff)
+
+
+def live_changes(qs):
+    cutoff = current_cutoff()
+    if cutoff is None:
+        return qs
+    return qs.filter(created_at__gte=timezone.make_aware(dt.datetime.combine(cutoff, dt.time.min)))
@@ -0,0 +1,156 @@
+# tickets/sheets_snapshot.py
+"""
+Worksheet'in süreç içi, indeksli anlık görüntüsü (sheets_db okumaları için).
+
+Eskiden sheets_db.tickets_list her çağrıda tüm sayfayı get_all_records()
+ile indirip Python'da filtreliyor; tickets_get / tickets_update ise her
+seferinde başlık satırını ve tracking_code sütununu yeniden okuyordu.
+Artık:
+
+  - sayfa tek get_all_values() ile okunur, SHEETS_DB_SNAPSHOT_SECONDS boyunca
+    bellekte tutulur,
+  - anahtar (tracking_code) ve seçili alanlar (status, transport, user_type)
+    için bellek içi indeksler kurulur; eşitlik filtreleri indeks kesişimiyle
+    yanıtlanır,
+  - yazımlar (append / update) snapshot'a yerinde uygulanır; yanıttan satır
+    çıkarılamazsa snapshot geçersiz sayılır ve bir sonraki okumada tazelenir.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+
+
+def _ttl() -> float:
+    return float(getattr(settings, "SHEETS_DB_SNAPSHOT_SECONDS", 60))
+
+
+def _cell(v) -> str:
+    return "" if v is None else str(v)
+
+
+class WorksheetSnapshot:
+    """Bir worksheet'in kayıtları + anahtar ve alan indeksleri."""
+
+    def __init__(self, loader: Callable, key: str = "tracking_code",
+                 indexed: Iterable[str] = (), first_row: int = 2):
+        self._loader = loader  # -> gspread Worksheet
+        self.key = key
+        self.indexed = tuple(indexed)
+        self.first_row = first_row
+        self.headers: List[str] = []
+        self._records: Dict[str, dict] = {}  # anahtar -> kayıt
+        self._rows: Dict[str, int] = {}  # anahtar -> satır numarası
+        self._index: Dict[str, Dict[str, Set[str]]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.RLock()
+        self.stats = {"loads": 0, "hits": 0, "writes": 0}
+
+    # ---- yükleme ----
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and (time.monotonic() - self._loaded_at) < _ttl()
+
+    def age(self) -> float:
+        return float("inf") if self._loaded_at is None else time.monotonic() - self._loaded_at
+
+    def load(self) -> None:
+        values = self._loader().get_all_values()
+        headers = [_cell(h).strip() for h in (values[0] if values else [])]
+        with self._lock:
+            self.headers = headers
+            self._records, self._rows = {}, {}
+            self._index = {f: {} for f in self.indexed}
+            for row_no, row in enumerate(values[self.first_row - 1:], start=self.first_row):
+                rec = {h: (_cell(row[i]) if i < len(row) else "") for i, h in enumerate(headers) if h}
+                code = rec.get(self.key, "")
+                if code and code not in self._records:
+                    self._put(code, rec, row_no)
+            self._loaded_at = time.monotonic()
+            self.stats["loads"] += 1
+
+    def ensure(self) -> None:
+        with self._lock:
+            if not self._fresh():
+                self.load()
+            else:
+                self.stats["hits"] += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    # ---- indeks bakımı ----
+    def _put(self, code: str, rec: dict, row_no: int) -> None:
+        self._records[code] = rec
+        self._rows[code] = row_no
+        for f in self.indexed:
+            self._index[f].setdefault(rec.get(f, ""), set()).add(code)
+
+    def _unindex(self, code: str, rec: dict) -> None:
+        for f in self.indexed:
+            bucket = self._index[f].get(rec.get(f, ""))
+            if bucket is not None:
+                bucket.discard(code)
+
+    # ---- sorgular ----
+    def positions(self) -> Dict[str, int]:
+        """Başlık adı -> 1 tabanlı sütun."""
+        self.ensure()
+        return {h: i + 1 for i, h in enumerate(self.headers) if h}
+
+    def row_of(self, code: str) -> Optional[int]:
+        self.ensure()
+        return self._rows.get(code)
+
+    def get(self, code: str) -> Optional[dict]:
+        self.ensure()
+        with self._lock:
+            rec = self._records.get(code)
+            return dict(rec) if rec is not None else None
+
+    def filter(self, **equals) -> List[dict]:
+        """İndeksli alanlarda eşitlik filtresi (boş değerler yok sayılır)."""
+        self.ensure()
+        with self._lock:
+            wanted = {f: v for f, v in equals.items() if v}
+            sets = []
+            for f, v in wanted.items():
+                if f in self._index:
+                    sets.append(self._index[f].get(v, set()))
+            if sets:
+                codes = set.intersection(*sorted(sets, key=len))
+                recs = (self._records[c] for c in codes)
+            else:
+                recs = iter(self._records.values())
+            # indekslenmemiş alanlar (varsa) doğrudan karşılaştırılır
+            rest = {f: v for f, v in wanted.items() if f not in self._index}
+            return [dict(r) for r in recs if all(r.get(f) == v for f, v in rest.items())]
+
+    # ---- yazım sonrası güncelleme ----
+    def apply_update(self, code: str, fields: dict) -> None:
+        with self._lock:
+            rec = self._records.get(code)
+            if rec is None:
+                return
+            self._unindex(code, rec)
+            for k, v in fields.items():
+                if k in rec:
+                    rec[k] = _cell(v)
+            self._put(code, rec, self._rows[code])
+            self.stats["writes"] += 1
+
+    def apply_append(self, row: List, row_no: Optional[int]) -> None:
+        with self._lock:
+            if row_no is None or self._loaded_at is None:
+                self.invalidate()
+                return
+            rec = {h: (_cell(row[i]) if i < len(row) else "") for i, h in enumerate(self.headers) if h}
+            code = rec.get(self.key, "")
+            if code:
+                if code in self._records:
+                    self._unindex(code, self._records[code])
+                self._put(code, rec, row_no)
+            self.stats["writes"] += 1
@@ -1,22 +1,31 @@
 # tickets/sheets_sync.py
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
 import time
-from typing import List
+from bisect import bisect_left
+from collections import deque
+from datetime import timedelta
+from functools import partial
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from django.conf import settings
-from django.utils.dateparse import parse_date
+from django.core.exceptions import ValidationError
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 import gspread
-from google.oauth2.service_account import Credentials
-from gspread.exceptions import APIError
 
-from .models import TicketRequest, ChangeRequest
+from . import google_client, sheets_async, sheets_index, sheets_shards, ticket_rows
+from .models import TicketRequest, ChangeRequest, SheetOutbox, SyncState
 
 
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive",
-]
+logger = logging.getLogger(__name__)
+
+SCOPE = google_client.GSPREAD_SCOPES
 
 # Tek noktadan başlıklar
 TICKETS_HEADERS = [
@@ -52,137 +61,1045 @@ CHANGES_HEADERS = [
 
 
 def _gc() -> gspread.Client:
-    creds = Credentials.from_service_account_file(
-        settings.SHEETS_CREDENTIALS_FILE, scopes=SCOPE
-    )
-    return gspread.authorize(creds)
+    return google_client.gspread_client()
+
+
+def _spreadsheet_id() -> str:
+    return (
+        getattr(settings, "SHEETS_SPREADSHEET_ID", "")
+        or getattr(settings, "GOOGLE_SHEETS_SPREADSHEET_ID", "")
+    ).strip()
 
 
 def _ss(client: gspread.Client) -> gspread.Spreadsheet:
-    if not settings.SHEETS_SPREADSHEET_ID:
+    ssid = _spreadsheet_id()
+    if not ssid:
         raise RuntimeError("SHEETS_SPREADSHEET_ID ayarı boş. .env içinde tanımlayın.")
-    return client.open_by_key(settings.SHEETS_SPREADSHEET_ID)
+    return client.open_by_key(ssid)
 
 
-def _safe_name(u):
-    """Kullanıcı ad/soyadını güvenli üretmek için yardımcı."""
-    if not u:
-        return ""
-    full = u.get_full_name()
-    return full if full else u.username
+def _col_letter(n: int) -> str:
+    """1->A, 26->Z, 27->AA ..."""
+    s = ""
+    while n:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
 
 
-def _tickets_matrix() -> List[List[str]]:
-    """Django verilerinden TICKETS tablo matrisi üretir."""
+_TICKET_ROW = ticket_rows.serializer(TICKETS_HEADERS)
+_TICKET_KEY = TICKETS_HEADERS.index("tracking_code")
+
+
+def _ticket_row(t) -> List[str]:
+    return _TICKET_ROW.from_instance(t)
+
+
+def _change_row(c) -> List[str]:
+    return [
+        c.ticket.tracking_code if c.ticket_id else "",
+        c.reason or "",
+        str(c.created_at),
+    ]
+
+
+# Sheet'teki satır sırası: (created_at, id). Artımlı modda satır konumları buradan hesaplanır.
+TICKETS_ORDER = ("created_at", "id")
+CHANGES_ORDER = ("created_at", "id")
+
+
+def _chunk_size() -> int:
+    return int(getattr(settings, "SHEETS_SYNC_CHUNK_SIZE", 2000))
+
+
+def _block_rows() -> int:
+    return int(getattr(settings, "SHEETS_SYNC_BLOCK_ROWS", 5000))
+
+
+def _iter_ticket_items(qs=None) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Biletleri DB'den parça parça okuyup (tracking_code, satır) üretir.
+    Model nesnesi kurulmaz: yalnızca sayfa sütunları tuple olarak çekilir,
+    personel adları SQL'de birleştirilir (ticket_rows.iter_rows).
+    """
+    qs = (TicketRequest.objects.all() if qs is None else qs).order_by(*TICKETS_ORDER)
+    key = _TICKET_KEY
+    for row in _TICKET_ROW.iter_rows(qs, chunk_size=_chunk_size()):
+        yield row[key], row
+
+
+def _iter_change_items(qs=None) -> Iterator[Tuple[str, List[str]]]:
     qs = (
-        TicketRequest.objects
-        .select_related("purchased_by", "rejected_by")
-        .order_by("created_at")
+        (ChangeRequest.objects.all() if qs is None else qs)
+        .order_by(*CHANGES_ORDER)
+        .values_list("id", "ticket__tracking_code", "reason", "created_at")
     )
+    for cid, code, reason, created_at in qs.iterator(chunk_size=_chunk_size()):
+        yield str(cid), [code or "", reason or "", str(created_at)]
 
-    rows = []
-    for t in qs:
-        rows.append([
-            t.tracking_code,
-            t.user_type,
-            t.full_name,
-            t.tc_no,
-            t.phone,
-            t.origin,
-            t.destination,
-            str(t.travel_date) if t.travel_date else "",
-            str(t.departure_time) if t.departure_time else "",
-            t.return_destination or "",
-            str(t.return_date) if t.return_date else "",
-            str(t.return_time) if t.return_time else "",
-            t.reason or "",
-            t.reason_other or "",
-            t.preferred_airline or "",
-            t.transport,
-            t.status,
-            t.pnr_code or "",
-            str(t.created_at),
-            _safe_name(t.purchased_by),
-            _safe_name(t.rejected_by),
-            (t.rejection_reason or ""),
-        ])
-    return rows
+
+def _iter_ticket_rows() -> Iterator[List[str]]:
+    return (row for _, row in _iter_ticket_items())
+
+
+def _iter_change_rows() -> Iterator[List[str]]:
+    return (row for _, row in _iter_change_items())
+
+
+def _tickets_matrix() -> List[List[str]]:
+    """Django verilerinden TICKETS tablo matrisi üretir."""
+    return list(_iter_ticket_rows())
 
 
 def _changes_matrix() -> List[List[str]]:
-    qs = (
-        ChangeRequest.objects
-        .select_related("ticket")
-        .order_by("created_at")
-    )
-    rows = []
-    for c in qs:
-        rows.append([
-            c.ticket.tracking_code if c.ticket_id else "",
-            c.reason or "",
-            str(c.created_at),
-        ])
-    return rows
-
-
-def _values_update_with_retry(spreadsheet: gspread.Spreadsheet, range_name: str, values: List[List[str]],
-                              max_retries: int = 3, sleep_seconds: int = 60):
-    """
-    Google Sheets'e tek hamlede yaz. 429 (quota) gelirse bekleyip yeniden dene.
-    """
-    body = {"values": values}
-    last_err = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            return spreadsheet.values_update(
-                range_name,
-                params={"valueInputOption": "RAW"},
-                body=body,
-            )
-        except APIError as e:
-            last_err = e
-            # Sadece 429'da bekle, diğer hataları direkt yükselt
-            if "429" in str(e):
-                # Basit bekleme/log
-                print(f"[sync] 429 Quota exceeded (deneme {attempt}/{max_retries}). {sleep_seconds}s bekleniyor...")
-                time.sleep(sleep_seconds)
+    return list(_iter_change_rows())
+
+
+# ====== Senkron durumu (high-water mark) ======
+def _state(name: str) -> SyncState:
+    return SyncState.objects.get_or_create(name=name)[0]
+
+
+def _save_state(name: str, mark, **data) -> None:
+    st = _state(name)
+    st.mark = mark
+    st.data = data
+    st.save()
+
+
+def _overlap() -> timedelta:
+    # Geç commit edilen kayıtlar kaçmasın diye mark'tan biraz geriden başla
+    return timedelta(seconds=float(getattr(settings, "SHEETS_SYNC_OVERLAP_SECONDS", 5)))
+
+
+# ====== Satır grubu özetleri (son push'ta sheet'e ne yazıldı) ======
+# SyncState "<sayfa>_hashes".data = {"target": "<ssid>/<worksheet>", "headers": parmak izi,
+#                                    "rows": n, "group": G, "digests": [grup özeti, ...]}
+# Satır başına hash yerine SHEETS_SYNC_DIGEST_ROWS (G) satırlık grupların özeti
+# tutulur: tablo O(satır / G) boyutundadır ve push boyunca bellekte yalnızca o
+# ve o anki grup durur. i. grup, i*G+2 .. (i+1)*G+1 satırlarıdır (konum özete dahildir).
+def _content_hash(row: List[str]) -> str:
+    return hashlib.blake2b("\x1f".join(row).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _headers_fp(headers: List[str]) -> str:
+    return _content_hash(list(headers))
+
+
+def _digest_rows() -> int:
+    return max(1, int(getattr(settings, "SHEETS_SYNC_DIGEST_ROWS", 100)))
+
+
+def _group_digest(hashes: List[str]) -> str:
+    return hashlib.blake2b("".join(hashes).encode("ascii"), digest_size=8).hexdigest()
+
+
+def _load_hashes(name: str) -> dict:
+    st = SyncState.objects.filter(name=f"{name}_hashes").first()
+    return (st.data or {}) if st else {}
+
+
+def _forget_rows(name: str, positions: Iterable[int], rows: int) -> None:
+    """
+    Artımlı yazımdan sonra: yazılan satırların gruplarının özeti düşürülür,
+    bir sonraki push_all yalnızca o grupları yeniden yazar.
+    """
+    data = _load_hashes(name)
+    if not data:
+        return  # tablo yoksa bir sonraki push_all zaten hepsini yazar
+    group = int(data.get("group") or _digest_rows())
+    digests = data.get("digests") or []
+    for pos in positions:
+        i = (pos - 2) // group
+        if 0 <= i < len(digests):
+            digests[i] = ""
+    data["digests"] = digests
+    data["rows"] = rows
+    _save_state(f"{name}_hashes", timezone.now(), **data)
+
+
+def _load_resume(name: str) -> dict:
+    st = SyncState.objects.filter(name=f"{name}_resume").first()
+    return (st.data or {}) if st else {}
+
+
+def _clear_resume(name: str) -> None:
+    SyncState.objects.filter(name=f"{name}_resume").delete()
+
+
+# ====== Tam / fark yazımı ======
+# Her blok gönderildikten sonra yalnızca küçük bir kontrol noktası kaydedilir
+# (SyncState "<sayfa>_resume": {"upto": satır, "force": ...}); özet tablosu
+# push sonunda bir kez yazılır. Yarıda kesilen (ör. kota) bir push tekrar
+# çalıştırıldığında işaretin (upto) gerisindeki gruplar yazılmış sayılır, iş
+# son yazılan bloğun arkasından devam eder. Bu arada DB'de değişen satırlar
+# mark'tan sonradır: artımlı push / worker onları yine yazar.
+# pool (sheets_async) verilirse bloklar beklenmeden gönderilir (en fazla
+# pool.concurrency blok yolda); kontrol noktası yalnızca kendinden önceki tüm
+# bloklar yazıldığında, sırayla kaydedilir.
+#
+# Tek yazar varsayımı: özetler sayfanın okunmadan "son push'ta yazılan" hâli
+# olduğunu varsayar. Outbox worker'ı satırlara DB'nin güncel hâlini yazar; o
+# biletler DB'de değiştiği için özetleri de tutmaz ve push onları yine yazar.
+# Personelin elle düzenlediği ya da satır ekleyip sildiği sayfada ise özet
+# tutup sayfa farklı olabilir: bunu push göremez, `sync_sheets --reconcile`
+# (sayfayı okuyarak karşılaştırır, --repair ile onarır) ya da --full bulur.
+def _write_diff(ss: gspread.Spreadsheet, sheet: str, headers: List[str],
+                items: Iterable[Tuple[str, List[str]]], name: str, force: bool = False,
+                only_keys: Optional[set] = None, block_rows: Optional[int] = None,
+                dry_run: bool = False, progress: Optional[Callable] = None,
+                total: Optional[int] = None, pool=None) -> dict:
+    """
+    Satırları (anahtar, satır) sırasıyla konumlarına yerleştirir. Satırlar
+    SHEETS_SYNC_DIGEST_ROWS'luk gruplar halinde özetlenir; son push'ta aynı
+    konumlara aynı içerik yazılmışsa (özet eşit) grup atlanır, değilse grubun
+    tamamı yazılır. Yazılan gruplar bitişik aralıklar halinde toplanır ve
+    SHEETS_SYNC_BLOCK_ROWS (block_rows) satırda bir tek values.batchUpdate ile
+    gönderilir. force=True ise özetler yok sayılır (tam yazım).
+    only_keys: verilirse yalnızca bu anahtarlar yazılır (--since), diğerleri atlanır;
+    özet tablosu, kontrol noktası ve kuyruk temizliği yapılmaz.
+    dry_run: hiçbir şey gönderilmez / kaydedilmez; yazılacak anahtarlar 'keys'te döner.
+    progress(name, done, total, written, elapsed): her bloktan sonra çağrılır.
+    Dönüş: {'rows', 'written', 'skipped', 'bytes', 'resumed_from', 'keys'}.
+    """
+    target = f"{ss.id}/{sheet}"
+    group = _digest_rows()
+    fp = _headers_fp(headers)
+    since = only_keys is not None
+    prev = _load_hashes(name)
+    if prev.get("target") != target or int(prev.get("group") or 0) != group:
+        prev = {}  # başka spreadsheet / worksheet / grup boyu: eski özetler geçersiz
+    resume = {} if since else _load_resume(name)
+    if resume.get("target") != target or resume.get("headers") != fp or resume.get("group") != group:
+        resume = {}
+    # Yarıda kalmış bir yazımın devamı: işaretin gerisi yazıldı sayılır. Tam yazım
+    # (force) yalnızca yarıda kalmış bir tam yazımı sürdürür.
+    resume_upto = int(resume.get("upto", 0)) if resume and (resume.get("force") or not force) else 0
+    if force:
+        prev = dict(prev, digests=[], headers=None)
+    write_header = prev.get("headers") != fp
+    old = [] if write_header else (prev.get("digests") or [])
+    if resume_upto:
+        write_header = False  # başlık ilk blokla yazıldı
+    # Tam yazımda sheet elle bozulmuş olabilir: kuyruk her zaman temizlenir
+    prev_rows = int(prev.get("rows", 0)) if prev and not force else None
+    block_rows = block_rows or _block_rows()
+    last_col = _col_letter(len(headers))
+    started = time.monotonic()
+
+    out = {"rows": 0, "written": 0, "skipped": 0, "bytes": 0,
+           "resumed_from": resume_upto, "keys": [] if dry_run else None}
+    digests: List[str] = []
+    buf: List[Tuple[str, List[str]]] = []  # o anki grubun satırları
+    data: List[dict] = []
+    pending = 0
+    run_start: Optional[int] = None
+    run: List[List[str]] = []
+    inflight: deque = deque()  # (Future, kontrol noktası) — gönderim sırasıyla
+
+    def save_checkpoint(upto: Optional[int]):
+        if upto is not None:
+            _save_state(f"{name}_resume", timezone.now(), target=target, headers=fp, group=group,
+                        upto=upto, force=force)
+
+    def settle(keep: int):
+        while len(inflight) > keep:
+            fut, upto = inflight.popleft()
+            fut.result()
+            save_checkpoint(upto)
+
+    def close_run():
+        nonlocal run_start, run, pending
+        if run:
+            end = run_start + len(run) - 1
+            data.append({"range": f"{sheet}!A{run_start}:{last_col}{end}", "values": run})
+            pending += len(run)
+        run_start, run = None, []
+
+    def add(pos: int, key: str, row: List[str]):
+        nonlocal run_start
+        out["written"] += 1
+        if dry_run:
+            out["keys"].append(key)
+        if run_start is None:
+            run_start = pos
+        run.append(row)
+
+    def flush_group(first: int):
+        i = len(digests)
+        last = first + len(buf) - 1
+        digest = _group_digest([_content_hash(row) for _, row in buf])
+        if since:
+            # --since: yalnızca seçili satırlar (özet tablosu güncellenmez)
+            picked = [key in only_keys for key, _ in buf]
+            for pos, ((key, row), take) in enumerate(zip(buf, picked), start=first):
+                if take:
+                    add(pos, key, row)
+                else:
+                    out["skipped"] += 1
+                    close_run()
+        else:
+            digests.append(digest)
+            if last <= resume_upto or (not force and i < len(old) and old[i] == digest):
+                out["skipped"] += len(buf)
+                close_run()
             else:
-                raise
-    # Hâlâ olmadı → hatayı yükselt
-    raise last_err
+                for pos, (key, row) in enumerate(buf, start=first):
+                    add(pos, key, row)
+        buf.clear()
+
+    def send(upto: int, final: bool = False):
+        nonlocal data, pending
+        if data:
+            body = {"valueInputOption": "RAW", "data": data}
+            out["bytes"] += len(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+            if not dry_run:
+                checkpoint = None if (final or since) else upto
+                if pool is None:
+                    ss.values_batch_update(body=body)
+                    save_checkpoint(checkpoint)
+                else:
+                    inflight.append((pool.submit(ss.values_batch_update, body=body), checkpoint))
+                    settle(pool.concurrency)
+        data, pending = [], 0
+        if progress is not None:
+            progress(name, out["rows"], total, out["written"], time.monotonic() - started)
+
+    if write_header:
+        run_start, run = 1, [list(headers)]
 
+    first = 2
+    for pos, (key, row) in enumerate(items, start=2):
+        out["rows"] += 1
+        buf.append((key, row))
+        if len(buf) < group:
+            continue
+        flush_group(first)
+        first = pos + 1
+        if pending + len(run) >= block_rows:
+            close_run()
+            send(pos)
+        elif progress is not None and out["rows"] % block_rows == 0:
+            progress(name, out["rows"], total, out["written"], time.monotonic() - started)
+    if buf:
+        flush_group(first)
+    close_run()
+    send(out["rows"] + 1, final=True)
+    settle(0)
 
-def push_all():
+    if dry_run or since:
+        return out
+
+    # Eski (artık DB'de olmayan) kuyruk satırlarını temizle
+    if prev_rows is None or prev_rows > out["rows"]:
+        ss.values_clear(f"{sheet}!A{out['rows'] + 2}:{last_col}")
+
+    _save_state(f"{name}_hashes", timezone.now(), target=target, headers=fp, rows=out["rows"],
+                group=group, digests=digests)
+    _clear_resume(name)
+    return out
+
+
+def _hash_name(kind: str, sheet: str, live: str) -> str:
+    """Satır hash tablosunun SyncState adı: canlı sayfa 'tickets', arşiv 'tickets@Tickets_2025-01'."""
+    return kind if sheet == live else f"{kind}@{sheet}"
+
+
+def _ensure_sheets(ss: gspread.Spreadsheet, parts, headers: List[str]) -> None:
+    """Eksik arşiv sayfalarını (satır sayısına yetecek boyutta) oluştur."""
+    existing = {ws.title for ws in ss.worksheets()}
+    for sheet, qs in parts:
+        if sheet not in existing:
+            ss.add_worksheet(title=sheet, rows=max(qs.count() + 1, 100), cols=len(headers))
+
+
+def _run(pool, fns: List[Callable]) -> list:
+    """Bağımsız işleri (worksheet başına yazım) pool varsa eşzamanlı, yoksa sırayla çalıştır."""
+    return pool.jobs(fns) if pool is not None else [fn() for fn in fns]
+
+
+def _merge(results: List[dict]) -> dict:
+    out = {"rows": 0, "written": 0, "skipped": 0, "bytes": 0,
+           "resumed_from": results[0]["resumed_from"] if results else 0, "keys": None}
+    for r in results:
+        for k in ("rows", "written", "skipped", "bytes"):
+            out[k] += r[k]
+        if r["keys"] is not None:
+            out["keys"] = (out["keys"] or []) + r["keys"]
+    return out
+
+
+def _push_tickets_full(ss: gspread.Spreadsheet, force: bool = True, since=None,
+                       cutoff=None, **opts) -> dict:
+    """Biletleri canlı sayfaya ve (sharding açıksa) cutoff'tan eski olanları aylık arşivlere yazar."""
+    live = settings.SHEETS_TICKETS_WORKSHEET
+    parts = sheets_shards.ticket_partitions(TicketRequest.objects.all(), cutoff)
+    live_qs = parts[0][1]
+    agg = live_qs.aggregate(mark=Max("updated_at"), max_id=Max("id"))
+    only_keys = None
+    if since is not None:
+        only_keys = set(
+            TicketRequest.objects.filter(updated_at__gte=since).values_list("tracking_code", flat=True)
+        )
+    if len(parts) > 1 and not opts.get("dry_run"):
+        _ensure_sheets(ss, parts[1:], TICKETS_HEADERS)
+    results = _run(opts.get("pool"), [
+        partial(_write_diff, ss, sheet, TICKETS_HEADERS, _iter_ticket_items(qs),
+                _hash_name("tickets", sheet, live), force=force,
+                only_keys=only_keys, total=qs.count(), **opts)
+        for sheet, qs in parts
+    ])
+    res = _merge(results)
+    res["live_rows"] = results[0]["rows"]
+    res["sheets"] = [sheet for sheet, _ in parts[1:]]
+    if not opts.get("dry_run") and since is None:
+        # --since kısmi yazımdır: artımlı modun high-water mark'ı ilerletilmez
+        _save_state("tickets", agg["mark"], rows=res["live_rows"], max_id=agg["max_id"] or 0)
+    return res
+
+
+def _push_changes_full(ss: gspread.Spreadsheet, force: bool = True, since=None,
+                       cutoff=None, **opts) -> dict:
+    live = settings.SHEETS_CHANGES_WORKSHEET
+    parts = sheets_shards.change_partitions(ChangeRequest.objects.all(), cutoff)
+    agg = parts[0][1].aggregate(mark=Max("created_at"), last_id=Max("id"))
+    only_keys = None
+    if since is not None:
+        only_keys = {
+            str(pk) for pk in ChangeRequest.objects.filter(created_at__gte=since).values_list("id", flat=True)
+        }
+    if len(parts) > 1 and not opts.get("dry_run"):
+        _ensure_sheets(ss, parts[1:], CHANGES_HEADERS)
+    results = _run(opts.get("pool"), [
+        partial(_write_diff, ss, sheet, CHANGES_HEADERS, _iter_change_items(qs),
+                _hash_name("changes", sheet, live), force=force,
+                only_keys=only_keys, total=qs.count(), **opts)
+        for sheet, qs in parts
+    ])
+    res = _merge(results)
+    res["live_rows"] = results[0]["rows"]
+    res["sheets"] = [sheet for sheet, _ in parts[1:]]
+    if not opts.get("dry_run") and since is None:
+        # --since kısmi yazımdır: artımlı modun high-water mark'ı ilerletilmez
+        _save_state("changes", agg["mark"], rows=res["live_rows"], last_id=agg["last_id"] or 0)
+    return res
+
+
+SHEETS = ("tickets", "changes")
+
+
+def push_all(full: bool = False, only: Optional[Iterable[str]] = None, since=None,
+             block_rows: Optional[int] = None, dry_run: bool = False,
+             progress: Optional[Callable] = None, concurrency: Optional[int] = None):
     """
-    Hiç okuma yapmadan:
-      - Tickets sayfasını başlık + veri ile komple yazar,
-      - Changes sayfasını başlık + veri ile komple yazar.
-    Böylece READ kotasına takılmadan, tek/az sayıda WRITE ile biter.
+    Hiç okuma yapmadan Tickets ve Changes sayfalarını DB ile eşitler.
+    Satır başına son yazılan içeriğin hash'i tutulur; yalnızca hash'i
+    (ya da konumu) değişen satırlar bitişik aralıklar halinde yazılır.
+    full=True: hash'leri yok say, her şeyi yeniden yaz (sheet elle bozulduysa).
+    Satırlar DB'den parça parça okunur; bellek kullanımı blok boyutuyla sınırlı kalır.
+    Yarıda kesilen push bir sonraki çağrıda son yazılan bloktan devam eder.
+    Artımlı mod için high-water mark'lar da güncellenir.
+
+    only: ("tickets", "changes") alt kümesi. since: yalnızca bu andan sonra
+    değişen (bilet) / eklenen (değişiklik) satırlar yazılır; high-water mark ve
+    özet tablosu değişmez (bir sonraki push farkı yine bulur). block_rows:
+    SHEETS_SYNC_BLOCK_ROWS yerine. dry_run / progress: bkz. _write_diff.
+    concurrency: aynı anda yoldaki en fazla Sheets çağrısı (varsayılan
+    SHEETS_ASYNC_CONCURRENCY, 1 = sıralı). Sayfalar (Tickets / Changes /
+    arşivler) ayrı işlerde, her sayfanın blokları beklenmeden yazılır.
+
+    Sharding açıksa (sheets_shards) satırlar canlı / aylık arşiv sayfalarına
+    bölünür. Kesim tarihi ilerlediyse bu push rollover'dır: eski satırlar
+    arşive taşınır, yeni kesim push bittikten sonra kaydedilir. Rollover
+    yalnızca her iki sayfanın tamamı yazılırken yapılır (only / since yoksa).
     """
+    only = set(only or SHEETS)
     client = _gc()
     ss = _ss(client)
 
-    # Tickets
-    tickets_values = [TICKETS_HEADERS] + _tickets_matrix()
-    _values_update_with_retry(
-        ss,
-        f"{settings.SHEETS_TICKETS_WORKSHEET}!A1",
-        tickets_values,
-        max_retries=3,
-        sleep_seconds=60,
+    cutoff = sheets_shards.current_cutoff()
+    rollover = False
+    if sheets_shards.enabled() and only == set(SHEETS) and since is None:
+        target = sheets_shards.target_cutoff()
+        rollover = target != cutoff
+        cutoff = target
+
+    opts = dict(since=since, block_rows=block_rows, dry_run=dry_run, progress=progress, cutoff=cutoff,
+                pool=sheets_async.client(concurrency))
+    empty = {"rows": 0, "written": 0, "skipped": 0, "bytes": 0, "resumed_from": 0, "keys": None,
+             "sheets": []}
+    t, c = _run(opts["pool"], [
+        partial(_push_tickets_full, ss, force=full, **opts) if "tickets" in only else lambda: empty,
+        partial(_push_changes_full, ss, force=full, **opts) if "changes" in only else lambda: empty,
+    ])
+    if t["written"] and not dry_run:
+        # satırlar yeniden yazıldı / kaydı: tüm süreçlerin satır indeksleri sütunu tazelesin
+        sheets_index.mark_changed()
+    if rollover and not dry_run:
+        st = sheets_shards.state()
+        sheets_shards.save_state(
+            cutoff, set(st["tickets"]) | set(t["sheets"]), set(st["changes"]) | set(c["sheets"])
+        )
+        sheets_index.mark_changed()
+        logger.info("Sheets rollover: kesim %s, arşivler %s / %s", cutoff, t["sheets"], c["sheets"])
+    return {
+        "rollover": cutoff if rollover else None,
+        "tickets_rows": t["rows"],
+        "tickets_written": t["written"],
+        "tickets_skipped": t["skipped"],
+        "tickets_resumed_from": t["resumed_from"],
+        "tickets_keys": t["keys"],
+        "changes_rows": c["rows"],
+        "changes_written": c["written"],
+        "changes_skipped": c["skipped"],
+        "changes_resumed_from": c["resumed_from"],
+        "changes_keys": c["keys"],
+        "bytes_sent": t["bytes"] + c["bytes"],
+    }
+
+
+# ====== Artımlı (delta) yazım ======
+def _push_tickets_delta(ss: gspread.Spreadsheet, state: SyncState):
+    """
+    Son push'tan beri değişen biletleri bilinen satırlarına yazar.
+    Sapma (drift) varsa None döner; çağıran tam yazıma geçer.
+    Outbox worker'ı yeni biletleri aynı bölgeye kendi sırasıyla ekler: yeni
+    satırların konumları da yazmadan önce doğrulanır, yazımdan sonra satır
+    indeksleri (tüm süreçlerde) sütunu yeniden okur.
+    """
+    sheet = settings.SHEETS_TICKETS_WORKSHEET
+    rows_before = int(state.data.get("rows", 0))
+    max_id = int(state.data.get("max_id", 0))
+
+    # Sharding açıksa yalnızca canlı sayfadaki biletler (arşivleri worker günceller)
+    base = sheets_shards.live_tickets(TicketRequest.objects.all())
+
+    # Son push'taki biletlerden silinen (ya da arşive düşen) varsa satırlar kaymıştır
+    if base.filter(id__lte=max_id).count() != rows_before:
+        return None
+
+    new_mark = base.aggregate(m=Max("updated_at"))["m"]
+    qs = base.select_related("purchased_by", "rejected_by")
+    if state.mark:
+        qs = qs.filter(updated_at__gt=state.mark - _overlap())
+    changed = list(qs.order_by(*TICKETS_ORDER))
+    if not changed:
+        return {"updated": 0, "appended": 0}
+
+    ordered_ids = list(base.order_by(*TICKETS_ORDER).values_list("id", flat=True))
+    pos = {pk: i + 2 for i, pk in enumerate(ordered_ids)}  # 1. satır başlık
+    existing = [t for t in changed if t.id <= max_id]
+    new = [t for t in changed if t.id > max_id]
+
+    # Yeni biletler mevcut satırların hemen arkasına, boşluksuz düşmeli
+    expected = list(range(rows_before + 2, rows_before + 2 + len(new)))
+    if sorted(pos[t.id] for t in new) != expected or len(ordered_ids) != rows_before + len(new):
+        return None
+
+    # Hedef hücreleri tek batchGet ile (tek hücre) doğrula: bilinen satırda kendi kodu
+    # durmalı; yeni satırın yeri boş olmalı ya da (worker eklediyse) yine kendi kodu
+    # durmalı. Worker / personel o bölgeye başka bir satır eklediyse drift: tam yazım.
+    targets = existing + new
+    resp = ss.values_batch_get([f"{sheet}!A{pos[t.id]}" for t in targets])
+    for t, vr in zip(targets, resp.get("valueRanges", [])):
+        vals = vr.get("values") or [[""]]
+        cell = str(vals[0][0] if vals[0] else "").strip().upper()
+        if cell != t.tracking_code.upper() and (t.id <= max_id or cell):
+            return None
+
+    rows = [_ticket_row(t) for t in changed]
+    data = [{"range": f"{sheet}!A{pos[t.id]}", "values": [row]} for t, row in zip(changed, rows)]
+    ss.values_batch_update(body={"valueInputOption": "RAW", "data": data})
+    if new:
+        sheets_index.mark_changed(_spreadsheet_id(), sheet)
+
+    new_max = max([max_id] + [t.id for t in new])
+    _save_state("tickets", new_mark, rows=rows_before + len(new), max_id=new_max)
+    _forget_rows("tickets", [pos[t.id] for t in changed], rows_before + len(new))
+    return {"updated": len(existing), "appended": len(new)}
+
+
+def _push_changes_delta(ss: gspread.Spreadsheet, state: SyncState):
+    """Yeni değişiklik taleplerini Changes sayfasının sonuna ekler. Drift varsa None."""
+    sheet = settings.SHEETS_CHANGES_WORKSHEET
+    rows_before = int(state.data.get("rows", 0))
+    last_id = int(state.data.get("last_id", 0))
+
+    base = sheets_shards.live_changes(ChangeRequest.objects.all())
+    if base.filter(id__lte=last_id).count() != rows_before:
+        return None
+
+    new = list(
+        base.select_related("ticket")
+        .filter(id__gt=last_id)
+        .order_by(*CHANGES_ORDER)
     )
+    if not new:
+        return {"appended": 0}
 
-    # Changes
-    changes_values = [CHANGES_HEADERS] + _changes_matrix()
-    _values_update_with_retry(
-        ss,
-        f"{settings.SHEETS_CHANGES_WORKSHEET}!A1",
-        changes_values,
-        max_retries=3,
-        sleep_seconds=60,
+    rows = [_change_row(c) for c in new]
+    ss.values_append(
+        f"{sheet}!A:C",
+        params={"valueInputOption": "RAW", "insertDataOption": "INSERT_ROWS"},
+        body={"values": rows},
+    )
+    _save_state(
+        "changes",
+        max(c.created_at for c in new),
+        rows=rows_before + len(new),
+        last_id=max(c.id for c in new),
     )
+    _forget_rows("changes", range(rows_before + 2, rows_before + 2 + len(new)), rows_before + len(new))
+    return {"appended": len(new)}
 
-    return {
-        "tickets_rows": len(tickets_values) - 1,
-        "changes_rows": len(changes_values) - 1,
-    }
+
+def push_incremental(only: Optional[Iterable[str]] = None, concurrency: Optional[int] = None):
+    """
+    Sadece son senkrondan beri değişen satırları yazar. Daha önce tam
+    senkron yapılmamışsa ya da sheet/DB arasında sapma tespit edilirse
+    ilgili sayfa tam yazılır. only: ("tickets", "changes") alt kümesi.
+    Sharding rollover'ı gelmişse (ve iki sayfa birden isteniyorsa) tam push yapılır.
+    Tickets ve Changes birbirinden bağımsızdır: concurrency > 1 ise eşzamanlı yazılır.
+    """
+    only = set(only or SHEETS)
+    if only == set(SHEETS) and sheets_shards.rollover_due():
+        res = push_all(concurrency=concurrency)
+        return {"tickets_full": True, "tickets_rows": res["tickets_rows"],
+                "changes_full": True, "changes_rows": res["changes_rows"], "rollover": res["rollover"]}
+    client = _gc()
+    ss = _ss(client)
+    cutoff = sheets_shards.current_cutoff()
+    pool = sheets_async.client(concurrency)
+    out = {"tickets_full": False, "changes_full": False}
+
+    def tickets():
+        t_state = SyncState.objects.filter(name="tickets").first()
+        t_res = _push_tickets_delta(ss, t_state) if t_state else None
+        if t_res is None:
+            return {"tickets_full": True,
+                    "tickets_rows": _push_tickets_full(ss, cutoff=cutoff, pool=pool)["rows"]}
+        return {"tickets_updated": t_res["updated"], "tickets_appended": t_res["appended"]}
+
+    def changes():
+        c_state = SyncState.objects.filter(name="changes").first()
+        c_res = _push_changes_delta(ss, c_state) if c_state else None
+        if c_res is None:
+            return {"changes_full": True,
+                    "changes_rows": _push_changes_full(ss, cutoff=cutoff, pool=pool)["rows"]}
+        return {"changes_appended": c_res["appended"]}
+
+    for part in _run(pool, [fn for name, fn in (("tickets", tickets), ("changes", changes)) if name in only]):
+        out.update(part)
+    return out
+
+
+# ====== Sheet -> DB (pull) ======
+# Personelin sheet üzerinde doğrudan düzelttiği alanlar
+PULL_FIELDS = ("status", "pnr_code", "rejection_reason")
+# SHEETS_PULL_FIELDS ile açılabilecekler: yalnızca düz metin, FK olmayan alanlar.
+# Sheet'te personel adı (purchased_by...), tarih/saat ve kimlik alanları
+# DB'ye geri yazılmaz; başka alan adı verilirse yok sayılır.
+PULL_ALLOWED = (
+    "status", "pnr_code", "rejection_reason", "notes",
+    "flight_number", "preferred_airline", "reason_other",
+)
+
+
+def _pull_fields() -> List[str]:
+    raw = getattr(settings, "SHEETS_PULL_FIELDS", "") or ""
+    fields = [f.strip() for f in raw.split(",") if f.strip()] if raw else list(PULL_FIELDS)
+    ignored = [f for f in fields if f not in PULL_ALLOWED]
+    if ignored:
+        logger.warning("SHEETS_PULL_FIELDS: izin verilmeyen alanlar yok sayıldı: %s", ", ".join(ignored))
+    return [f for f in fields if f in PULL_ALLOWED and f in TICKETS_HEADERS]
+
+
+def _pull_value(t: TicketRequest, name: str, raw: str):
+    """
+    Hücre değerini alanın kendi doğrulamasından geçirir (to_python + clean:
+    choices, max_length, null/blank). Boş hücre null alanda None, null olmayan
+    ama boş bırakılabilen alanda "" olur. Geçersizse ValidationError.
+    """
+    field = TicketRequest._meta.get_field(name)
+    value = raw if raw else (None if field.null else "")
+    return field.clean(value, t)
+
+
+def _norm_cell(v) -> str:
+    return "" if v is None else str(v).strip()
+
+
+def _row_hash(values: Iterable) -> str:
+    return hashlib.sha1("\x1f".join(_norm_cell(v) for v in values).encode("utf-8")).hexdigest()
+
+
+def _parse_sheet_ts(value: str):
+    dt = parse_datetime(_norm_cell(value)) if value else None
+    if dt is not None and timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, timezone.get_current_timezone())
+    return dt
+
+
+def pull_tickets() -> dict:
+    """
+    Tickets sayfasını (sharding açıksa canlı + arşiv sayfalarını) tek
+    batchGet ile okur, PULL_FIELDS üzerinden satır hash'i DB'dekinden farklı
+    olan biletleri bulur ve tek bulk_update ile uygular.
+
+    Çakışma (updated_at):
+      - outbox'ta bekleyen ya da başarısız (dead) işi olan bilet alınmaz: sheet
+        henüz DB'deki hâli görmemiştir, worker / admin yeniden kuyruğu yazar,
+      - sheet'te updated_at sütunu varsa satır bazında daha yeni olan kazanır,
+      - yoksa sheet düzeltmesi biletin sheet'e son yazılışından (sync_sheets
+        mark'ı ya da biletin son tamamlanan outbox işi, hangisi yeniyse) sonra
+        yapılmış sayılır; DB kaydı ondan sonra değiştiyse ya da bilet hiç
+        yazılmamış görünüyorsa DB kazanır (bir sonraki yazım sheet'i düzeltir).
+    """
+    fields = _pull_fields()
+    sheets = sheets_shards.all_ticket_sheets()
+    ss = _ss(_gc())
+    resp = ss.values_batch_get(sheets, params={"valueRenderOption": "FORMATTED_VALUE"})
+    out = {"rows": 0, "changed": 0, "applied": 0,
+           "conflicts": 0, "invalid": 0, "missing": 0, "sheets": len(sheets)}
+
+    # tracking_code -> (satır, sütun konumları); her sayfanın kendi başlık satırı var
+    sheet_rows = {}
+    for sheet, vr in zip(sheets, resp.get("valueRanges") or []):
+        values = vr.get("values", [])
+        if not values:
+            continue
+        out["rows"] += len(values) - 1
+        headers = [_norm_cell(h) for h in values[0]]
+        pos = {h: i for i, h in enumerate(headers) if h}
+        if "tracking_code" not in pos:
+            raise RuntimeError(f"'{sheet}' sayfasında tracking_code sütunu yok.")
+        key = pos["tracking_code"]
+        for row in values[1:]:
+            code = _norm_cell(row[key]).upper() if key < len(row) else ""
+            if code:
+                sheet_rows[code] = (row, pos)
+    if not sheet_rows:
+        return out
+
+    def cell(entry, name):
+        row, pos = entry
+        i = pos.get(name)
+        return _norm_cell(row[i]) if i is not None and i < len(row) else ""
+
+    state = SyncState.objects.filter(name="tickets").first()
+    mark = state.mark if state else None
+    now = timezone.now()
+    to_update = []
+
+    codes = list(sheet_rows)
+    size = _chunk_size()
+    for i in range(0, len(codes), size):
+        chunk = codes[i:i + size]
+        db = TicketRequest.objects.only("id", "tracking_code", "updated_at", *fields).in_bulk(
+            chunk, field_name="tracking_code"
+        )
+        out["missing"] += len(chunk) - len(db)
+        ids = [t.id for t in db.values()]
+        jobs = SheetOutbox.objects.filter(kind=SheetOutbox.KIND_TICKET, object_id__in=ids)
+        unsynced = set(jobs.exclude(status=SheetOutbox.STATUS_DONE).values_list("object_id", flat=True))
+        written = dict(
+            jobs.filter(status=SheetOutbox.STATUS_DONE)
+            .order_by().values("object_id").annotate(at=Max("processed_at"))
+            .values_list("object_id", "at")
+        )
+        for code, t in db.items():
+            entry = sheet_rows[code]
+            cols = [f for f in fields if f in entry[1]]  # sayfada olmayan sütun: DB değeri kalır
+            new = [cell(entry, f) for f in cols]
+            if _row_hash(new) == _row_hash(getattr(t, f) for f in cols):
+                continue
+            out["changed"] += 1
+
+            sheet_ts = _parse_sheet_ts(cell(entry, "updated_at")) if "updated_at" in entry[1] else None
+            if t.id in unsynced:
+                db_wins = True
+            elif sheet_ts is not None:
+                db_wins = bool(t.updated_at and t.updated_at >= sheet_ts)
+            else:
+                pushed = max((m for m in (mark, written.get(t.id)) if m is not None), default=None)
+                db_wins = pushed is None or bool(t.updated_at and t.updated_at > pushed)
+            if db_wins:
+                out["conflicts"] += 1
+                continue
+
+            try:
+                data = {f: _pull_value(t, f, v) for f, v in zip(cols, new)}
+            except ValidationError as e:
+                # yalnızca bu satır atlanır; bulk_update'i düşürmesin
+                logger.warning("%s: geçersiz değer sheet'ten alınmadı: %s", code, "; ".join(e.messages))
+                out["invalid"] += 1
+                continue
+            for f, v in data.items():
+                setattr(t, f, v)
+            t.updated_at = now
+            to_update.append(t)
+
+    if to_update:
+        # bulk_update sinyal tetiklemez: değişiklik outbox üzerinden sheet'e geri yazılmaz
+        TicketRequest.objects.bulk_update(to_update, fields + ["updated_at"], batch_size=size)
+    out["applied"] = len(to_update)
+    _save_state("pull", now, **out)
+    return out
+
+
+# ====== Mutabakat (sheet <-> DB, blok özetleri) ======
+# Başarısız / iki kez yapılan yazımlardan sonra sheet'in DB'den sapıp
+# sapmadığını anlamanın tek yolu tam push'tu. Mutabakatta sayfa
+# SHEETS_RECONCILE_BLOCK_ROWS satırlık bloklar halinde okunur (çağrı başına
+# SHEETS_RECONCILE_BLOCKS_PER_CALL blok, tek values.batchGet); her bloğun
+# özeti (satır hash'lerinin özeti) DB'de aynı konumlara düşmesi gereken
+# satırların özetiyle karşılaştırılır. Yalnızca özeti tutmayan blokların
+# satırları tek tek, tracking_code üzerinden incelenir.
+def _reconcile_block_rows() -> int:
+    return int(getattr(settings, "SHEETS_RECONCILE_BLOCK_ROWS", 1000))
+
+
+def _reconcile_blocks_per_call() -> int:
+    return max(1, int(getattr(settings, "SHEETS_RECONCILE_BLOCKS_PER_CALL", 10)))
+
+
+def _block_digest(hashes: List[str]) -> str:
+    return hashlib.blake2b("".join(hashes).encode("ascii"), digest_size=16).hexdigest()
+
+
+def _sheet_cell(v) -> str:
+    # RAW yazılan hücreler FORMATTED_VALUE ile aynen döner: kırpılmaz, hash'ler push ile aynı kalsın
+    return "" if v is None else str(v)
+
+
+def _reconcile_sheet(ss: gspread.Spreadsheet, sheet: str, items: Iterable[Tuple[str, List[str]]],
+                     block_rows: int, progress: Optional[Callable] = None,
+                     total: Optional[int] = None) -> dict:
+    """
+    Tek bir bilet sayfasını DB'deki (tracking_code, satır) sırasıyla karşılaştırır.
+    Sütunlar sayfanın kendi başlık satırına göre eşlenir; sayfada olmayan
+    sütunlar karşılaştırılmaz.
+    Dönüş: sayaçlar + missing / duplicates / stale / extra kod listeleri ve
+    onarım için satır konumları.
+    """
+    started = time.monotonic()
+    resp = ss.values_batch_get([f"{sheet}!1:1"], params={"valueRenderOption": "FORMATTED_VALUE"})
+    header_vals = ((resp.get("valueRanges") or [{}])[0].get("values") or [[]])[0]
+    header = [_norm_cell(h) for h in header_vals]
+    pos: Dict[str, int] = {}
+    for i, h in enumerate(header):
+        if h:
+            pos.setdefault(h, i)
+    if "tracking_code" not in pos:
+        raise RuntimeError(f"'{sheet}' sayfasında tracking_code sütunu yok.")
+    cols = [i for i, h in enumerate(TICKETS_HEADERS) if h in pos]
+    sheet_cols = [pos[TICKETS_HEADERS[i]] for i in cols]
+    key = pos["tracking_code"]
+    last_col = _col_letter(len(header))
+    exact = header == TICKETS_HEADERS
+
+    def db_hash(row):
+        return _content_hash(row if exact else [row[i] for i in cols])
+
+    def sheet_hash(row):
+        return _content_hash([_sheet_cell(row[j]) if j < len(row) else "" for j in sheet_cols])
+
+    out = {"sheet": sheet, "header": header, "rows": 0, "sheet_rows": 0, "blocks": 0,
+           "mismatched_blocks": 0, "blank": 0, "moved": 0}
+    seen: Dict[str, int] = {}          # sayfadaki kod -> kaç satırda geçtiği
+    again: Dict[str, List[int]] = {}   # tekrar eden kodların ilkinden sonraki satırları
+    truth: Dict[str, list] = {}        # sayfada DB konumunda ve DB içeriğiyle duran kodlar: [satır, hash]
+    db_rows: Dict[str, Tuple[int, str]] = {}      # uyuşmayan bloklardaki DB satırları: kod -> (konum, hash)
+    sheet_rows: Dict[str, Tuple[int, str]] = {}   # uyuşmayan bloklardaki sheet satırları (ilk geçiş)
+    last_row = 1
+
+    items = iter(items)
+    per_call = _reconcile_blocks_per_call()
+    start = 2
+    done = False
+    while not done:
+        starts = [start + i * block_rows for i in range(per_call)]
+        resp = ss.values_batch_get(
+            [f"{sheet}!A{s}:{last_col}{s + block_rows - 1}" for s in starts],
+            params={"valueRenderOption": "FORMATTED_VALUE"},
+        )
+        for s, vr in zip(starts, resp.get("valueRanges") or []):
+            values = vr.get("values") or []
+            db_block = list(islice(items, block_rows))
+            if not values and not db_block:
+                done = True
+                break
+            out["blocks"] += 1
+            out["rows"] += len(db_block)
+
+            codes = []
+            for off, row in enumerate(values):
+                code = _norm_cell(row[key]).upper() if key < len(row) else ""
+                codes.append(code)
+                if code:
+                    n = seen[code] = seen.get(code, 0) + 1
+                    if n > 1:
+                        again.setdefault(code, []).append(s + off)
+                    last_row = s + off
+                elif any(_norm_cell(v) for v in row):
+                    out["blank"] += 1  # tracking_code'u boş ama dolu satır
+                    last_row = s + off
+            db_hashes = [db_hash(row) for _, row in db_block]
+            sheet_hashes = [sheet_hash(row) for row in values]
+
+            if len(values) == len(db_block) and _block_digest(db_hashes) == _block_digest(sheet_hashes):
+                for off, ((code, _), h) in enumerate(zip(db_block, db_hashes)):
+                    truth[code] = [s + off, h]
+                continue
+
+            out["mismatched_blocks"] += 1
+            for off, ((code, _), h) in enumerate(zip(db_block, db_hashes)):
+                db_rows[code] = (s + off, h)
+            for off, (code, h) in enumerate(zip(codes, sheet_hashes)):
+                if code and code not in sheet_rows:
+                    sheet_rows[code] = (s + off, h)
+        else:
+            start = starts[-1] + block_rows
+        if progress is not None:
+            progress(sheet, out["rows"], total, len(db_rows), time.monotonic() - started)
+
+    out["sheet_rows"] = sum(seen.values()) + out["blank"]
+    missing, stale = [], []
+    placed: Dict[str, Tuple[int, int, str]] = {}  # kod -> (sayfadaki satır, DB konumu, DB hash'i)
+    for code, (at, h) in db_rows.items():
+        found = sheet_rows.get(code)
+        if found is None:
+            missing.append(code)
+            continue
+        placed[code] = (found[0], at, h)
+        if found[1] != h:
+            stale.append(code)
+        elif found[0] != at:
+            out["moved"] += 1
+    out["missing"] = missing
+    out["stale"] = stale
+    out["duplicates"] = sorted(again)
+    out["extra"] = [c for c in sheet_rows if c not in db_rows and c not in truth]
+    out["_truth"] = truth
+    out["_placed"] = placed
+    out["_again"] = again
+    out["_last_row"] = last_row
+    return out
+
+
+def _reconcile_repair(ss: gspread.Spreadsheet, res: dict, name: str) -> dict:
+    """
+    Yalnızca sorunlu satırları onarır (tracking_code üzerinden, worker gibi):
+      - eski (stale) satırların üzerine DB içeriği yazılır (tek batchUpdate),
+      - tekrar eden kodların ilk satırı kalır, diğerleri silinir (tek batch_update),
+      - eksik biletler sayfanın sonuna eklenir (tek append).
+    Sayfada olmayan sütunlara dokunulmaz (None hücreler atlanır). Sonra satır
+    grubu özetleri sayfanın gerçek durumuyla yeniden kurulur: bir sonraki
+    push_all yalnızca DB sırasından sapan satırların gruplarını yazar.
+    """
+    sheet = res["sheet"]
+    header = res["header"]
+    pos = {h: i for i, h in reversed(list(enumerate(header))) if h}
+    width = max(pos.values()) + 1
+
+    def layout(row: List[str]) -> list:
+        cells = [None] * width
+        for h, v in zip(TICKETS_HEADERS, row):
+            if h in pos:
+                cells[pos[h]] = v
+        return cells
+
+    codes = res["stale"] + res["missing"]
+    rows: Dict[str, List[str]] = {}
+    size = _chunk_size()
+    for i in range(0, len(codes), size):
+        qs = TicketRequest.objects.filter(tracking_code__in=codes[i:i + size])
+        rows.update(_iter_ticket_items(qs))
+
+    stale = [c for c in res["stale"] if c in rows]
+    if stale:
+        data = [{"range": f"{sheet}!A{res['_placed'][c][0]}", "values": [layout(rows[c])]} for c in stale]
+        ss.values_batch_update(body={"valueInputOption": "RAW", "data": data})
+
+    deleted = sorted((r for extra in res["_again"].values() for r in extra), reverse=True)
+    if deleted:
+        sheet_id = ss.worksheet(sheet).id
+        ss.batch_update({"requests": [
+            {"deleteDimension": {"range": {"sheetId": sheet_id, "dimension": "ROWS",
+                                           "startIndex": r - 1, "endIndex": r}}}
+            for r in deleted  # alttan üste: üstteki silmeler alttakilerin yerini kaydırmasın
+        ]})
+
+    missing = [c for c in res["missing"] if c in rows]
+    if missing:
+        ss.values_append(
+            f"{sheet}!A:{_col_letter(width)}",
+            params={"valueInputOption": "RAW", "insertDataOption": "INSERT_ROWS"},
+            body={"values": [layout(rows[c]) for c in missing]},
+        )
+
+    # Özet tablosu: silmelerden sonra DB konumunda ve DB içeriğiyle duran satırlar;
+    # yalnızca tüm satırları böyle olan grupların özeti yazılır, diğerleri boş kalır
+    ascending = deleted[::-1]
+    truth: Dict[int, str] = {}
+    placed = [(at, at, h) for at, h in res["_truth"].values()]
+    unrepaired = set(res["stale"]) - set(rows)  # bu arada DB'den silinmiş
+    placed += [v for c, v in res["_placed"].items() if c not in unrepaired]
+    for sheet_at, db_at, h in placed:
+        if sheet_at - bisect_left(ascending, sheet_at) == db_at:
+            truth[db_at] = h
+    group = _digest_rows()
+    digests = []
+    for first in range(2, res["rows"] + 2, group):
+        hashes = [truth.get(p) for p in range(first, min(first + group, res["rows"] + 2))]
+        digests.append(_group_digest(hashes) if all(hashes) else "")
+    _save_state(
+        f"{name}_hashes", timezone.now(), target=f"{ss.id}/{sheet}", headers=_headers_fp(header),
+        rows=max(res["_last_row"] - 1 - len(deleted), 0) + len(missing), group=group, digests=digests,
+    )
+    return {"updated": len(stale), "deleted": len(deleted), "appended": len(missing)}
+
+
+def reconcile_tickets(repair: bool = False, block_rows: Optional[int] = None,
+                      progress: Optional[Callable] = None) -> dict:
+    """
+    Tickets sayfasını (sharding açıksa canlı + arşiv sayfalarını) DB ile
+    blok özetleri üzerinden karşılaştırır. Hiçbir şey yazmadan şunları raporlar:
+      - missing: DB'de olup sayfada hiç bulunmayan,
+      - duplicates: sayfada birden fazla satırda geçen,
+      - stale: sayfadaki içeriği DB'den farklı olan,
+      - extra: sayfada olup (bu sayfa için) DB'de olmayan tracking_code'lar,
+      - moved: içeriği doğru ama DB sırasındaki konumunda durmayan satır sayısı.
+    repair=True: yalnızca missing / duplicates / stale satırları onarılır
+    (bkz. _reconcile_repair); extra satırlara dokunulmaz (elle eklenmiş olabilir).
+    """
+    block_rows = block_rows or _reconcile_block_rows()
+    ss = _ss(_gc())
+    live = settings.SHEETS_TICKETS_WORKSHEET
+    parts = sheets_shards.ticket_partitions(TicketRequest.objects.all(), sheets_shards.current_cutoff())
+    existing = {ws.title for ws in ss.worksheets()}
+    out = {"sheets": [], "rows": 0, "sheet_rows": 0, "blocks": 0, "mismatched_blocks": 0,
+           "blank": 0, "moved": 0, "missing": [], "duplicates": [], "stale": [], "extra": [],
+           "repaired": None}
+    repaired = {"updated": 0, "deleted": 0, "appended": 0}
+    for sheet, qs in parts:
+        if sheet not in existing:
+            raise RuntimeError(f"'{sheet}' sayfası yok; önce sync_sheets ile tam senkron yapın.")
+        res = _reconcile_sheet(ss, sheet, _iter_ticket_items(qs), block_rows,
+                               progress=progress, total=qs.count())
+        out["sheets"].append(sheet)
+        for k in ("rows", "sheet_rows", "blocks", "mismatched_blocks", "blank", "moved"):
+            out[k] += res[k]
+        for k in ("missing", "duplicates", "stale", "extra"):
+            out[k] += res[k]
+        if repair and (res["missing"] or res["duplicates"] or res["stale"]):
+            for k, v in _reconcile_repair(ss, res, _hash_name("tickets", sheet, live)).items():
+                repaired[k] += v
+    if repair:
+        out["repaired"] = repaired
+        if any(repaired.values()):
+            sheets_index.mark_changed()
+    _save_state("reconcile", timezone.now(), **{
+        k: (len(v) if isinstance(v, list) and k != "sheets" else v) for k, v in out.items()
+    })
+    return out
@@ -1,47 +1,35 @@
 # tickets/signals.py
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.conf import settings
 
 from .models import TicketRequest, ChangeRequest
 
-# Sheets ile konuşan fonksiyonları içe al
-# upsert_ticket: Tickets sayfasında ilgili tracking_code satırını (varsa günceller, yoksa ekler)
-# append_change: Changes sayfasına yeni bir satır ekler
+# Sheets ile doğrudan konuşmuyoruz: işler outbox'a düşer (aynı transaction),
+# Google'a yazımı `manage.py sheets_worker` yapar.
+# enqueue_ticket: Tickets sayfasında ilgili tracking_code satırını (varsa günceller, yoksa ekler)
+# enqueue_change: Changes sayfasına yeni bir satır ekler
+# View de aynı kaydı kuyruğa atar; outbox aynı transaction'daki tekrarları ve
+# değişmemiş hâli ayıklar, yani sinyal açıkken de bilet hâli başına tek yazım olur.
 try:
-    from .sheets_sync import upsert_ticket, append_change
+    from .outbox import enqueue_ticket, enqueue_change
 except Exception:
     # deploy sırasında import hatası olursa app ayakta kalsın
-    upsert_ticket = None
-    append_change = None
+    enqueue_ticket = None
+    enqueue_change = None
 
 
 @receiver(post_save, sender=TicketRequest)
 def push_ticket_to_sheet(sender, instance: TicketRequest, created, **kwargs):
-    # Sheets entegrasyonu kapalıysa çalışmasın
-    if not getattr(settings, "SHEETS_SPREADSHEET_ID", ""):
+    if enqueue_ticket is None:
         return
-    if upsert_ticket is None:
-        return
-
-    try:
-        upsert_ticket(instance)  # anlık olarak ilgili satırı yaz/güncelle
-    except Exception as e:
-        # loglamak istersen:
-        # import logging; logging.getLogger(__name__).exception("Sheets push error: %s", e)
-        pass
+    # Sheets entegrasyonu kapalıysa enqueue_ticket hiçbir şey yapmaz
+    enqueue_ticket(instance)
 
 
 @receiver(post_save, sender=ChangeRequest)
 def push_change_to_sheet(sender, instance: ChangeRequest, created, **kwargs):
     if not created:
         return  # değişiklik kaydı sadece ilk oluştuğunda yazılsın
-    if not getattr(settings, "SHEETS_SPREADSHEET_ID", ""):
+    if enqueue_change is None:
         return
-    if append_change is None:
-        return
-
-    try:
-        append_change(instance)  # Changes sayfasına yeni satır
-    except Exception:
-        pass
+    enqueue_change(instance)
@@ -0,0 +1,328 @@
+# tickets/tests.py
+"""
+Sheets entegrasyonunun çevrimdışı regresyon testleri.
+
+Google'a giden her istek süreç içi sahte uca (sheets_fake, SHEETS_FAKE=True)
+yönlenir; ağ ve credential gerekmez. Hız sınırlayıcı ve devre kesici
+kapatılır, paylaşılan durum dosyaları (satır indeksi nesli, metrikler) test
+başına geçici bir dizine yazılır.
+"""
+import datetime as dt
+import gzip
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    google_client, outbox, sheets_async, sheets_breaker, sheets_fake, sheets_headers, sheets_index,
+    sheets_ratelimit, ticket_rows,
+)
+from .management.commands.bench_rows import _legacy_inline, _legacy_lambda_dict
+from .models import ChangeRequest, SheetOutbox, TicketRequest
+from .views import _accepts_gzip
+
+SSID = "TEST"
+CHANGE_HEADERS = ["tracking_code", "change_text", "created_at"]
+
+
+def _ticket(**kwargs) -> TicketRequest:
+    data = dict(
+        user_type="staff", full_name="Yolcu", tc_no="12345678901", phone="555-555-55-55",
+        email="a@example.com", origin="ANK", destination="IST", travel_date=dt.date(2025, 1, 1),
+        reason="meeting", transport="plane",
+    )
+    data.update(kwargs)
+    return TicketRequest(**data)
+
+
+class FakeSheetsMixin:
+    """SHEETS_FAKE açık, boş Tickets / Changes sayfaları, temiz süreç önbellekleri."""
+
+    def setUp(self):
+        super().setUp()
+        self.state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.state_dir, True)
+        overrides = override_settings(
+            SHEETS_FAKE=True,
+            GOOGLE_SHEETS_SPREADSHEET_ID=SSID,
+            SHEETS_RATELIMIT_DIR=self.state_dir,
+            SHEETS_RATELIMIT_ENABLED=False,
+            SHEETS_BREAKER_ENABLED=False,
+            SHEETS_METRICS_ENABLED=False,
+            SHEETS_ASYNC_CONCURRENCY=1,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self._reset()
+        self.addCleanup(self._reset)
+        sheets_fake.seed(SSID, "Tickets", [list(ticket_rows.SHEET_COLUMNS)])
+        sheets_fake.seed(SSID, "Changes", [CHANGE_HEADERS])
+
+    def _reset(self):
+        sheets_fake.reset()
+        google_client.reset()
+        sheets_async.reset()
+        sheets_index.invalidate_all()
+        sheets_headers.invalidate()
+
+    def sheet_codes(self, sheet="Tickets"):
+        return [r[0] for r in sheets_fake.rows(SSID, sheet)[1:]]
+
+
+# ====== Outbox: tekrar ayıklama ve boşaltma (user-004 / user-005) ======
+class OutboxTests(FakeSheetsMixin, TestCase):
+    def _saved(self, **kwargs) -> TicketRequest:
+        # Kayıt sırasında kuyruğa iş düşmesin (sinyaller kapalı); testler kendisi ekler
+        with override_settings(GOOGLE_SHEETS_SPREADSHEET_ID=""):
+            t = _ticket(**kwargs)
+            t.save()
+        return t
+
+    def test_same_ticket_enqueued_twice_in_a_transaction_is_one_job(self):
+        t = self._saved()
+        with transaction.atomic():
+            outbox.enqueue_ticket(t)
+            t.status = "ticketed"
+            outbox.enqueue_ticket(t)
+        job = SheetOutbox.objects.get()
+        self.assertEqual(job.version, outbox.content_version(t))
+
+    def test_unchanged_ticket_is_not_enqueued_after_it_was_written(self):
+        t = self._saved()
+        outbox.enqueue_ticket(t)
+        self.assertEqual(outbox.drain(wait_for_batch=False)["done"], 1)
+        self.assertIsNone(outbox.enqueue_ticket(t))
+        self.assertEqual(SheetOutbox.objects.count(), 1)
+
+    def test_drain_writes_tickets_then_changes_in_one_batch(self):
+        a, b = self._saved(), self._saved()
+        with override_settings(GOOGLE_SHEETS_SPREADSHEET_ID=""):
+            change = ChangeRequest.objects.create(ticket=a, reason="tarih değişsin")
+        for t in (a, b):
+            outbox.enqueue_ticket(t)
+        outbox.enqueue_change(change)
+
+        result = outbox.drain(wait_for_batch=False)
+
+        self.assertEqual(result["done"], 3)
+        self.assertCountEqual(self.sheet_codes(), [a.tracking_code, b.tracking_code])
+        self.assertEqual(self.sheet_codes("Changes"), [a.tracking_code])
+        self.assertFalse(SheetOutbox.objects.exclude(status=SheetOutbox.STATUS_DONE).exists())
+
+    def test_second_drain_updates_the_existing_row(self):
+        t = self._saved()
+        outbox.enqueue_ticket(t)
+        outbox.drain(wait_for_batch=False)
+        t.status = "ticketed"
+        t.save()
+        outbox.enqueue_ticket(t)
+        outbox.drain(wait_for_batch=False)
+
+        rows = sheets_fake.rows(SSID, "Tickets")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][ticket_rows.SHEET_COLUMNS.index("status")], "ticketed")
+
+    def test_backing_off_job_blocks_only_its_own_tracking_code(self):
+        waiting, other = self._saved(), self._saved()
+        head = outbox.enqueue_ticket(waiting)
+        SheetOutbox.objects.filter(pk=head.pk).update(
+            attempts=1, next_attempt_at=timezone.now() + dt.timedelta(minutes=5)
+        )
+        behind = SheetOutbox.objects.create(
+            kind=SheetOutbox.KIND_TICKET, tracking_code=waiting.tracking_code, object_id=waiting.pk
+        )
+        outbox.enqueue_ticket(other)
+
+        result = outbox.drain(batch_size=1, wait_for_batch=False)
+
+        # Kuyruğun başı bekliyor olsa da parti diğer koddaki işle dolar
+        self.assertEqual(result["done"], 1)
+        self.assertEqual(self.sheet_codes(), [other.tracking_code])
+        self.assertEqual(
+            SheetOutbox.objects.get(pk=behind.pk).status, SheetOutbox.STATUS_PENDING
+        )
+
+
+# ====== Satır indeksi: isabet, ıska, kayma (user-002) ======
+class RowIndexTests(FakeSheetsMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        header = list(ticket_rows.SHEET_COLUMNS)
+        sheets_fake.seed(SSID, "Tickets", [header, ["AAA"], ["BBB"]])
+        # Süreç genelindeki indeks testler arasında sayaç biriktirmesin
+        self.index = sheets_index.TrackingRowIndex("Tickets", column="A", ssid=SSID)
+        self.srv = google_client.sheets_service()
+
+    def test_hit_and_miss(self):
+        self.assertEqual(self.index.lookup(self.srv, SSID, "bbb"), 3)
+        self.assertIsNone(self.index.lookup(self.srv, SSID, "NEW"))
+        self.assertEqual(self.index.stats["loads"], 1)
+
+    def test_cached_rows_are_verified_before_reuse(self):
+        self.index.lookup(self.srv, SSID, "BBB")
+        # Personel 2. satıra elle bir satır ekledi: önbellekteki 3. satır artık AAA
+        sheets_fake.seed(SSID, "Tickets", [list(ticket_rows.SHEET_COLUMNS), ["STAFF"], ["AAA"], ["BBB"]])
+        self.assertEqual(self.index.lookup(self.srv, SSID, "BBB"), 4)
+        self.assertEqual(self.index.stats["mismatches"], 1)
+        self.assertEqual(self.index.stats["loads"], 2)
+
+    def test_upsert_after_a_manual_insert_does_not_overwrite_another_row(self):
+        from . import gsheets
+
+        gsheets.upsert_by_tracking("Tickets", {"tracking_code": "BBB", "status": "pending"})
+        sheets_fake.seed(SSID, "Tickets", [list(ticket_rows.SHEET_COLUMNS), ["STAFF"], ["AAA"], ["BBB"]])
+        gsheets.upsert_by_tracking("Tickets", {"tracking_code": "BBB", "status": "ticketed"})
+
+        rows = sheets_fake.rows(SSID, "Tickets")
+        status = ticket_rows.SHEET_COLUMNS.index("status")
+        self.assertEqual([r[0] for r in rows[1:]], ["STAFF", "AAA", "BBB"])
+        self.assertEqual(rows[3][status], "ticketed")
+
+    def test_append_in_another_process_bumps_the_generation(self):
+        self.index.lookup(self.srv, SSID, "AAA")
+        sheets_fake.seed(SSID, "Tickets", [list(ticket_rows.SHEET_COLUMNS), ["AAA"], ["BBB"], ["CCC"]])
+        sheets_index.mark_changed(SSID, "Tickets")
+        self.assertEqual(self.index.lookup(self.srv, SSID, "CCC"), 4)
+
+
+# ====== Yeniden deneme sınıflandırması ve append koruması (user-008) ======
+class _HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.response = mock.Mock(status_code=status, headers={})
+
+
+@override_settings(SHEETS_RATELIMIT_ENABLED=False, SHEETS_METRICS_ENABLED=False,
+                   SHEETS_RETRY_BASE_SECONDS=0, SHEETS_MAX_RETRIES=3)
+class RetryTests(SimpleTestCase):
+    APPEND = {"op": "values.append"}
+    UPDATE = {"op": "values.batchUpdate"}
+
+    def _attempts(self, exc, info):
+        calls = []
+
+        def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                raise exc
+            return {}
+
+        try:
+            sheets_ratelimit.call(fn, "write", info=info)
+        except Exception:
+            pass
+        return len(calls)
+
+    def test_classification(self):
+        self.assertTrue(sheets_ratelimit.is_retryable(_HttpError(503)))
+        self.assertTrue(sheets_ratelimit.is_retryable(_HttpError(429)))
+        self.assertFalse(sheets_ratelimit.is_retryable(_HttpError(400)))
+        self.assertTrue(sheets_ratelimit.is_retryable(ConnectionResetError()))
+        self.assertTrue(sheets_ratelimit.is_retryable(TimeoutError()))
+        self.assertFalse(sheets_ratelimit.is_retryable(PermissionError()))
+        self.assertFalse(sheets_ratelimit.is_retryable(FileNotFoundError()))
+        self.assertFalse(sheets_ratelimit.is_retryable(KeyError("x")))
+
+    def test_idempotent_writes_retry_on_server_errors_and_timeouts(self):
+        self.assertEqual(self._attempts(_HttpError(503), self.UPDATE), 2)
+        self.assertEqual(self._attempts(TimeoutError(), self.UPDATE), 2)
+
+    def test_append_is_not_retried_when_it_may_have_landed(self):
+        self.assertEqual(self._attempts(_HttpError(503), self.APPEND), 1)
+        self.assertEqual(self._attempts(TimeoutError(), self.APPEND), 1)
+
+    def test_append_is_retried_when_it_was_never_applied(self):
+        class ConnectTimeout(Exception):
+            pass
+
+        self.assertEqual(self._attempts(_HttpError(429), self.APPEND), 2)
+        self.assertEqual(self._attempts(ConnectTimeout(), self.APPEND), 2)
+
+    def test_breaker_ignores_code_and_data_errors(self):
+        self.assertFalse(sheets_breaker.counts_as_failure(RuntimeError("tracking_code başlığı yok")))
+        self.assertFalse(sheets_breaker.counts_as_failure(KeyError("x")))
+        self.assertFalse(sheets_breaker.counts_as_failure(_HttpError(400)))
+        self.assertTrue(sheets_breaker.counts_as_failure(ConnectionError()))
+        self.assertTrue(sheets_breaker.counts_as_failure(_HttpError(503)))
+
+
+# ====== Serializer: eski satır kurucularıyla aynı çıktı (user-013) ======
+class SerializerParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.named = User.objects.create(username="ops", first_name="Ayşe", last_name="Yılmaz")
+        cls.unnamed = User.objects.create(username="nobody")
+        with override_settings(GOOGLE_SHEETS_SPREADSHEET_ID=""):
+            _ticket(purchased_by=cls.named, status="ticketed", pnr_code="P1").save()
+            _ticket(rejected_by=cls.unnamed, status="rejected", rejection_reason="belge yok").save()
+            _ticket(departure_time=dt.time(9, 30), return_date=dt.date(2025, 1, 5)).save()
+
+    def _tickets(self):
+        return list(TicketRequest.objects.select_related("purchased_by", "rejected_by").order_by("id"))
+
+    def test_from_instance_matches_legacy_builders(self):
+        for t in self._tickets():
+            row = ticket_rows.SHEET_ROW.from_instance(t)
+            self.assertEqual(row, _legacy_inline(t))
+            self.assertEqual(row, _legacy_lambda_dict(t))
+
+    def test_staff_without_a_name_is_blank_not_username(self):
+        t = TicketRequest.objects.get(rejected_by=self.unnamed)
+        self.assertEqual(ticket_rows.ticket_dict(t)["rejected_by"], "")
+
+    def test_values_and_sql_paths_match_instances(self):
+        s = ticket_rows.SHEET_ROW
+        qs = TicketRequest.objects.order_by("id")
+        expected = [s.from_instance(t) for t in self._tickets()]
+        self.assertEqual([s.from_values(v) for v in s.values_list(qs)], expected)
+        self.assertEqual(list(s.iter_rows(qs)), expected)
+
+
+# ====== CSV export: BOM, akış, gzip (user-025) ======
+class ExportCsvTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user("staff", password="x", is_staff=True)
+        with override_settings(GOOGLE_SHEETS_SPREADSHEET_ID=""):
+            for i in range(3):
+                _ticket(full_name=f"Yolcu {i}").save()
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+        self.url = reverse("tickets:export_csv")
+
+    def test_plain_stream_starts_with_bom(self):
+        resp = self.client.get(self.url)
+        body = b"".join(resp.streaming_content)
+        self.assertTrue(body.startswith(b"\xef\xbb\xbf"))
+        self.assertEqual(body.decode("utf-8-sig").splitlines()[0].split(",")[0], "tracking_code")
+        self.assertEqual(len(body.decode("utf-8-sig").splitlines()), 4)
+        self.assertNotIn("Content-Encoding", resp)
+        self.assertIn("Accept-Encoding", resp["Vary"])
+
+    def test_gzip_stream_when_accepted(self):
+        resp = self.client.get(self.url, {"gzip": "1"}, HTTP_ACCEPT_ENCODING="br, gzip;q=0.8")
+        self.assertEqual(resp["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", resp["Vary"])
+        body = gzip.decompress(b"".join(resp.streaming_content))
+        self.assertTrue(body.startswith(b"\xef\xbb\xbf"))
+        self.assertEqual(len(body.decode("utf-8-sig").splitlines()), 4)
+
+    def test_gzip_refused_with_zero_quality(self):
+        resp = self.client.get(self.url, {"gzip": "1"}, HTTP_ACCEPT_ENCODING="gzip;q=0, deflate")
+        self.assertNotIn("Content-Encoding", resp)
+        self.assertTrue(b"".join(resp.streaming_content).startswith(b"\xef\xbb\xbf"))
+
+    def test_accept_encoding_parsing(self):
+        self.assertTrue(_accepts_gzip("gzip, deflate"))
+        self.assertTrue(_accepts_gzip("*"))
+        self.assertFalse(_accepts_gzip("gzip;q=0, *"))
+        self.assertFalse(_accepts_gzip("xgzipx"))
+        self.assertFalse(_accepts_gzip(""))
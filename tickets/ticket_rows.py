@@ -0,0 +1,246 @@
+# tickets/ticket_rows.py
+"""
+TicketRequest -> sheet / export satırı için tek, şema tabanlı serializer.
+
+Eskiden aynı dönüşüm beş ayrı yerde elle yazılmıştı (sheets_api._row_from_ticket,
+gsheets.ticket_to_dict, utils.ticket_to_sheet_payload, sheets_sync._ticket_row,
+views._row_for_export) ve zamanla birbirinden ayrışmıştı. Artık:
+
+  - her sütun bir kez tanımlanır: kaynak alan(lar) + biçimlendirici,
+  - serializer(columns) istenen sütun sırası için hücre okuyucularını bir kez
+    kurar (önbellekli); satır başına dict / sütun adı araması yapılmaz,
+  - aynı serializer model nesnesinden (from_instance) ya da
+    values_list(*s.value_fields) tuple'ından (from_values) satır üretir,
+  - iter_rows(qs) model nesnesi kurmadan, personel adlarını SQL'de
+    (Concat) hesaplatıp yalnızca gereken sütunları tuple olarak çeker
+    (export / tam senkron için hızlı yol).
+
+Personel sütunları (purchased_by, rejected_by) eskisi gibi get_full_name()
+yazar: "Ad Soyad", ad-soyad boşsa ya da ilişki yoksa "" (kullanıcı adı yazılmaz).
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Coalesce, Concat, Trim
+
+
+# ====== Biçimlendiriciler ======
+def _text(v) -> str:
+    if v.__class__ is str:
+        return v
+    return "" if v is None else str(v)
+
+
+def _iso(v) -> str:
+    """Tarih / saat: boşsa "", değilse str() (YYYY-MM-DD, HH:MM:SS, datetime)."""
+    return str(v) if v else ""
+
+
+def _person(first, last) -> str:
+    """User.get_full_name() ile aynı: "Ad Soyad" (kırpılmış)."""
+    return f"{first or ''} {last or ''}".strip()
+
+
+def _person_sql(fk: str):
+    """SQL'de "Ad Soyad" (get_full_name gibi), ilişki yoksa ""."""
+    full = Trim(Concat(F(f"{fk}__first_name"), Value(" "), F(f"{fk}__last_name"), output_field=CharField()))
+    return Coalesce(full, Value(""), output_field=CharField())
+
+
+class Column:
+    __slots__ = ("name", "paths", "fmt", "sql")
+
+    def __init__(self, name: str, paths: Sequence[str], fmt: Callable = _text,
+                 sql: Optional[Callable] = None):
+        self.name = name
+        self.paths = tuple(paths)  # values_list yolları ("purchased_by__first_name" gibi)
+        self.fmt = fmt
+        self.sql = sql  # hızlı yol: değeri SQL'de hesaplayan ifade üreticisi
+
+
+def _col(name: str, fmt: Callable = _text, path: str = None) -> Column:
+    return Column(name, (path or name,), fmt)
+
+
+def _person_col(name: str, fk: str) -> Column:
+    return Column(name, (f"{fk}__first_name", f"{fk}__last_name"), _person,
+                  sql=lambda: _person_sql(fk))
+
+
+# ====== Şema: bilinen tüm sütunlar ======
+COLUMNS: Dict[str, Column] = {c.name: c for c in [
+    _col("tracking_code"),
+    _col("user_type"),
+    _col("full_name"),
+    _col("tc_no"),
+    _col("phone"),
+    _col("email"),
+    _col("birth_date", _iso),
+    _col("origin"),
+    _col("destination"),
+    _col("travel_date", _iso),
+    _col("departure_time", _iso),
+    _col("flight_number"),
+    _col("trip_type"),
+    _col("return_destination"),
+    _col("return_date", _iso),
+    _col("return_time", _iso),
+    _col("reason"),
+    _col("reason_other"),
+    _col("preferred_airline"),
+    _col("transport"),
+    _col("status"),
+    _col("pnr_code"),
+    _col("notes"),
+    _col("created_at", _iso),
+    _col("updated_at", _iso),
+    _person_col("purchased_by", "purchased_by"),
+    _person_col("rejected_by", "rejected_by"),
+    _col("rejection_reason"),
+    # sheets_db şemasındaki adlar
+    _col("created_by_email", path="created_by__email"),
+    _col("purchased_by_email", path="purchased_by__email"),
+    _person_col("purchased_by_name", "purchased_by"),
+    _col("rejected_by_email", path="rejected_by__email"),
+    _col("reject_reason", path="rejection_reason"),
+]}
+
+# Tickets sayfasının standart sütun sırası (sheets_api / sheets_sync / export)
+SHEET_COLUMNS: Tuple[str, ...] = (
+    "tracking_code", "user_type", "full_name", "tc_no", "phone",
+    "origin", "destination", "travel_date", "departure_time",
+    "return_destination", "return_date", "return_time",
+    "reason", "reason_other", "preferred_airline", "transport",
+    "status", "pnr_code", "created_at",
+    "purchased_by", "rejected_by", "rejection_reason",
+)
+
+# gsheets upsert'ünde sayfadaki başlıklara göre seçilen tüm alanlar
+DICT_COLUMNS: Tuple[str, ...] = SHEET_COLUMNS + ("email", "birth_date", "flight_number", "trip_type")
+
+
+def attr_getter(path: str) -> Callable:
+    """'purchased_by__first_name' -> t.purchased_by.first_name (ara nesne None ise None)."""
+    if "__" not in path:
+        return attrgetter(path)
+    parts = path.split("__")
+
+    def get(obj):
+        for p in parts:
+            if obj is None:
+                return None
+            obj = getattr(obj, p)
+        return obj
+    return get
+
+
+def _cell(fmt: Callable, getters: Sequence[Callable]) -> Callable:
+    """Tek hücre: kaynak(lar)ı oku, biçimlendir."""
+    if len(getters) == 1:
+        get = getters[0]
+        return lambda src: fmt(get(src))
+    return lambda src: fmt(*[g(src) for g in getters])
+
+
+class RowSerializer:
+    """
+    Belirli bir sütun sırası için satır üretici. Sütun başına hücre okuyucusu
+    (kaynak okuyucu + biçimlendirici) __init__'te bir kez kurulur; from_*
+    yöntemleri yalnızca bu okuyucuları sırayla uygular.
+    """
+
+    def __init__(self, columns: Sequence[str]):
+        unknown = [c for c in columns if c not in COLUMNS]
+        if unknown:
+            raise KeyError(f"Bilinmeyen bilet sütunu: {', '.join(unknown)}")
+        self.columns = tuple(columns)
+        cols = [COLUMNS[c] for c in self.columns]
+
+        # values_list alanları: tekrarsız, ilk görülme sırasıyla
+        fields: List[str] = []
+        for c in cols:
+            for p in c.paths:
+                if p not in fields:
+                    fields.append(p)
+        self.value_fields = tuple(fields)
+        self.related = tuple(sorted({p.split("__")[0] for p in fields if "__" in p}))
+
+        # Hızlı yol: SQL'de hesaplanan sütunlar tek annotate alanına iner
+        sql_fields: List[str] = []
+        self.sql_annotations = {}
+        sql_cols: List[Column] = []
+        for c in cols:
+            if c.sql is not None:
+                alias = f"_sql_{c.name}"
+                self.sql_annotations[alias] = c.sql()
+                sql_cols.append(Column(c.name, (alias,), _text))
+            else:
+                sql_cols.append(c)
+            for p in sql_cols[-1].paths:
+                if p not in sql_fields:
+                    sql_fields.append(p)
+        self.sql_fields = tuple(sql_fields)
+
+        index = {p: i for i, p in enumerate(self.value_fields)}
+        sql_index = {p: i for i, p in enumerate(self.sql_fields)}
+        self._instance_cells = tuple(_cell(c.fmt, [attr_getter(p) for p in c.paths]) for c in cols)
+        self._value_cells = tuple(_cell(c.fmt, [itemgetter(index[p]) for p in c.paths]) for c in cols)
+        self._sql_cells = tuple(
+            _cell(c.fmt, [itemgetter(sql_index[p]) for p in c.paths]) for c in sql_cols
+        )
+
+    def from_instance(self, t) -> List[str]:
+        return [cell(t) for cell in self._instance_cells]
+
+    def from_values(self, values: Sequence) -> List[str]:
+        """values: queryset.values_list(*self.value_fields) tuple'ı."""
+        return [cell(values) for cell in self._value_cells]
+
+    def from_sql_values(self, values: Sequence) -> List[str]:
+        """values: sql_values(qs) tuple'ı."""
+        return [cell(values) for cell in self._sql_cells]
+
+    def sql_values(self, qs):
+        """Yalnızca gereken sütunlar; personel adları SQL'de (model / User nesnesi yok)."""
+        if self.sql_annotations:
+            qs = qs.annotate(**self.sql_annotations)
+        return qs.values_list(*self.sql_fields)
+
+    def iter_rows(self, qs, chunk_size: int = 2000) -> Iterator[List[str]]:
+        """qs'ten sırayla satır üretir (sunucu tarafı cursor, parça parça)."""
+        fn = self.from_sql_values
+        for v in self.sql_values(qs).iterator(chunk_size=chunk_size):
+            yield fn(v)
+
+    def as_dict(self, t) -> Dict[str, str]:
+        return dict(zip(self.columns, self.from_instance(t)))
+
+    def values_list(self, qs):
+        """qs'i bu serializer'ın beklediği tuple'lara çevir (select_related gerekmez)."""
+        return qs.values_list(*self.value_fields)
+
+
+@lru_cache(maxsize=32)
+def _build(columns: Tuple[str, ...]) -> RowSerializer:
+    return RowSerializer(columns)
+
+
+def serializer(columns: Sequence[str] = SHEET_COLUMNS) -> RowSerializer:
+    return _build(tuple(columns))
+
+
+# İçe aktarma sırasında kurulan varsayılanlar
+SHEET_ROW = serializer(SHEET_COLUMNS)
+DICT_ROW = serializer(DICT_COLUMNS)
+
+
+def ticket_row(t, columns: Sequence[str] = SHEET_COLUMNS) -> List[str]:
+    return serializer(columns).from_instance(t)
+
+
+def ticket_dict(t) -> Dict[str, str]:
+    return DICT_ROW.as_dict(t)
@@ -23,5 +23,10 @@ urlpatterns = [
     path("panel/export/csv/", views.export_csv, name="export_csv"),
     path("panel/export/xlsx/", views.export_xlsx, name="export_xlsx"),
     path("panel/reports/", views.reports, name="reports"),
+    path("panel/sheets-metrics/", views.sheets_metrics_view, name="sheets_metrics"),
+    # yük dengeleyici / izleme (oturum gerektirmez)
+    path("healthz", views.healthz, name="healthz"),
+    path("readyz", views.readyz, name="readyz"),
+    path("metrics", views.sheets_metrics_prometheus, name="sheets_metrics_prometheus"),
     
 ]
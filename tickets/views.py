@@ -1,70 +1,32 @@
 # tickets/views.py
 from __future__ import annotations
 
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpResponse, HttpResponseBadRequest
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Count, Prefetch, Q
+from django.utils.cache import patch_vary_headers
 from django.utils.dateparse import parse_date
+from django.views.decorators.cache import never_cache
 
+import codecs
 import csv
+import datetime as dt
+import hmac
+import io
 import logging
+import zlib
 from openpyxl import Workbook
 
 from .models import TicketRequest, ChangeRequest
 from .forms import TicketRequestForm, ChangeRequestForm
+from . import health, outbox, sheets_breaker, sheets_metrics, ticket_rows
 
 logger = logging.getLogger(__name__)
 
-# --- Sheet backend'i otomatik seç (önce Service Account, sonra Apps Script) ---
-_gs = None
-_apps = None
-try:
-    from tickets import gsheets as _gs  # Service Account tabanlı
-except Exception as e:
-    print("GS import error:", e)
-    _gs = None
-
-
-try:
-    from tickets import sheets_api as _apps
-except Exception as e:
-    print("Apps import error:", e)
-    _apps = None
-
-
-
-def _sheet_create(ticket) -> dict | None:
-    """Yeni kayıt/insert. (gsheets: upsert, apps: create)"""
-    if _gs:
-        return _gs.upsert_ticket(ticket)
-    if _apps:
-        return _apps.create_ticket(ticket)
-    logger.warning("Sheet backend bulunamadı (gsheets/sheets_api yok).")
-    return None
-
-
-def _sheet_update(ticket) -> dict | None:
-    """Güncelleme/upsert."""
-    if _gs:
-        return _gs.upsert_ticket(ticket)
-    if _apps:
-        return _apps.update_ticket(ticket)
-    logger.warning("Sheet backend bulunamadı (gsheets/sheets_api yok).")
-    return None
-
-
-def _sheet_change_append(change) -> dict | None:
-    """Changes sekmesine ekle."""
-    if _gs:
-        return _gs.append_change(change)
-    if _apps:
-        return _apps.create_change(change)
-    logger.warning("Sheet backend bulunamadı (gsheets/sheets_api yok).")
-    return None
-
-
 # -----------------------
 # Ortak sabitler / yardımcılar
 # -----------------------
@@ -94,32 +56,8 @@ EXPORT_FIELDS = [
 ]
 
 
-def _row_for_export(t: TicketRequest):
-    """CSV/XLSX satır oluşturur (tarih/saatleri string'e çevirir)."""
-    return [
-        t.tracking_code,
-        t.user_type,
-        t.full_name,
-        t.tc_no,
-        t.phone,
-        t.origin,
-        t.destination,
-        str(t.travel_date) if t.travel_date else "",
-        str(t.departure_time) if t.departure_time else "",
-        t.return_destination or "",
-        str(t.return_date) if t.return_date else "",
-        str(t.return_time) if t.return_time else "",
-        t.reason,
-        (t.reason_other or ""),
-        (t.preferred_airline or ""),
-        t.transport,
-        t.status,
-        (t.pnr_code or ""),
-        str(t.created_at),
-        (t.purchased_by.get_full_name() if t.purchased_by else ""),
-        (t.rejected_by.get_full_name() if t.rejected_by else ""),
-        (t.rejection_reason or ""),
-    ]
+# CSV/XLSX satırları (tarih/saatler string, personel adları SQL'de)
+_EXPORT_ROW = ticket_rows.serializer(EXPORT_FIELDS)
 
 
 # -----------------------
@@ -133,28 +71,14 @@ def request_create(request):
     if request.method == "POST":
         form = TicketRequestForm(request.POST)
         if form.is_valid():
-            # 1) Önce DB'ye kaydet
-            ticket = form.save(commit=False)
-            if request.user.is_authenticated:
-                ticket.created_by = request.user
-            ticket.save()
-
-            # 2) Sheet'e gönder (create/upsert)
-            try:
-                logger.warning("SHEETS -> create çağrılıyor: %s", ticket.tracking_code or "(boş)")
-                resp = _sheet_create(ticket)
-                logger.warning("SHEETS -> yanıt: %s", resp)
-
-                # Apps Script tracking_code üretir ise geri yaz (Service Account'ta gerekmez)
-                if (
-                    not ticket.tracking_code
-                    and isinstance(resp, dict)
-                    and resp.get("tracking_code")
-                ):
-                    ticket.tracking_code = resp["tracking_code"]
-                    ticket.save(update_fields=["tracking_code"])
-            except Exception:
-                logger.exception("Sheet create failed")
+            # DB'ye kaydet + Sheets işini aynı transaction'da kuyruğa al
+            # (Google'a yazımı sheets_worker yapar; istek beklemez)
+            with transaction.atomic():
+                ticket = form.save(commit=False)
+                if request.user.is_authenticated:
+                    ticket.created_by = request.user
+                ticket.save()
+                outbox.enqueue_ticket(ticket)
 
             # Formu sıfırla + popup için tracking_code ver
             return render(
@@ -195,13 +119,10 @@ def request_status_detail(request, tracking_code):
                 else:
                     change.reason = reason
                     change.ticket = ticket
-                    change.save()
-
-                    # Sheets: Change append
-                    try:
-                        _sheet_change_append(change)
-                    except Exception:
-                        logger.exception("Sheet change append failed")
+                    with transaction.atomic():
+                        change.save()
+                        # Sheets: Change append (outbox üzerinden)
+                        outbox.enqueue_change(change)
 
                     messages.success(request, "Değişiklik talebiniz alındı.")
                     return redirect("tickets:status_detail", tracking_code=tracking_code)
@@ -338,13 +259,10 @@ def staff_ticket_edit(request, pk):
         if new_destination:
             ticket.destination = new_destination
 
-        ticket.save()
-
-        # Sheets: UPDATE (upsert)
-        try:
-            _sheet_update(ticket)
-        except Exception:
-            logger.exception("Sheet update failed")
+        with transaction.atomic():
+            ticket.save()
+            # Sheets: UPDATE (upsert) outbox üzerinden
+            outbox.enqueue_ticket(ticket)
 
         messages.success(request, "Kayıt güncellendi.")
         return redirect(
@@ -362,36 +280,94 @@ def staff_ticket_edit(request, pk):
 @login_required
 @user_passes_test(staff_check)
 def export_csv(request):
-    qs = (
-        TicketRequest.objects.select_related("purchased_by", "rejected_by")
-        .all()
-        .order_by("-created_at")
-    )
-    response = HttpResponse(content_type="text/csv; charset=utf-8")
+    """
+    CSV'yi akış olarak gönderir (StreamingHttpResponse): satırlar DB'den
+    parça parça (iterator) okunup ~EXPORT_CSV_CHUNK_BYTES'lık parçalar halinde
+    yazılır; ilk bayt hemen gider, bellek tablo boyundan bağımsız kalır.
+    Excel için UTF-8 BOM ile başlar. ?gzip=1 (ya da EXPORT_CSV_GZIP) ve
+    istemci gzip kabul ediyorsa akış sıkıştırılır (Content-Encoding: gzip).
+    """
+    qs = TicketRequest.objects.order_by("-created_at")
+    raw = request.GET.get("gzip")
+    want_gzip = raw in ("1", "true") if raw is not None else getattr(settings, "EXPORT_CSV_GZIP", False)
+    use_gzip = want_gzip and _accepts_gzip(request.headers.get("Accept-Encoding", ""))
+
+    rows = _EXPORT_ROW.iter_rows(qs, chunk_size=int(getattr(settings, "EXPORT_CSV_CHUNK_ROWS", 2000)))
+    stream = _csv_stream(EXPORT_FIELDS, rows)
+    if use_gzip:
+        stream = _gzip_stream(stream)
+    response = StreamingHttpResponse(stream, content_type="text/csv; charset=utf-8")
     response["Content-Disposition"] = 'attachment; filename="tickets.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(EXPORT_FIELDS)
-    for t in qs:
-        writer.writerow(_row_for_export(t))
+    if use_gzip:
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ("Accept-Encoding",))
     return response
 
 
+def _csv_stream(header, rows):
+    """BOM + başlık + satırlar; tampon EXPORT_CSV_CHUNK_BYTES'ı geçtikçe bayt parçası üretir."""
+    limit = int(getattr(settings, "EXPORT_CSV_CHUNK_BYTES", 64 * 1024))
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    yield codecs.BOM_UTF8
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= limit:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _accepts_gzip(header: str) -> bool:
+    """
+    Accept-Encoding gzip'i kabul ediyor mu? Kodlamalar q değerleriyle okunur:
+    "gzip;q=0" reddeder, "*" yalnızca gzip ayrıca anılmadıysa geçerlidir.
+    """
+    explicit, wildcard = None, None
+    for part in (header or "").split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        coding = coding.lower()
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding in ("gzip", "x-gzip"):
+            explicit = q if explicit is None else max(explicit, q)
+        elif coding == "*":
+            wildcard = q
+    if explicit is not None:
+        return explicit > 0
+    return bool(wildcard)
+
+
+def _gzip_stream(chunks):
+    """Bayt parçalarını tek bir gzip akışına sıkıştırır (parça parça, sabit bellek)."""
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip başlığı + CRC
+    for chunk in chunks:
+        data = z.compress(chunk)
+        if data:
+            yield data
+    yield z.flush()
+
+
 @login_required
 @user_passes_test(staff_check)
 def export_xlsx(request):
-    qs = (
-        TicketRequest.objects.select_related("purchased_by", "rejected_by")
-        .all()
-        .order_by("-created_at")
-    )
+    qs = TicketRequest.objects.order_by("-created_at")
     wb = Workbook()
     ws = wb.active
     ws.title = "Tickets"
 
     ws.append(EXPORT_FIELDS)
-    for t in qs:
-        ws.append(_row_for_export(t))
+    for row in _EXPORT_ROW.iter_rows(qs):
+        ws.append(row)
 
     response = HttpResponse(
         content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
@@ -412,5 +388,87 @@ def reports(request):
     return render(
         request,
         "reports.html",
-        {"by_status": by_status, "by_transport": by_transport, "by_type": by_type},
+        {
+            "by_status": by_status,
+            "by_transport": by_transport,
+            "by_type": by_type,
+            "breaker": _breaker_state(),
+            "outbox": outbox.queue_stats(),
+        },
+    )
+
+
+@login_required
+@user_passes_test(staff_check)
+def sheets_metrics_view(request):
+    """Sheets çağrı telemetrisi (tüm süreçler); ?format=json / ?format=prometheus ile dışa aktarım."""
+    fmt = request.GET.get("format", "")
+    if fmt == "prometheus":
+        return HttpResponse(sheets_metrics.prometheus(), content_type="text/plain; version=0.0.4")
+    snap = sheets_metrics.snapshot()
+    if fmt == "json":
+        return JsonResponse(snap)
+    quota = snap["quota"]
+    for row in quota:
+        row["minute"] = dt.datetime.fromtimestamp(row["minute"], tz=dt.timezone.utc)
+    peak = max([max(q["read"], q["write"]) for q in quota] + [1])
+    return render(
+        request,
+        "sheets_metrics.html",
+        {
+            "series": snap["series"],
+            "since": dt.datetime.fromtimestamp(snap["since"], tz=dt.timezone.utc),
+            "limits": snap["limits"],
+            "quota": [q for q in quota if q["read"] or q["write"]][-15:][::-1],
+            "quota_last": quota[-1],
+            "quota_peak": peak,
+        },
+    )
+
+
+@never_cache
+def sheets_metrics_prometheus(request):
+    """Prometheus kazıyıcısı için: personel oturumu ya da `Authorization: Bearer <METRICS_TOKEN>`."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    auth = request.headers.get("Authorization", "")
+    sent = auth[7:] if auth.startswith("Bearer ") else ""
+    allowed = staff_check(request.user) or (
+        bool(token) and hmac.compare_digest(sent.encode("utf-8"), token.encode("utf-8"))
     )
+    if not allowed:
+        return HttpResponse(status=403)
+    return HttpResponse(sheets_metrics.prometheus(), content_type="text/plain; version=0.0.4")
+
+
+def _health_details(request) -> bool:
+    """Ayrıntılı sağlık raporu: personel ya da X-Health-Token başlığında HEALTH_TOKEN."""
+    if staff_check(request.user):
+        return True
+    token = getattr(settings, "HEALTH_TOKEN", "")
+    sent = request.headers.get("X-Health-Token", "")
+    return bool(token) and hmac.compare_digest(sent.encode("utf-8"), token.encode("utf-8"))
+
+
+@never_cache
+def healthz(request):
+    """Liveness: süreç ayaktaysa 200. Ayrıntılı rapor (tickets.health) yalnızca personel / token ile."""
+    if _health_details(request):
+        return JsonResponse(health.report())
+    return JsonResponse({"status": "ok"})
+
+
+@never_cache
+def readyz(request):
+    """Readiness: DB yavaş / erişilemezse 503. Gövdede ayrıntı yalnızca personel / token ile."""
+    rep = health.report()
+    body = rep if _health_details(request) else health.summary(rep)
+    return JsonResponse(body, status=200 if rep["ready"] else 503)
+
+
+def _breaker_state() -> dict:
+    """Sheets devre kesicisi (şablon için zaman damgaları datetime'a çevrilir)."""
+    st = sheets_breaker.state()
+    for key in ("opened_at", "open_until", "changed_at", "last_failure_at", "last_success_at"):
+        if st[key]:
+            st[key] = dt.datetime.fromtimestamp(st[key], tz=dt.timezone.utc)
+    return st